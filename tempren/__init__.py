@@ -1 +1,16 @@
 __version__ = "0.1.0"
+
+
+def find_package_version() -> str:  # NOCOVER: hard to test - not worth it
+    package_name = "tempren"
+    try:
+        import importlib.metadata
+
+        return importlib.metadata.version(package_name)
+    except ModuleNotFoundError:
+        try:
+            import importlib_metadata
+
+            return importlib_metadata.version(package_name)
+        except ModuleNotFoundError:
+            return "0.0.0"
@@ -9,8 +9,11 @@ from pathlib import Path
 from textwrap import indent
 from typing import Any, List, NoReturn, Optional, Sequence, Text, Union
 
+from tempren import find_package_version
 from tempren.filesystem import DestinationAlreadyExistsError
+from tempren.journal import JournalError, undo_renames
 from tempren.path_generator import TemplateEvaluationError
+from tempren.plan_file import PlanFileError, read_plan_header
 from tempren.template.tree_elements import TagName
 
 from .pipeline import (
@@ -18,6 +21,8 @@ from .pipeline import (
     FilterType,
     InvalidDestinationError,
     OperationMode,
+    OutputMode,
+    ReportFormat,
     RuntimeConfiguration,
     build_pipeline,
     build_tag_registry,
@@ -71,6 +76,13 @@ def configure_logging():
     logging.root.addHandler(stderr_handler)
 
 
+def redirect_info_logs_to_stderr():
+    """Keeps standard output for the machine-readable report"""
+    for handler in logging.root.handlers:
+        if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+            handler.setStream(sys.stderr)
+
+
 def existing_directory(val: str) -> Path:
     directory_path = Path(val)
     if not directory_path.is_dir():
@@ -78,12 +90,36 @@ def existing_directory(val: str) -> Path:
     return directory_path
 
 
+def existing_file(val: str) -> Path:
+    file_path = Path(val)
+    if not file_path.is_file():
+        raise argparse.ArgumentTypeError(f"File '{val}' doesn't exists")
+    return file_path
+
+
+def nonexistent_file(val: str) -> Path:
+    file_path = Path(val)
+    if file_path.exists():
+        raise argparse.ArgumentTypeError(f"File '{val}' already exists")
+    return file_path
+
+
 def nonempty_string(val: str) -> str:
     if not val:
         raise argparse.ArgumentTypeError(f"Non-empty argument required")
     return val
 
 
+def positive_integer(val: str) -> int:
+    try:
+        number = int(val)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid number: '{val}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"Positive number required")
+    return number
+
+
 class SystemExitError(Exception):
     status: int
 
@@ -100,7 +136,8 @@ class _ListAvailableTags(argparse.Action):
         values: Union[Text, Sequence[Any], None],
         option_string: Optional[Text] = None,
     ):
-        registry = build_tag_registry()
+        # All tag modules have to be loaded to list their tags
+        registry = build_tag_registry(lazy=False)
         log.info("Available tags:")
         for category_name in sorted(registry.category_map.keys()):
             log.info(f"{category_name.capitalize()}:")
@@ -167,24 +204,9 @@ class _ShowVersion(argparse.Action):
         values: Union[Text, Sequence[Any], None],
         option_string: Optional[Text] = None,
     ):
-        log.info(self.find_package_version())
+        log.info(find_package_version())
         parser.exit()
 
-    @staticmethod
-    def find_package_version() -> str:  # NOCOVER: hard to test - not worth it
-        package_name = "tempren"
-        try:
-            import importlib.metadata
-
-            return importlib.metadata.version(package_name)
-        except ModuleNotFoundError:
-            try:
-                import importlib_metadata
-
-                return importlib_metadata.version(package_name)
-            except ModuleNotFoundError:
-                return "0.0.0"
-
 
 class _IncreaseLogVerbosity(argparse.Action):
     def __call__(
@@ -250,6 +272,21 @@ def process_cli_configuration(argv: List[str]) -> RuntimeConfiguration:
         action="store_true",
         help="Consider hidden files and directories when scanning for files in input directory",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=positive_integer,
+        default=1,
+        metavar="N",
+        help="Render templates for N files concurrently (useful with slow storage)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_integer,
+        default=1,
+        metavar="N",
+        help="Render templates in N processes (useful with CPU-heavy templates)",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -285,6 +322,79 @@ def process_cli_configuration(argv: List[str]) -> RuntimeConfiguration:
         help="Use template to generate relative file path",
     )
 
+    output_group = parser.add_argument_group("output")
+    output_group.add_argument(
+        "-om",
+        "--output-mode",
+        choices=[mode.value for mode in OutputMode],
+        default=OutputMode.move.value,
+        help="How files are placed at generated paths: renamed, copied (sharing data if supported), "
+        "cloned (reflink), hard or symbolically linked",
+    )
+    output_group.add_argument(
+        "-od",
+        "--output-directory",
+        type=Path,
+        metavar="output_directory",
+        help="Directory to which generated paths are relative (input directory by default)",
+    )
+
+    output_group.add_argument(
+        "--verify-copies",
+        action="store_true",
+        help="Read copied files (also ones moved to other filesystem) back and compare them with the source",
+    )
+
+    journal_group = parser.add_argument_group("journal")
+    journal_group.add_argument(
+        "--journal",
+        type=nonexistent_file,
+        metavar="journal_file",
+        help="Record renames in a new journal file, so they can be undone",
+    )
+    journal_group.add_argument(
+        "--undo",
+        type=existing_file,
+        metavar="journal_file",
+        help="Revert renames recorded in the journal file and exit",
+    )
+
+    plan_group = parser.add_argument_group("plan")
+    plan_mode = plan_group.add_mutually_exclusive_group()
+    plan_mode.add_argument(
+        "--plan-out",
+        type=nonexistent_file,
+        metavar="plan_file",
+        help="Generate new paths and save them in a new plan file instead of renaming files",
+    )
+    plan_mode.add_argument(
+        "--apply-plan",
+        type=existing_file,
+        metavar="plan_file",
+        help="Rename files according to the plan file (template and input directory are taken from the plan)",
+    )
+
+    report_group = parser.add_argument_group("report")
+    report_mode = report_group.add_mutually_exclusive_group()
+    report_mode.add_argument(
+        "-rf",
+        "--report-format",
+        choices=[report_format.value for report_format in ReportFormat],
+        default=ReportFormat.human.value,
+        help="Format in which executed renames are listed on standard output: "
+        "human-readable, JSON lines or NUL-terminated paths (logs are moved to standard error)",
+    )
+    report_mode.add_argument(
+        "--quiet-summary",
+        action="store_true",
+        help="Print only the number of executed renames instead of listing them",
+    )
+    report_group.add_argument(
+        "--progress",
+        action="store_true",
+        help="Display current phase, throughput and estimated time remaining on standard error",
+    )
+
     conflict_resolution_group = parser.add_argument_group("conflict resolution")
     conflict_resolution = conflict_resolution_group.add_mutually_exclusive_group()
     conflict_resolution.add_argument(
@@ -358,14 +468,17 @@ def process_cli_configuration(argv: List[str]) -> RuntimeConfiguration:
         help="Reverse sorting order",
     )
 
+    # Positional arguments are not used when the plan is applied
     parser.add_argument(
         "template",
         type=nonempty_string,
+        nargs="?",
         help="Template used to generate new filename/path",
     )
     parser.add_argument(
         "input_directory",
         type=existing_directory,
+        nargs="?",
         help="Input directory where files to rename are stored",
     )
     parser.add_argument(
@@ -402,6 +515,57 @@ def process_cli_configuration(argv: List[str]) -> RuntimeConfiguration:
 
     args = parser.parse_args(argv)
 
+    template = args.template
+    input_directory = args.input_directory
+    mode = args.mode
+    output_mode = OutputMode(args.output_mode)
+    output_directory = args.output_directory
+    if args.undo is not None:
+        if template is not None or args.apply_plan is not None:
+            parser.error("--undo cannot be used with template or --apply-plan")
+        if args.dry_run:
+            # Renames are reverted right away, so they cannot be simulated
+            parser.error("--undo cannot be used with --dry-run")
+        # Renames are reverted without executing the pipeline
+        template = ""
+        input_directory = Path()
+    elif args.apply_plan is not None:
+        if args.template is not None:
+            parser.error("template cannot be used with --apply-plan")
+        # Files are neither gathered nor rendered when the plan is applied
+        ignored_options = {
+            "--filter-glob": args.filter_glob is not None,
+            "--filter-regex": args.filter_regex is not None,
+            "--filter-template": args.filter_template is not None,
+            "--filter-invert": args.filter_invert,
+            "--sort": args.sort is not None,
+            "--sort-invert": args.sort_invert,
+            "--recursive": args.recursive,
+            "--include-hidden": args.include_hidden,
+            "--jobs": args.jobs > 1,
+            "--concurrency": args.concurrency > 1,
+        }
+        for option, used in ignored_options.items():
+            if used:
+                parser.error(f"{option} cannot be used with --apply-plan")
+        plan_header = read_plan_header(args.apply_plan)
+        template = ""
+        input_directory = plan_header.input_directory
+        try:
+            mode = OperationMode(plan_header.mode)
+            output_mode = OutputMode(plan_header.output_mode)
+        except ValueError as error:
+            raise PlanFileError(
+                f"Invalid header of the rename plan '{args.apply_plan}': {error}"
+            ) from error
+        output_directory = plan_header.output_directory
+    elif template is None or input_directory is None:
+        parser.error("the following arguments are required: template, input_directory")
+
+    if args.concurrency > 1 and args.jobs > 1:
+        # Each worker process renders its files one by one
+        parser.error("--concurrency cannot be used with --jobs")
+
     if args.filter_glob:
         filter_type = FilterType.glob
         filter_expression = args.filter_glob
@@ -428,8 +592,8 @@ def process_cli_configuration(argv: List[str]) -> RuntimeConfiguration:
         raise NotImplementedError()
 
     configuration = RuntimeConfiguration(
-        template=args.template,
-        input_directory=args.input_directory,
+        template=template,
+        input_directory=input_directory,
         recursive=args.recursive,
         include_hidden=args.include_hidden,
         dry_run=args.dry_run,
@@ -439,7 +603,19 @@ def process_cli_configuration(argv: List[str]) -> RuntimeConfiguration:
         conflict_strategy=conflict_strategy,
         sort_invert=args.sort_invert,
         sort=args.sort,
-        mode=args.mode,
+        mode=mode,
+        concurrency=args.concurrency,
+        jobs=args.jobs,
+        output_mode=output_mode,
+        output_directory=output_directory,
+        verify_copies=args.verify_copies,
+        journal=args.journal,
+        plan_out=args.plan_out,
+        apply_plan=args.apply_plan,
+        report_format=ReportFormat(args.report_format),
+        quiet_summary=args.quiet_summary,
+        progress=args.progress,
+        undo=args.undo,
     )
 
     return configuration
@@ -523,6 +699,12 @@ def main() -> int:
     argv = sys.argv[1:]
     try:
         config = process_cli_configuration(argv)
+        if config.undo is not None:
+            reverted = undo_renames(config.undo)
+            log.info(f"Reverted {reverted} renames")
+            return ErrorCode.SUCCESS
+        if config.report_format != ReportFormat.human:
+            redirect_info_logs_to_stderr()
         registry = build_tag_registry()
         pipeline = build_pipeline(
             config, registry, manual_conflict_resolver=cli_prompt_conflict_resolver
@@ -547,6 +729,9 @@ def main() -> int:
     except InvalidDestinationError as exc:
         log.error(f"Error: {exc}")
         return ErrorCode.INVALID_DESTINATION_ERROR
+    except (JournalError, PlanFileError) as exc:
+        log.error(f"Error: {exc}")
+        return ErrorCode.USAGE_ERROR
     except Exception as exc:
         log.error(f"Unknown error: {exc}")
         return ErrorCode.UNKNOWN_ERROR
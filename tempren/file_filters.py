@@ -8,8 +8,8 @@ from tempren.path_generator import (
     ExpressionEvaluationError,
     File,
     TemplateEvaluationError,
-    evaluate_expression,
 )
+from tempren.template.expression import CompiledExpression
 from tempren.template.tree_elements import Pattern
 
 
@@ -79,17 +79,17 @@ class GlobPathFileFilter(GlobFileFilter):
 class TemplateFileFilter(FileFilter):
     log: logging.Logger
     pattern: Pattern
+    expression: CompiledExpression
 
     def __init__(self, pattern: Pattern):
         self.log = logging.getLogger(__name__)
         self.pattern = pattern
+        self.expression = CompiledExpression(pattern, reorder_operands=True)
 
     def __call__(self, file: File) -> bool:
-        self.log.debug("Rendering filter template for '%s'", file)
-        rendered_expression = self.pattern.process_as_expression(file)
-        self.log.debug("Evaluating filter expression '%s'", rendered_expression)
+        self.log.debug("Evaluating filter expression for '%s'", file)
         try:
-            evaluation_result = evaluate_expression(rendered_expression)
+            evaluation_result = self.expression.evaluate(file)
             self.log.debug("Evaluation result '%s'", repr(evaluation_result))
             return bool(evaluation_result)
         except ExpressionEvaluationError as evaluation_error:
@@ -6,8 +6,8 @@ from tempren.path_generator import (
     ExpressionEvaluationError,
     File,
     TemplateEvaluationError,
-    evaluate_expression,
 )
+from tempren.template.expression import CompiledExpression
 from tempren.template.tree_elements import Pattern
 
 
@@ -21,22 +21,22 @@ class TemplateFileSorter(FileSorter):
     log: logging.Logger
     pattern: Pattern
     invert: bool = False
+    expression: CompiledExpression
 
     def __init__(self, pattern: Pattern, invert: bool = False):
         self.log = logging.getLogger(__name__)
 
         self.pattern = pattern
         self.invert = invert
+        self.expression = CompiledExpression(pattern, prefix="(", suffix=", )")
 
     def __call__(self, files: Iterable[File]) -> Iterable[File]:
         return sorted(files, key=self._generate_sort_key, reverse=self.invert)
 
     def _generate_sort_key(self, file: File) -> Tuple:
-        self.log.debug("Rendering sorting value template for '%s'", file)
-        rendered_expression = "(" + self.pattern.process_as_expression(file) + ", )"
-        self.log.debug("Evaluating sorting value expression '%s'", rendered_expression)
+        self.log.debug("Evaluating sorting value expression for '%s'", file)
         try:
-            evaluation_result = evaluate_expression(rendered_expression)
+            evaluation_result = self.expression.evaluate(file)
             self.log.debug("Evaluation result '%s'", repr(evaluation_result))
             return evaluation_result
         except ExpressionEvaluationError as evaluation_error:
@@ -1,9 +1,26 @@
-import logging
+import errno
+import functools
+import hashlib
 import os
 import shutil
+import sys
+import weakref
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Callable, Iterable, Set
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 from tempren.path_generator import File
 
@@ -14,6 +31,25 @@ class InvalidDestinationError(Exception):
     pass
 
 
+class CloningNotSupportedError(OSError):
+    def __init__(self):
+        super().__init__(
+            errno.EOPNOTSUPP,
+            "Sharing data between files (reflink) is not supported by the filesystem",
+        )
+
+
+class CopyVerificationError(OSError):
+    def __init__(self, src: Path, dst: Path):
+        super().__init__(
+            errno.EIO,
+            "Contents of the copied file don't match the source",
+            str(src),
+            None,
+            str(dst),
+        )
+
+
 class DestinationAlreadyExistsError(FileExistsError):
     def __init__(self, src: Path, dst: Path):
         super().__init__(
@@ -21,9 +57,422 @@ class DestinationAlreadyExistsError(FileExistsError):
         )
 
 
+RENAME_NOREPLACE = 1
+_AT_FDCWD = -100
+
+
+@functools.lru_cache(maxsize=None)
+def _load_renameat2() -> Optional[Callable[..., int]]:
+    """Returns renameat2 function from the C library (if available)"""
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        renameat2 = libc.renameat2
+    except (OSError, AttributeError):
+        # Not provided by glibc older than 2.28 or other C libraries
+        return None
+    renameat2.argtypes = [
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_uint,
+    ]
+    renameat2.restype = ctypes.c_int
+    return renameat2
+
+
+_Location = Tuple[Optional[int], str]
+"""Path relative to the directory descriptor (or to the working directory if None)"""
+
+
+class DirectoryDescriptorCache:
+    """Keeps descriptors of recently used directories open
+
+    Files renamed relative to their parent directory descriptor don't require
+    the kernel to look up all components of their paths again. Directories are
+    identified by their absolute paths (so changes of the working directory
+    don't matter) and are assumed not to be moved while files are renamed.
+    Least recently used descriptors are closed when the capacity is exceeded,
+    but never while they are used by a rename.
+    """
+
+    capacity: int
+    _descriptors: "OrderedDict[str, int]"
+    _pins: Dict[str, int]
+    """Number of renames using the descriptor (which cannot be closed until they finish)"""
+
+    def __init__(self, capacity: int = 64):
+        assert capacity > 0, "capacity have to be positive"
+        self.capacity = capacity
+        self._descriptors = OrderedDict()
+        self._pins = {}
+        weakref.finalize(self, _close_descriptors, self._descriptors)
+
+    @staticmethod
+    def is_supported() -> bool:
+        return (
+            os.rename in os.supports_dir_fd
+            and os.stat in os.supports_dir_fd
+            and hasattr(os, "O_DIRECTORY")
+        )
+
+    @contextmanager
+    def locate(self, *paths: Path) -> Iterator[List[_Location]]:
+        """Yields paths relative to descriptors of their parent directories
+
+        Descriptors stay open until the context is exited.
+        """
+        pinned_directories = []
+        try:
+            locations: List[_Location] = []
+            for path in paths:
+                # String operations are considerably cheaper than creating Path objects
+                path_string = os.fspath(path)
+                directory, name = os.path.split(path_string)
+                try:
+                    if not os.path.isabs(directory):
+                        directory = os.path.join(os.getcwd(), directory)
+                    descriptor = self._acquire(directory)
+                except OSError:
+                    # Errors are reported by the rename itself (using the full path)
+                    locations.append((None, path_string))
+                    continue
+                pinned_directories.append(directory)
+                locations.append((descriptor, name))
+            yield locations
+        finally:
+            for directory in pinned_directories:
+                self._release(directory)
+            self._evict()
+
+    def _acquire(self, directory: str) -> int:
+        descriptor = self._descriptors.get(directory)
+        if descriptor is None:
+            descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            self._descriptors[directory] = descriptor
+        else:
+            self._descriptors.move_to_end(directory)
+        self._pins[directory] = self._pins.get(directory, 0) + 1
+        return descriptor
+
+    def _release(self, directory: str):
+        self._pins[directory] -= 1
+        if not self._pins[directory]:
+            del self._pins[directory]
+
+    def _evict(self):
+        excess = len(self._descriptors) - self.capacity
+        if excess <= 0:
+            return
+        evicted = [
+            directory for directory in self._descriptors if directory not in self._pins
+        ][:excess]
+        for directory in evicted:
+            os.close(self._descriptors.pop(directory))
+
+    def close(self):
+        assert not self._pins, "descriptors are still used"
+        _close_descriptors(self._descriptors)
+
+
+def _close_descriptors(descriptors: "OrderedDict[str, int]"):
+    while descriptors:
+        _, descriptor = descriptors.popitem()
+        os.close(descriptor)
+
+
+def _unlocated(path: Path) -> _Location:
+    return None, os.fspath(path)
+
+
+def _exists(location: _Location) -> bool:
+    directory_descriptor, path = location
+    if directory_descriptor is None:
+        return os.path.exists(path)
+    try:
+        os.stat(path, dir_fd=directory_descriptor)
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+    return True
+
+
+def _rename_at(
+    source_location: _Location,
+    destination_location: _Location,
+    source_path: Path,
+    destination_path: Path,
+) -> None:
+    source_descriptor, source = source_location
+    destination_descriptor, destination = destination_location
+    try:
+        os.rename(
+            source,
+            destination,
+            src_dir_fd=source_descriptor,
+            dst_dir_fd=destination_descriptor,
+        )
+    except OSError as error:
+        if source_descriptor is None and destination_descriptor is None:
+            raise
+        raise OSError(
+            error.errno, error.strerror, str(source_path), None, str(destination_path)
+        ) from None
+
+
+def rename_replacing(
+    source_path: Path,
+    destination_path: Path,
+    directories: Optional[DirectoryDescriptorCache] = None,
+) -> None:
+    """Renames source path (replacing the destination if it exists)
+
+    :param directories: descriptors of parent directories used to rename the files
+    """
+    if directories is None:
+        _rename_at(
+            _unlocated(source_path),
+            _unlocated(destination_path),
+            source_path,
+            destination_path,
+        )
+        return
+    with directories.locate(source_path, destination_path) as locations:
+        source_location, destination_location = locations
+        _rename_at(source_location, destination_location, source_path, destination_path)
+
+
+def rename_noreplace(
+    source_path: Path,
+    destination_path: Path,
+    directories: Optional[DirectoryDescriptorCache] = None,
+) -> None:
+    """Renames source path unless the destination path already exists
+
+    On Linux the check and rename are done atomically (with a single system call).
+    Otherwise, or if the filesystem doesn't support it, existence of the destination
+    is checked before renaming.
+
+    :param directories: descriptors of parent directories used to rename the files
+    :raises DestinationAlreadyExistsError: if destination path already exists
+    """
+    if directories is None:
+        _rename_noreplace_at(
+            _unlocated(source_path),
+            _unlocated(destination_path),
+            source_path,
+            destination_path,
+        )
+        return
+    with directories.locate(source_path, destination_path) as locations:
+        source_location, destination_location = locations
+        _rename_noreplace_at(
+            source_location, destination_location, source_path, destination_path
+        )
+
+
+def _rename_noreplace_at(
+    source_location: _Location,
+    destination_location: _Location,
+    source_path: Path,
+    destination_path: Path,
+) -> None:
+    renameat2 = _load_renameat2()
+    if renameat2 is not None:
+        import ctypes
+
+        source_descriptor, source = source_location
+        destination_descriptor, destination = destination_location
+        result = renameat2(
+            _AT_FDCWD if source_descriptor is None else source_descriptor,
+            os.fsencode(source),
+            _AT_FDCWD if destination_descriptor is None else destination_descriptor,
+            os.fsencode(destination),
+            RENAME_NOREPLACE,
+        )
+        if result == 0:
+            return
+        error_code = ctypes.get_errno()
+        if error_code == errno.EEXIST:
+            raise DestinationAlreadyExistsError(source_path, destination_path)
+        # EINVAL is reported also when the flag isn't supported by the filesystem
+        if error_code not in (errno.ENOSYS, errno.EINVAL):
+            raise OSError(
+                error_code,
+                os.strerror(error_code),
+                str(source_path),
+                None,
+                str(destination_path),
+            )
+
+    if _exists(destination_location):
+        raise DestinationAlreadyExistsError(source_path, destination_path)
+    _rename_at(source_location, destination_location, source_path, destination_path)
+
+
+def _is_within(path: str, directory: str) -> bool:
+    """Checks (lexically) whether the normalized path lies in the normalized directory"""
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+class ContainmentChecker:
+    """Checks whether destination paths stay inside the root directory
+
+    Paths are normalized lexically. Symbolic links are resolved only for the
+    existing directories being symlinks (or preceding '..' components), result
+    of the check is cached for each destination directory.
+    """
+
+    root_directory: str
+    _real_root_directory: Optional[str] = None
+    _directories: Dict[str, bool]
+    """Directories (by their normalized path) and whether they are contained"""
+
+    def __init__(self, root_directory: Path):
+        self.root_directory = os.path.normpath(root_directory)
+        self._directories = {self.root_directory: True}
+
+    def contains(self, path: Union[str, Path]) -> bool:
+        """Checks the path (relative paths are relative to the root directory)"""
+        return self.normalize(path) is not None
+
+    def normalize(self, path: Union[str, Path]) -> Optional[Path]:
+        """Returns normalized path relative to the root directory
+
+        :returns: None if the path lies outside the root directory
+        """
+        normalized_path = self._normalize(os.path.join(self.root_directory, path))
+        if (
+            normalized_path is None
+            or normalized_path == self.root_directory
+            or not _is_within(normalized_path, self.root_directory)
+            or not self._contains_directory(os.path.dirname(normalized_path))
+        ):
+            return None
+        return Path(os.path.relpath(normalized_path, self.root_directory))
+
+    def _normalize(self, path: str) -> Optional[str]:
+        if ".." not in path.split(os.sep):
+            return os.path.normpath(path)
+        # Parent of the symlinked directory is not its lexical parent, so
+        # the path preceding '..' has to be resolved
+        resolved_path = os.sep
+        for component in path.split(os.sep):
+            if component == "..":
+                resolved_path = os.path.dirname(os.path.realpath(resolved_path))
+            elif component not in ("", "."):
+                resolved_path = os.path.join(resolved_path, component)
+        if _is_within(resolved_path, self.root_directory):
+            return resolved_path
+        real_root_directory = self._real_root()
+        if _is_within(resolved_path, real_root_directory):
+            # Root directory is a symlink itself
+            return self.root_directory + resolved_path[len(real_root_directory) :]
+        return None
+
+    def _contains_directory(self, directory: str) -> bool:
+        contained = self._directories.get(directory)
+        if contained is None:
+            contained = self._contains_directory(
+                os.path.dirname(directory)
+            ) and self._link_target_contained(directory)
+            self._directories[directory] = contained
+        return contained
+
+    def _real_root(self) -> str:
+        if self._real_root_directory is None:
+            self._real_root_directory = os.path.realpath(self.root_directory)
+        return self._real_root_directory
+
+    def _link_target_contained(self, directory: str) -> bool:
+        if not os.path.islink(directory):
+            return True
+        return _is_within(os.path.realpath(directory), self._real_root())
+
+
+class FilesystemSnapshot:
+    """In-memory view of the directory contents used to simulate renames
+
+    Listings made while gathering files are recorded up front, remaining
+    directories are listed once - when they are needed for the first time.
+    """
+
+    _root_directory: Optional[str]
+    """Directory to which relative paths are relative (current one by default)"""
+    list_directory_contents: Callable[[str], Iterable[str]]
+    """Lists directories which were not recorded"""
+    _directories: Dict[str, Set[str]]
+    """Names of entries in the directory (by its normalized absolute path)"""
+    _missing_directories: Set[str]
+    """Directories which (still) don't exist"""
+
+    def __init__(
+        self,
+        root_directory: Optional[Path] = None,
+        list_directory_contents: Callable[[str], Iterable[str]] = os.listdir,
+    ):
+        self._root_directory = (
+            None if root_directory is None else os.fspath(root_directory)
+        )
+        self.list_directory_contents = list_directory_contents
+        self._directories = {}
+        self._missing_directories = set()
+
+    def _absolute(self, path: Union[str, Path]) -> str:
+        if self._root_directory is None and not os.path.isabs(path):
+            self._root_directory = os.getcwd()
+        return os.path.normpath(os.path.join(self._root_directory or "", path))
+
+    def _names(self, directory: str) -> Set[str]:
+        names = self._directories.get(directory)
+        if names is None:
+            try:
+                names = set(self.list_directory_contents(directory))
+            except (FileNotFoundError, NotADirectoryError):
+                names = set()
+                self._missing_directories.add(directory)
+            self._directories[directory] = names
+        return names
+
+    def record_listing(self, directory: Union[str, Path], names: Iterable[str]):
+        self._directories[self._absolute(directory)] = set(names)
+
+    def list_directory(self, directory: Union[str, Path]) -> Set[str]:
+        return self._names(self._absolute(directory))
+
+    def exists(self, path: Union[str, Path]) -> bool:
+        directory, name = os.path.split(self._absolute(path))
+        return name in self._names(directory)
+
+    def rename(
+        self,
+        source_path: Union[str, Path],
+        destination_path: Union[str, Path],
+        preserve_source: bool = False,
+    ):
+        """Simulates the rename (creating missing parent directories)"""
+        if not preserve_source:
+            directory, name = os.path.split(self._absolute(source_path))
+            self._names(directory).discard(name)
+        self._create(self._absolute(destination_path))
+
+    def _create(self, path: str):
+        directory, name = os.path.split(path)
+        names = self._names(directory)
+        if directory in self._missing_directories:
+            self._missing_directories.discard(directory)
+            self._create(directory)
+        names.add(name)
+
+
 class FileGatherer(ABC):
     include_hidden: bool = False
     """Include hidden files and directories when making the search"""
+    snapshot: Optional[FilesystemSnapshot] = None
+    """Records listings of the searched directories"""
 
     @abstractmethod
     def gather_in(self, start_directory: Path) -> Iterable[File]:
@@ -36,19 +485,25 @@ class FilesystemGatherer(FileGatherer, ABC):
             return not path.name.startswith(".")
         return True
 
+    def _scan(self, directory: Path) -> Iterable[Tuple[Path, bool]]:
+        """Yields paths of the directory entries and whether they are directories"""
+        names = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                names.append(entry.name)
+                path = directory / entry.name
+                if self._include_path_in_result(path):
+                    # Type of the entry is usually known without calling stat()
+                    yield path, entry.is_dir()
+        if self.snapshot is not None:
+            self.snapshot.record_listing(directory, names)
+
 
 class FlatFileGatherer(FilesystemGatherer):
     def gather_in(self, start_directory: Path) -> Iterable[File]:
-        yield from map(
-            lambda file_path: File(
-                start_directory, file_path.relative_to(start_directory)
-            ),
-            filter(
-                lambda file_path: self._include_path_in_result(file_path)
-                and not file_path.is_dir(),
-                start_directory.glob("*"),
-            ),
-        )
+        for path, is_directory in self._scan(start_directory):
+            if not is_directory:
+                yield File(start_directory, path.relative_to(start_directory))
 
 
 class RecursiveFileGatherer(FilesystemGatherer):
@@ -56,49 +511,297 @@ class RecursiveFileGatherer(FilesystemGatherer):
         yield from self._gather_in(start_directory, start_directory)
 
     def _gather_in(self, directory: Path, start_directory: Path) -> Iterable[File]:
-        for dir_entry in directory.iterdir():
-            if not self._include_path_in_result(dir_entry):
-                continue
-
-            if dir_entry.is_dir():
-                yield from self._gather_in(dir_entry, start_directory)
+        for path, is_directory in self._scan(directory):
+            if is_directory:
+                yield from self._gather_in(path, start_directory)
             else:
-                yield File(start_directory, dir_entry.relative_to(start_directory))
+                yield File(start_directory, path.relative_to(start_directory))
+
+
+def _directory_descriptor_cache() -> Optional[DirectoryDescriptorCache]:
+    if DirectoryDescriptorCache.is_supported():
+        return DirectoryDescriptorCache()
+    return None
 
 
 class FileRenamer:
+    _directories: Optional[DirectoryDescriptorCache]
+
+    def __init__(self):
+        self._directories = _directory_descriptor_cache()
+
     def __call__(
         self,
         source_path: Path,
         destination_path: Path,
         override: bool = False,
     ) -> None:
-        if not override and destination_path.exists():
-            raise DestinationAlreadyExistsError(source_path, destination_path)
         if source_path.parent != destination_path.parent:
             raise InvalidDestinationError(
                 f"Destination path {destination_path} targets different directory"
             )
-        os.rename(source_path, destination_path)
+        if override:
+            rename_replacing(source_path, destination_path, self._directories)
+        else:
+            rename_noreplace(source_path, destination_path, self._directories)
+
+
+class ParentDirectoryCreator:
+    """Creates parent directories of destination paths"""
+
+    _existing_directories: Set[str]
+    """Directories created or verified before"""
+
+    def __init__(self):
+        self._existing_directories = set()
+
+    def create_parent_directory(self, path: Path):
+        # Directories are assumed not to be removed while files are renamed
+        directory = os.path.dirname(os.fspath(path))
+        if not directory or directory in self._existing_directories:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._existing_directories.add(directory)
 
 
 class FileMover:
+    _parent_directory_creator: ParentDirectoryCreator
+    _directories: Optional[DirectoryDescriptorCache]
+    _copier: "FileCopier"
+    """Moves regular files to other filesystems"""
+
+    def __init__(
+        self,
+        verify_copies: bool = False,
+        file_digests: Optional["FileDigestCache"] = None,
+    ):
+        self._parent_directory_creator = ParentDirectoryCreator()
+        self._directories = _directory_descriptor_cache()
+        self._copier = FileCopier(verify=verify_copies, file_digests=file_digests)
+
     def __call__(
         self,
         source_path: Path,
         destination_path: Path,
         override: bool = False,
     ) -> None:
+        self._parent_directory_creator.create_parent_directory(destination_path)
+        try:
+            if override:
+                rename_replacing(source_path, destination_path, self._directories)
+            else:
+                rename_noreplace(source_path, destination_path, self._directories)
+            return
+        except OSError as error:
+            if error.errno != errno.EXDEV:
+                raise
+        if os.path.isfile(source_path) and not os.path.islink(source_path):
+            # Source is removed only after its copy is complete (and verified)
+            self._copier(source_path, destination_path, override)
+            os.unlink(source_path)
+            return
+        # Other files on other devices are copied by shutil, so the destination
+        # can only be checked beforehand
         if not override and destination_path.exists():
             raise DestinationAlreadyExistsError(source_path, destination_path)
-        destination_path.parent.mkdir(parents=True, exist_ok=True)
         shutil.move(str(source_path), destination_path)
 
 
-class DryRunRenamer:
+FICLONE = 0x40049409
+"""Linux ioctl request sharing data of another file (copy-on-write)"""
+
+_COPY_CHUNK_SIZE = 1024 * 1024 * 1024
+
+# Errors reported when the kernel (or filesystem) doesn't support the operation
+# or doesn't support it between these files
+_UNSUPPORTED_OPERATION_ERRORS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EBADF,
+}
+
+
+def clone_file_contents(source_descriptor: int, destination_descriptor: int) -> bool:
+    """Makes the destination file share data of the source (using FICLONE)
+
+    :returns: False if not supported by the system or filesystem
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        fcntl.ioctl(destination_descriptor, FICLONE, source_descriptor)
+    except OSError as error:
+        if error.errno in _UNSUPPORTED_OPERATION_ERRORS:
+            return False
+        raise
+    return True
+
+
+def _transfer_contents(
+    transfer: Callable[[int, int], int],
+    source_descriptor: int,
+    destination_descriptor: int,
+) -> bool:
+    transferred = False
+    try:
+        while transfer(source_descriptor, destination_descriptor):
+            transferred = True
+    except OSError as error:
+        if not transferred and error.errno in _UNSUPPORTED_OPERATION_ERRORS:
+            return False
+        raise
+    return True
+
+
+def copy_file_contents(source_descriptor: int, destination_descriptor: int):
+    """Copies file contents (from the current offsets) in the kernel
+
+    Data is cloned if the filesystem supports it. Otherwise copy_file_range
+    or sendfile is used. Contents are read into the Python buffers only if
+    none of them is available.
+    """
+    if clone_file_contents(source_descriptor, destination_descriptor):
+        return
+    if hasattr(os, "copy_file_range"):
+        if _transfer_contents(
+            lambda source, destination: os.copy_file_range(
+                source, destination, _COPY_CHUNK_SIZE
+            ),
+            source_descriptor,
+            destination_descriptor,
+        ):
+            return
+    if sys.platform.startswith("linux"):
+        if _transfer_contents(
+            lambda source, destination: os.sendfile(
+                destination, source, None, _COPY_CHUNK_SIZE
+            ),
+            source_descriptor,
+            destination_descriptor,
+        ):
+            return
+    with open(source_descriptor, "rb", closefd=False) as source_file, open(
+        destination_descriptor, "wb", closefd=False
+    ) as destination_file:
+        shutil.copyfileobj(source_file, destination_file)
+
+
+_DIGEST_CHUNK_SIZE = 1024 * 1024
+
+_FileIdentity = Tuple[int, int, int, int]
+
+
+class FileDigestCache:
+    """Digests of file contents calculated during the run (e.g. by hash tags)
+
+    Files are identified by their device, inode, size and modification time,
+    so digests stay valid after files are renamed.
+    """
+
+    _digests: Dict[_FileIdentity, Dict[str, str]]
+
+    def __init__(self):
+        self._digests = {}
+
+    @staticmethod
+    def _identity(stat_result: os.stat_result) -> _FileIdentity:
+        return (
+            stat_result.st_dev,
+            stat_result.st_ino,
+            stat_result.st_size,
+            stat_result.st_mtime_ns,
+        )
+
+    def record(self, path: Path, algorithm: str, digest: str):
+        """Stores the digest (hashlib algorithm name and hex digest) of the file"""
+        try:
+            # File is checked after it has been read, so the digest is not
+            # recorded if the file was modified in the meantime
+            stat_result = os.stat(path)
+        except OSError:
+            return
+        self._digests.setdefault(self._identity(stat_result), {})[algorithm] = digest
+
+    def find(self, stat_result: os.stat_result) -> Optional[Tuple[str, str]]:
+        """Returns any known (algorithm, digest) pair of the file contents"""
+        digests = self._digests.get(self._identity(stat_result))
+        if not digests:
+            return None
+        return next(iter(digests.items()))
+
+    def clear(self):
+        self._digests.clear()
+
+
+class FileDigestRecorder:
+    """Component calculating file digests which can be reused by the copiers"""
+
+    file_digests: Optional[FileDigestCache] = None
+    """Cache shared with the copiers (set only if copies are verified)"""
+
+    def record_digest(self, path: Path, algorithm: str, digest: str):
+        if self.file_digests is not None:
+            self.file_digests.record(path, algorithm, digest)
+
+
+def _read_chunks(descriptor: int, buffer: memoryview) -> Iterable[memoryview]:
+    """Reads file contents (from the current offset) into the reused buffer"""
+    with open(descriptor, "rb", buffering=0, closefd=False) as file:
+        while True:
+            read_size = file.readinto(buffer)
+            if not read_size:
+                break
+            yield buffer[:read_size]
+
+
+def copy_file_contents_with_digest(
+    source_descriptor: int, destination_descriptor: int, digest: Any
+):
+    """Copies file contents updating the (hashlib) digest in the same pass"""
+    buffer = memoryview(bytearray(_DIGEST_CHUNK_SIZE))
+    for chunk in _read_chunks(source_descriptor, buffer):
+        digest.update(chunk)
+        while chunk:
+            chunk = chunk[os.write(destination_descriptor, chunk) :]
+
+
+def _read_back_digest(descriptor: int, algorithm: str) -> str:
+    """Calculates digest of the file contents stored on the device
+
+    Written data is flushed and dropped from the page cache first (where
+    supported), so it is actually read back instead of served from memory.
+    """
+    os.fsync(descriptor)
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(descriptor, 0, 0, os.POSIX_FADV_DONTNEED)
+    os.lseek(descriptor, 0, os.SEEK_SET)
+    digest = hashlib.new(algorithm)
+    for chunk in _read_chunks(descriptor, memoryview(bytearray(_DIGEST_CHUNK_SIZE))):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+DUPLICATE_TEMPORARY_PREFIX = ".tempren_duplicate-"
+"""Prefix of the duplicates created before they replace the destination
+
+Differs from the prefix of the temporary names used by the rename planner, so
+leftover files of both kinds can be told apart.
+"""
+
+
+class FileDuplicator(ABC):
+    """Creates destination file from the source one (keeping the source intact)"""
+
+    _parent_directory_creator: ParentDirectoryCreator
+
     def __init__(self):
-        self.removed_paths: Set[Path] = set()
-        self.created_paths: Set[Path] = set()
+        self._parent_directory_creator = ParentDirectoryCreator()
 
     def __call__(
         self,
@@ -106,33 +809,154 @@ class DryRunRenamer:
         destination_path: Path,
         override: bool = False,
     ) -> None:
-        source_exists = (
-            source_path.exists() or source_path in self.created_paths
-        ) and source_path not in self.removed_paths
-        if not source_exists:
-            raise FileNotFoundError(f"No such file or directory: {source_path}")
+        self._parent_directory_creator.create_parent_directory(destination_path)
+        if not override:
+            try:
+                # Operations fail if the destination exists
+                self.create(source_path, destination_path)
+            except FileExistsError:
+                raise DestinationAlreadyExistsError(
+                    source_path, destination_path
+                ) from None
+            return
 
-        destination_exists = (
-            destination_path.exists() or destination_path in self.created_paths
-        ) and destination_path not in self.removed_paths
-        if destination_exists and not override:
-            raise FileExistsError(
-                f"Destination file already exists: {destination_path}"
+        # Destination is replaced (atomically) with fully created file
+        temporary_path = self._create_temporary(source_path, destination_path)
+        try:
+            os.replace(temporary_path, destination_path)
+        except OSError:
+            os.unlink(temporary_path)
+            raise
+
+    def _create_temporary(self, source_path: Path, destination_path: Path) -> Path:
+        index = 0
+        while True:
+            temporary_path = destination_path.with_name(
+                f"{DUPLICATE_TEMPORARY_PREFIX}{os.getpid()}-{index}-{destination_path.name}"
             )
+            try:
+                self.create(source_path, temporary_path)
+                return temporary_path
+            except FileExistsError:
+                index += 1
+
+    @abstractmethod
+    def create(self, source_path: Path, destination_path: Path) -> None:
+        """Creates destination file
+
+        :raises FileExistsError: if destination path already exists
+        """
+        raise NotImplementedError()
+
+
+class FileCopier(FileDuplicator):
+    """Copies files (sharing their data if the filesystem supports it)"""
+
+    clone_only: bool = False
+    """Fail instead of copying data if it cannot be shared"""
+    verify: bool = False
+    """Read copies back and compare their digests with the source files"""
+    copy_metadata: Callable[[Path, Path], Any]
+    """Copies metadata (permission bits and timestamps by default) of the source file"""
+    file_digests: Optional[FileDigestCache] = None
+    """Digests of the source files known before copying (e.g. from the hash tags)"""
+
+    def __init__(
+        self,
+        clone_only: bool = False,
+        verify: bool = False,
+        copy_metadata: Callable[[Path, Path], Any] = shutil.copystat,
+        file_digests: Optional[FileDigestCache] = None,
+    ):
+        super().__init__()
+        self.clone_only = clone_only
+        self.verify = verify
+        self.copy_metadata = copy_metadata
+        self.file_digests = file_digests
+
+    def create(self, source_path: Path, destination_path: Path) -> None:
+        with open(source_path, "rb") as source_file:
+            # Exclusive creation fails if the destination exists
+            with open(destination_path, "x+b") as destination_file:
+                try:
+                    expected_digest = self._copy(
+                        source_file.fileno(), destination_file.fileno()
+                    )
+                    if expected_digest is not None:
+                        algorithm, digest = expected_digest
+                        if (
+                            _read_back_digest(destination_file.fileno(), algorithm)
+                            != digest
+                        ):
+                            raise CopyVerificationError(source_path, destination_path)
+                    self.copy_metadata(source_path, destination_path)
+                except BaseException:
+                    os.unlink(destination_path)
+                    raise
+
+    def _copy(
+        self, source_descriptor: int, destination_descriptor: int
+    ) -> Optional[Tuple[str, str]]:
+        """Copies contents of the file
+
+        :returns: (algorithm, digest) expected from the copy if it should be verified
+        """
+        if not self.verify or self.clone_only:
+            # Clones share data blocks of the source, so there is nothing to verify
+            self._copy_contents(source_descriptor, destination_descriptor)
+            return None
+
+        # Digest calculated by the template is used if available (so data can
+        # still be copied in the kernel), otherwise it is calculated while copying
+        known_digest = (
+            None
+            if self.file_digests is None
+            else self.file_digests.find(os.fstat(source_descriptor))
+        )
+        if known_digest is not None:
+            self._copy_contents(source_descriptor, destination_descriptor)
+            return known_digest
+        digest = hashlib.sha256()
+        copy_file_contents_with_digest(
+            source_descriptor, destination_descriptor, digest
+        )
+        return digest.name, digest.hexdigest()
+
+    def _copy_contents(self, source_descriptor: int, destination_descriptor: int):
+        if not self.clone_only:
+            copy_file_contents(source_descriptor, destination_descriptor)
+        elif not clone_file_contents(source_descriptor, destination_descriptor):
+            raise CloningNotSupportedError()
+
+
+class FileHardLinker(FileDuplicator):
+    """Creates hard links to the files"""
+
+    def create(self, source_path: Path, destination_path: Path) -> None:
+        os.link(source_path, destination_path)
+
 
-        self.removed_paths.add(source_path)
-        self.created_paths.add(destination_path)
-        self.removed_paths.discard(destination_path)
-        self.created_paths.discard(source_path)
+class FileSymlinker(FileDuplicator):
+    """Creates symbolic links (with absolute paths) to the files"""
 
+    def create(self, source_path: Path, destination_path: Path) -> None:
+        os.symlink(os.path.abspath(source_path), destination_path)
 
-class PrintingRenamerWrapper:
-    log: logging.Logger
 
-    def __init__(self, renamer_to_wrap: FileRenamerType):
-        assert renamer_to_wrap is not None
-        self.log = logging.getLogger(self.__class__.__name__)
-        self.renamer = renamer_to_wrap
+class DryRunRenamer:
+    """Simulates renames in the (in-memory) filesystem snapshot"""
+
+    snapshot: FilesystemSnapshot
+    preserve_sources: bool
+    """Simulate creation of copies (or links) instead of renames"""
+
+    def __init__(
+        self,
+        snapshot: Optional[FilesystemSnapshot] = None,
+        preserve_sources: bool = False,
+    ):
+        self.snapshot = FilesystemSnapshot() if snapshot is None else snapshot
+        self.preserve_sources = preserve_sources
 
     def __call__(
         self,
@@ -140,17 +964,12 @@ class PrintingRenamerWrapper:
         destination_path: Path,
         override: bool = False,
     ) -> None:
-        if override:
-            self.log.debug(
-                "Trying to override: %s to %s", source_path, destination_path
+        if not self.snapshot.exists(source_path):
+            raise FileNotFoundError(f"No such file or directory: {source_path}")
+
+        if self.snapshot.exists(destination_path) and not override:
+            raise FileExistsError(
+                f"Destination file already exists: {destination_path}"
             )
-        else:
-            self.log.debug("Trying to rename: %s to %s", source_path, destination_path)
-        self.renamer(source_path, destination_path, override)
 
-        self.log.info(f"Renamed: {source_path}")
-        if override:
-            self.log.info(f"         to: {destination_path} (override)")
-            # self.log.info(f"to existing: {destination_path} (override)")
-        else:
-            self.log.info(f"     to: {destination_path}")
+        self.snapshot.rename(source_path, destination_path, self.preserve_sources)
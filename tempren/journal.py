@@ -0,0 +1,407 @@
+"""Journal of executed renames allowing to roll them back
+
+Journal is an append-only JSON lines file. Header is followed by records of
+planned renames (all of them are written and synced before the first one is
+executed), their completion and their rollback. Completion records are
+committed in groups - synced every `commit_interval` records or after
+`commit_delay` seconds - so after a crash the latest ones may be missing.
+State of such renames is reconciled with the filesystem when the journal
+is undone (see `find_executed_renames`).
+"""
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List, Optional, Tuple
+
+from tempren.filesystem import FileMover, FileRenamerType
+
+log = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+
+DEFAULT_COMMIT_INTERVAL = 256
+DEFAULT_COMMIT_DELAY = 0.1
+
+
+class JournalError(Exception):
+    pass
+
+
+def _truncate_incomplete_record(path: Path, chunk_size: int = 4096):
+    """Removes the last record if it wasn't completely written (ends without newline)"""
+    with open(path, "r+b") as journal_file:
+        position = journal_file.seek(0, os.SEEK_END)
+        while position > 0:
+            chunk_start = max(0, position - chunk_size)
+            journal_file.seek(chunk_start)
+            newline_index = journal_file.read(position - chunk_start).rfind(b"\n")
+            if newline_index != -1:
+                journal_file.truncate(chunk_start + newline_index + 1)
+                return
+            position = chunk_start
+        journal_file.truncate(0)
+
+
+class JournalWriter:
+    """Appends records to the journal file, syncing them in groups"""
+
+    path: Path
+    commit_interval: int
+    """Maximal number of records written before they are synced"""
+    commit_delay: float
+    """Maximal time (in seconds) since the last sync after which records are synced"""
+
+    _file: IO[str]
+    _uncommitted_records: int
+    _last_commit_time: float
+
+    def __init__(
+        self,
+        path: Path,
+        append: bool = False,
+        commit_interval: int = DEFAULT_COMMIT_INTERVAL,
+        commit_delay: float = DEFAULT_COMMIT_DELAY,
+    ):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.commit_delay = commit_delay
+        if append:
+            _truncate_incomplete_record(path)
+        # New journal must not override an existing one
+        self._file = open(path, "a" if append else "x", encoding="utf-8")
+        self._uncommitted_records = 0
+        self._last_commit_time = time.monotonic()
+
+    def write(self, record: Dict[str, Any], group_commit: bool = True):
+        """Writes the record, committing it with the group if it's due
+
+        :param group_commit: if false, record is committed by the next commit
+        """
+        self._file.write(json.dumps(record) + "\n")
+        self._uncommitted_records += 1
+        if group_commit and (
+            self._uncommitted_records >= self.commit_interval
+            or time.monotonic() - self._last_commit_time >= self.commit_delay
+        ):
+            self.commit()
+
+    def commit(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        log.debug("Committed %d journal records", self._uncommitted_records)
+        self._uncommitted_records = 0
+        self._last_commit_time = time.monotonic()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.commit()
+        self._file.close()
+
+    def __enter__(self) -> "JournalWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RenameJournal:
+    """Records renames executed by the pipeline
+
+    Journal file is created when the first renames are planned.
+    """
+
+    path: Path
+    input_directory: Path
+    """Directory to which (relative) paths of the renames are relative"""
+    sources_preserved: bool
+    """Destination files are created without removing the sources (e.g. copied)"""
+
+    _writer: Optional[JournalWriter] = None
+    _planned_ids: Dict[Tuple[Path, Path], int]
+    _next_id: int = 0
+
+    def __init__(
+        self, path: Path, input_directory: Path, sources_preserved: bool = False
+    ):
+        self.path = path.absolute()
+        self.input_directory = input_directory.absolute()
+        self.sources_preserved = sources_preserved
+        self._planned_ids = {}
+
+    def plan(self, renames: Iterable[Tuple[Path, Path]]):
+        """Records renames and commits them before any of them is executed"""
+        writer = self._open()
+        for source_path, destination_path in renames:
+            self._record_planned(writer, source_path, destination_path)
+        writer.commit()
+
+    def planned_id(self, source_path: Path, destination_path: Path) -> int:
+        """Returns id of the planned rename (recording it first, if it wasn't planned)"""
+        rename_id = self._planned_ids.get((source_path, destination_path))
+        if rename_id is None:
+            writer = self._open()
+            rename_id = self._record_planned(writer, source_path, destination_path)
+            writer.commit()
+        return rename_id
+
+    def complete(self, rename_id: int, override: bool = False):
+        record: Dict[str, Any] = {"type": "completed", "id": rename_id}
+        if override:
+            record["override"] = True
+        self._open().write(record)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def _open(self) -> JournalWriter:
+        if self._writer is None:
+            log.debug("Creating rename journal '%s'", self.path)
+            self._writer = JournalWriter(self.path)
+            self._writer.write(
+                {
+                    "type": "header",
+                    "version": JOURNAL_VERSION,
+                    "input_directory": str(self.input_directory),
+                    "sources_preserved": self.sources_preserved,
+                }
+            )
+        return self._writer
+
+    def _record_planned(
+        self, writer: JournalWriter, source_path: Path, destination_path: Path
+    ) -> int:
+        rename_id = self._next_id
+        self._next_id += 1
+        self._planned_ids[(source_path, destination_path)] = rename_id
+        # Planned renames are committed together
+        writer.write(
+            {
+                "type": "planned",
+                "id": rename_id,
+                "source": str(source_path),
+                "destination": str(destination_path),
+            },
+            group_commit=False,
+        )
+        return rename_id
+
+
+class JournalingRenamerWrapper:
+    """Records renames executed by the wrapped renamer in the journal"""
+
+    def __init__(self, renamer_to_wrap: FileRenamerType, journal: RenameJournal):
+        self.renamer = renamer_to_wrap
+        self.journal = journal
+
+    def __call__(
+        self, source_path: Path, destination_path: Path, override: bool = False
+    ):
+        rename_id = self.journal.planned_id(source_path, destination_path)
+        self.renamer(source_path, destination_path, override)
+        self.journal.complete(rename_id, override)
+
+
+@dataclass
+class JournaledRename:
+    id: int
+    source: Path
+    destination: Path
+    completed: bool = False
+    """Completion was recorded"""
+    override: bool = False
+    """Destination file was overridden"""
+    undone: bool = False
+
+
+@dataclass
+class JournalContents:
+    input_directory: Path
+    sources_preserved: bool
+    renames: List[JournaledRename]
+    """Renames in order of their (recorded or planned) execution"""
+
+
+def _field(
+    path: Path, line_number: int, record: Dict[str, Any], key: str, field_type: type
+) -> Any:
+    """Returns value of the record field checking its type"""
+    value = record.get(key)
+    # bool is a subclass of int, but isn't a valid id
+    if not isinstance(value, field_type) or (
+        isinstance(value, bool) and field_type is not bool
+    ):
+        raise JournalError(
+            f"Invalid record in line {line_number} of '{path}': "
+            f"'{key}' field is missing or is not a {field_type.__name__}"
+        )
+    return value
+
+
+def read_journal(path: Path) -> JournalContents:
+    """Reads the journal skipping the last record if it is incomplete"""
+    with open(path, encoding="utf-8") as journal_file:
+        lines = journal_file.read().splitlines()
+    records: List[Tuple[int, Dict[str, Any]]] = []
+    for line_number, line in enumerate(lines, 1):
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            if line_number == len(lines):
+                log.warning("Skipping incomplete record at the end of '%s'", path)
+                break
+            raise JournalError(
+                f"Invalid record in line {line_number} of '{path}': {error}"
+            ) from error
+        if not isinstance(record, dict):
+            raise JournalError(
+                f"Invalid record in line {line_number} of '{path}': not an object"
+            )
+        records.append((line_number, record))
+
+    if not records or records[0][1].get("type") != "header":
+        raise JournalError(f"'{path}' is not a rename journal")
+    header_line_number, header = records[0]
+    if header.get("version") != JOURNAL_VERSION:
+        raise JournalError(
+            f"Unsupported version of the rename journal: {header.get('version')}"
+        )
+    input_directory = Path(
+        _field(path, header_line_number, header, "input_directory", str)
+    )
+    sources_preserved = _field(
+        path, header_line_number, header, "sources_preserved", bool
+    )
+
+    renames: Dict[int, JournaledRename] = {}
+    completion_order: List[JournaledRename] = []
+    for line_number, record in records[1:]:
+        record_type = _field(path, line_number, record, "type", str)
+        rename_id = _field(path, line_number, record, "id", int)
+        if record_type == "planned":
+            renames[rename_id] = JournaledRename(
+                rename_id,
+                Path(_field(path, line_number, record, "source", str)),
+                Path(_field(path, line_number, record, "destination", str)),
+            )
+            continue
+        if rename_id not in renames:
+            raise JournalError(
+                f"Invalid record in line {line_number} of '{path}': "
+                f"rename {rename_id} was not planned"
+            )
+        rename = renames[rename_id]
+        if record_type == "completed":
+            rename.completed = True
+            rename.override = record.get("override", False)
+            completion_order.append(rename)
+        elif record_type == "undone":
+            rename.undone = True
+        else:
+            raise JournalError(f"Unknown journal record type: {record_type}")
+
+    # Renames without recorded completion could be executed only after the
+    # recorded ones (in order in which they were planned)
+    pending = [rename for rename in renames.values() if not rename.completed]
+    return JournalContents(
+        input_directory=input_directory,
+        sources_preserved=sources_preserved,
+        renames=completion_order + pending,
+    )
+
+
+def find_executed_renames(journal: JournalContents) -> List[JournaledRename]:
+    """Returns renames which are in effect (and were not undone) in order of execution
+
+    For moves, the filesystem decides whether the rename was executed: renames
+    are checked starting from the latest one and ones found executed are
+    reverted virtually, so the earlier renames (of the same paths) are checked
+    against the state they left.
+    Created copies and links cannot be distinguished from the files existing
+    before, so only renames with the recorded completion are considered.
+    """
+    candidates = [rename for rename in journal.renames if not rename.undone]
+    if journal.sources_preserved:
+        executed = []
+        for rename in candidates:
+            if not rename.completed:
+                log.debug(
+                    "Completion of '%s' -> '%s' was not recorded",
+                    rename.source,
+                    rename.destination,
+                )
+            elif os.path.lexists(journal.input_directory / rename.destination):
+                executed.append(rename)
+        return executed
+
+    virtual_paths: Dict[Path, bool] = {}
+
+    def _exists(path: Path) -> bool:
+        absolute_path = journal.input_directory / path
+        if absolute_path not in virtual_paths:
+            return os.path.lexists(absolute_path)
+        return virtual_paths[absolute_path]
+
+    executed = []
+    for rename in reversed(candidates):
+        if _exists(rename.destination) and not _exists(rename.source):
+            if not rename.completed:
+                log.info(
+                    "Rename of '%s' into '%s' was executed but not recorded",
+                    rename.source,
+                    rename.destination,
+                )
+            virtual_paths[journal.input_directory / rename.destination] = False
+            virtual_paths[journal.input_directory / rename.source] = True
+            executed.append(rename)
+        elif rename.completed:
+            log.warning(
+                "Renamed file '%s' was changed after it was renamed from '%s'",
+                rename.destination,
+                rename.source,
+            )
+    executed.reverse()
+    return executed
+
+
+def undo_renames(journal_path: Path) -> int:
+    """Reverts renames recorded in the journal (latest first)
+
+    Reverted renames are recorded in the same journal, so interrupted
+    rollback can be continued.
+
+    :returns: number of reverted renames
+    """
+    journal = read_journal(journal_path)
+    executed = find_executed_renames(journal)
+    log.info("Reverting %d renames", len(executed))
+    mover = FileMover()
+    reverted = 0
+    with JournalWriter(journal_path, append=True) as writer:
+        for rename in reversed(executed):
+            source_path = journal.input_directory / rename.source
+            destination_path = journal.input_directory / rename.destination
+            if rename.override:
+                log.warning(
+                    "File overridden by '%s' cannot be restored", destination_path
+                )
+            if not journal.sources_preserved:
+                log.debug("Moving '%s' back to '%s'", destination_path, source_path)
+                mover(destination_path, source_path, False)
+            elif os.path.lexists(source_path):
+                log.debug("Removing '%s'", destination_path)
+                os.unlink(destination_path)
+            else:
+                log.warning(
+                    "Keeping '%s' as its source '%s' no longer exists",
+                    destination_path,
+                    source_path,
+                )
+                continue
+            writer.write({"type": "undone", "id": rename.id})
+            reverted += 1
+    return reverted
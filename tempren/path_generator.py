@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path, PosixPath
-from typing import Any
+from typing import Any, List, Sequence
 
 
 @dataclass
@@ -39,11 +39,37 @@ class InvalidFilenameError(Exception):
         self.generated_name = invalid_name
 
 
+class PathGenerationError(Exception):
+    """Path generation failed for one of the files in the batch
+
+    Original exception is available as `__cause__`.
+    """
+
+    file: File
+
+    def __init__(self, file: File):
+        super().__init__(f"Could not generate path for {file!r}")
+        self.file = file
+
+
 class PathGenerator(ABC):
     @abstractmethod
     def generate(self, file: File) -> Path:
         raise NotImplementedError()
 
+    def generate_batch(self, files: Sequence[File]) -> List[Path]:
+        """Generates paths for multiple files at once
+
+        :raises PathGenerationError: if generation fails for one of the files
+        """
+        paths = []
+        for file in files:
+            try:
+                paths.append(self.generate(file))
+            except Exception as error:
+                raise PathGenerationError(file) from error
+        return paths
+
 
 class ExpressionEvaluationError(Exception):
     expression: str
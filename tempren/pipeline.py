@@ -1,9 +1,23 @@
 import logging
 import os
+import sys
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Callable, Iterable, Optional, Union
+from typing import (
+    AbstractSet,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NoReturn,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from tempren.file_filters import (
     FileFilterInverter,
@@ -15,24 +29,59 @@ from tempren.file_filters import (
 )
 from tempren.file_sorters import TemplateFileSorter
 from tempren.filesystem import (
+    ContainmentChecker,
     DestinationAlreadyExistsError,
     DryRunRenamer,
+    FileCopier,
+    FileDigestCache,
+    FileDigestRecorder,
     FileGatherer,
+    FileHardLinker,
     FileMover,
     FileRenamer,
     FileRenamerType,
+    FileSymlinker,
+    FilesystemSnapshot,
     FlatFileGatherer,
     InvalidDestinationError,
-    PrintingRenamerWrapper,
     RecursiveFileGatherer,
 )
-from tempren.path_generator import File, InvalidFilenameError, PathGenerator
+from tempren.journal import JournalingRenamerWrapper, RenameJournal
+from tempren.path_generator import (
+    File,
+    InvalidFilenameError,
+    PathGenerationError,
+    PathGenerator,
+)
+from tempren.plan_file import PlanFileHeader, PlanWriter, read_plan_renames
+from tempren.progress import Phase, ProgressPrinter, ProgressTracker
+from tempren.rename_planner import RenamePlan, RenamePlanner
+from tempren.report import (
+    HumanRenameReporter,
+    JsonLinesRenameReporter,
+    NulSeparatedRenameReporter,
+    RenameReporter,
+    ReportingRenamerWrapper,
+    SummaryRenameReporter,
+)
+from tempren.template.cache import default_template_cache
 from tempren.template.path_generators import (
     TemplateNameGenerator,
     TemplatePathGenerator,
 )
-from tempren.template.tree_builder import TagRegistry, TagTreeBuilder, TemplateError
-from tempren.template.tree_elements import Pattern
+from tempren.template.tree_builder import (
+    SharedTagInstances,
+    TagRegistry,
+    TagTreeBuilder,
+    TemplateError,
+)
+from tempren.template.tree_elements import (
+    Pattern,
+    SharedTagInstance,
+    find_shared_instances,
+    find_tags,
+    reads_file_contents,
+)
 
 log = logging.getLogger(__name__)
 
@@ -48,6 +97,34 @@ class OperationMode(Enum):
     path = "path"
 
 
+class OutputMode(Enum):
+    move = "move"
+    """Rename (move) source files"""
+
+    copy = "copy"
+    """Copy source files (sharing their data if the filesystem supports it)"""
+
+    reflink = "reflink"
+    """Create copies sharing data with the source files (requires btrfs, xfs or similar)"""
+
+    hardlink = "hardlink"
+    """Create hard links to the source files"""
+
+    symlink = "symlink"
+    """Create symbolic links to the source files"""
+
+
+class ReportFormat(Enum):
+    human = "human"
+    """Source and destination paths in separate lines"""
+
+    json = "json"
+    """JSON object (with source, destination and override fields) per line"""
+
+    nul = "nul"
+    """Source and destination paths terminated with NUL characters"""
+
+
 # TODO: Find a way to keep documentation close to the enum values and use it in argparser/generated help
 class ConflictResolutionStrategy(Enum):
     stop = "stop"
@@ -80,12 +157,43 @@ class RuntimeConfiguration:
     sort_invert: bool = False
     sort: Optional[str] = None
     mode: OperationMode = OperationMode.name
+    concurrency: int = 1
+    jobs: int = 1
+    output_mode: OutputMode = OutputMode.move
+    output_directory: Optional[Path] = None
+    """Root directory of generated paths (input directory is used by default)"""
+    verify_copies: bool = False
+    """Read copied files back (also when moved to other filesystem) to verify them"""
+    journal: Optional[Path] = None
+    """Path of the (new) journal recording renames, so they can be undone"""
+    plan_out: Optional[Path] = None
+    """Path of the (new) file to which generated renames are exported"""
+    apply_plan: Optional[Path] = None
+    """Path of the exported plan which renames are executed"""
+    report_format: ReportFormat = ReportFormat.human
+    quiet_summary: bool = False
+    """Report only the number of renames instead of listing them"""
+    progress: bool = False
+    """Display progress of the execution on the standard error"""
+    undo: Optional[Path] = None
+    """Path of the journal which renames are reverted (instead of renaming files)"""
 
 
 class ConfigurationError(Exception):
     pass
 
 
+def _include_all(file: File) -> bool:
+    return True
+
+
+def _file_size(file: File) -> int:
+    try:
+        return os.stat(file.relative_path).st_size
+    except OSError:
+        return 0
+
+
 def manual_resolver_placeholder(
     source_path: Path, destination_path: Path
 ) -> Union[ConflictResolutionStrategy, Path]:
@@ -99,10 +207,30 @@ class Pipeline:
     sorter: Optional[Callable[[Iterable[File]], Iterable[File]]] = None
     path_generator: PathGenerator
     conflict_strategy: ConflictResolutionStrategy = ConflictResolutionStrategy.stop
+    batch_size: int = 64
+    """Number of files for which new names are generated at once"""
+    _output_directory: Optional[Path] = None
+    preserve_sources: bool = False
+    """Source files are left in place (e.g. copied instead of being renamed)"""
+    journal: Optional[RenameJournal] = None
+    plan_writer: Optional[PlanWriter] = None
+    """Exports generated renames instead of executing them"""
+    applied_plan: Optional[Path] = None
+    """Plan file from which renames are loaded (instead of generating them)"""
+    snapshot: Optional[FilesystemSnapshot] = None
+    """Directory listings in which the renames are simulated (during the dry run)"""
+    reporter: Optional[RenameReporter] = None
+    progress: Optional[ProgressTracker] = None
+    phases_reading_contents: AbstractSet[Phase] = frozenset()
+    """Phases in which tags read whole contents of the files (reported as bytes read)"""
+    shared_tag_instances: Mapping[Phase, Sequence[SharedTagInstance]] = {}
+    """Tag instances shared between the templates, by the last phase evaluating them"""
+    file_digests: Optional[FileDigestCache] = None
+    """Digests calculated by the hash tags (reused to verify copies)"""
 
     def __init__(self):
         self.log = logging.getLogger(__name__)
-        self.file_filter: Callable[[File], bool] = lambda file: True
+        self.file_filter: Callable[[File], bool] = _include_all
         self.renamer: FileRenamerType = DryRunRenamer()
         self.manual_conflict_resolver: ManualConflictResolver = (
             manual_resolver_placeholder
@@ -116,84 +244,309 @@ class Pipeline:
     def input_directory(self, input_path: Path):
         self._input_directory = input_path.absolute()
 
+    @property
+    def output_directory(self) -> Optional[Path]:
+        return self._output_directory
+
+    @output_directory.setter
+    def output_directory(self, output_path: Optional[Path]):
+        self._output_directory = None if output_path is None else output_path.absolute()
+
     def execute(self):
+        try:
+            self._execute()
+        finally:
+            if self.file_digests is not None:
+                # Files can be modified after the run
+                self.file_digests.clear()
+
+    def _execute(self):
+        if self.applied_plan is None:
+            renames = self._generate_renames()
+        else:
+            os.chdir(self.input_directory)
+            containment_checker, root_description = self._containment_checker()
+            renames = [
+                (
+                    source_path,
+                    self._check_planned_destination(
+                        containment_checker,
+                        root_description,
+                        source_path,
+                        destination_path,
+                    ),
+                )
+                for source_path, destination_path in read_plan_renames(
+                    self.applied_plan
+                )
+            ]
+
+        if self.plan_writer is not None:
+            count = self.plan_writer.write(renames)
+            self.log.info(
+                "Plan of %d renames written to '%s'", count, self.plan_writer.path
+            )
+            return
+
+        self.log.debug("Planning %d renames", len(renames))
+        planner = RenamePlanner(
+            self.input_directory,
+            list_directory=os.listdir
+            if self.snapshot is None
+            else self.snapshot.list_directory,
+            preserve_sources=self.preserve_sources,
+        )
+        plan = planner.plan(renames)
+        if self.journal is not None:
+            self.journal.plan(
+                (rename.source, rename.destination)
+                for rename in plan.renames + plan.conflicts
+            )
+        self._start_phase(Phase.rename, len(plan.renames) + len(plan.conflicts))
+        try:
+            self._execute_plan(plan)
+            self._finish_phase()
+        finally:
+            if self.journal is not None:
+                self.journal.close()
+            if self.reporter is not None:
+                self.reporter.close()
+
+    def _generate_renames(self) -> List[Tuple[Path, Path]]:
+        try:
+            return self._generate_renames_with_shared_values()
+        finally:
+            for phase in self.shared_tag_instances:
+                self._forget_shared_values(phase)
+
+    def _generate_renames_with_shared_values(self) -> List[Tuple[Path, Path]]:
         all_files = []
         self.log.info(f"Gathering paths in {self.input_directory}")
         os.chdir(self.input_directory)
+        # Files are filtered as they are gathered (without keeping the rejected ones)
+        gather_phase = (
+            Phase.gather if self.file_filter is _include_all else Phase.filter
+        )
+        self._start_phase(gather_phase)
+        count_bytes = gather_phase in self.phases_reading_contents
         for file in self.file_gatherer.gather_in(self.input_directory):
             self.log.debug("Checking %s", file)
+            if self.progress is not None:
+                self.progress.advance(1, _file_size(file) if count_bytes else 0)
             if not self.file_filter(file):
                 self.log.debug("%s filtered out", file)
+                # Values of the rejected file won't be used by any later phase
+                for phase in self.shared_tag_instances:
+                    self._forget_shared_values(phase, [file])
                 continue
+            self._forget_shared_values(Phase.filter, [file])
             self.log.debug("%s considered for renaming", file)
             all_files.append(file)
+        self._finish_phase()
 
         self.log.info("%d files considered for renaming", len(all_files))
         if self.sorter:
             self.log.info("Sorting files")
-            all_files = self.sorter(all_files)
+            self._start_phase(Phase.sort, len(all_files))
+            all_files = list(self.sorter(all_files))
+            if self.progress is not None:
+                self.progress.advance(
+                    len(all_files),
+                    sum(map(_file_size, all_files))
+                    if Phase.sort in self.phases_reading_contents
+                    else 0,
+                )
+            self._finish_phase()
+            self._forget_shared_values(Phase.sort)
 
         self.log.debug("Generating new names")
-        # In case when destination file exists in the first run, we add such name to the
-        # backlog and try again (in reverse order) later. This should mitigate most of
-        # transitional conflicts.
-        backlog = []
-        for file in all_files:
-            try:
-                self.log.debug("Generating new name for %r", file)
-                new_relative_path = self.path_generator.generate(file)
-                self.log.debug("Generated path: '%s'", new_relative_path)
-            except InvalidFilenameError as error:
-                # TODO: Introduce flag similar to conflict resolver to take appropriate action
-                self.log.warning(
-                    "Invalid name generated for %r: %r",
-                    file,
-                    error.generated_name,
-                )
-                raise InvalidDestinationError()
-            except Exception as error:
-                # TODO: Test
-                self.log.error(
-                    "Error generated when renaming %r: %r",
-                    file,
-                    error,
+        containment_checker, root_description = self._containment_checker()
+        renames = []
+        self._start_phase(Phase.render, len(all_files))
+        for file, new_relative_path in self._generate_paths(list(all_files)):
+            # Renames use the normalized path (e.g. without '..' components)
+            normalized_path = containment_checker.normalize(new_relative_path)
+            if normalized_path is None:
+                raise InvalidDestinationError(
+                    f"Path generated for {file!r}: {new_relative_path} is not relative to the {root_description} directory",
                 )
-                raise
+            if self.output_directory is None:
+                if normalized_path == file.relative_path:
+                    self.log.info(
+                        "Skipping renaming of: '%s' (source and destination are the same)",
+                        new_relative_path,
+                    )
+                    continue
+                destination_path = normalized_path
+            else:
+                destination_path = self.output_directory / normalized_path
+            renames.append((file.relative_path, destination_path))
+        self._finish_phase()
+        return renames
 
-            if new_relative_path == file.relative_path:
-                self.log.info(
-                    "Skipping renaming of: '%s' (source and destination are the same)",
-                    new_relative_path,
-                )
-                continue
+    def _forget_shared_values(
+        self, phase: Phase, files: Optional[Sequence[File]] = None
+    ):
+        """Drops values cached by shared tag instances not evaluated after the phase
 
-            new_absolute_path = (file.input_directory / new_relative_path).resolve()
-            if not str(new_absolute_path).startswith(str(file.input_directory)):
-                raise InvalidDestinationError(
-                    f"Path generated for {file!r}: {new_relative_path} is not relative to the input directory",
-                )
+        :param files: drop only values of the files (all if None)
+        """
+        for shared_instance in self.shared_tag_instances.get(phase, ()):
+            if files is None:
+                shared_instance.clear()
+            else:
+                shared_instance.forget(files)
+
+    def _start_phase(self, phase: Phase, total: Optional[int] = None):
+        if self.progress is not None:
+            self.progress.start_phase(phase, total)
+
+    def _finish_phase(self):
+        if self.progress is not None:
+            self.progress.finish_phase()
+
+    def _containment_checker(self) -> Tuple[ContainmentChecker, str]:
+        """Returns checker of the destination paths and description of their root"""
+        if self.output_directory is None:
+            return ContainmentChecker(self.input_directory), "input"
+        return ContainmentChecker(self.output_directory), "output"
+
+    def _check_planned_destination(
+        self,
+        containment_checker: ContainmentChecker,
+        root_description: str,
+        source_path: Path,
+        destination_path: Path,
+    ) -> Path:
+        """Checks destination of the rename loaded from the (possibly edited) plan
+
+        :returns: normalized destination path
+        """
+        normalized_path = containment_checker.normalize(
+            self.input_directory / destination_path
+        )
+        if normalized_path is None:
+            raise InvalidDestinationError(
+                f"Planned path of '{source_path}': {destination_path} is not relative to the {root_description} directory",
+            )
+        if self.output_directory is None:
+            return normalized_path
+        return self.output_directory / normalized_path
+
+    def _execute_plan(self, plan: RenamePlan):
+        # Files moved to temporary names (breaking rename cycles)
+        used_temporaries: List[Path] = []
+        try:
+            self._execute_renames(plan, used_temporaries)
+        finally:
+            self._report_leftover_temporaries(plan, used_temporaries)
 
+    def _execute_renames(self, plan: RenamePlan, used_temporaries: List[Path]):
+        # Conflicts undetected by the planner (e.g. caused by concurrent changes
+        # in the input directory) are handled together with the planned ones
+        backlog = []
+        for rename in plan.renames:
             try:
-                self.renamer(file.relative_path, new_relative_path)
+                self.renamer(rename.source, rename.destination, False)
+                if rename.destination in plan.temporaries:
+                    used_temporaries.append(rename.destination)
             except FileExistsError:
                 self.log.debug(
-                    "Deferring renaming of %r as destination '%s' already exists",
-                    file,
-                    new_relative_path,
+                    "Deferring renaming of '%s' as destination '%s' already exists",
+                    rename.source,
+                    rename.destination,
                 )
-                backlog.append((file.relative_path, new_relative_path))
+                backlog.append(rename)
+                continue
+            if self.progress is not None:
+                self.progress.advance()
 
-        while backlog:
-            source_path, destination_path = backlog.pop()
+        for rename in backlog + plan.conflicts:
             self.log.debug(
-                "Trying again to rename '%s' into '%s'", source_path, destination_path
+                "Trying again to rename '%s' into '%s'",
+                rename.source,
+                rename.destination,
             )
             try:
-                self.renamer(source_path, destination_path)
+                self.renamer(rename.source, rename.destination, False)
+                if rename.destination in plan.temporaries:
+                    used_temporaries.append(rename.destination)
             except FileExistsError:
                 self.resolve_conflict(
-                    source_path, destination_path, self.conflict_strategy
+                    rename.source, rename.destination, self.conflict_strategy
                 )
+            if self.progress is not None:
+                self.progress.advance()
+
+    def _report_leftover_temporaries(
+        self, plan: RenamePlan, used_temporaries: List[Path]
+    ):
+        """Lists files which were not moved from their temporary names"""
+        if self.snapshot is not None:
+            # Nothing is renamed during the dry run
+            return
+        leftovers = [
+            temporary_path
+            for temporary_path in used_temporaries
+            if os.path.lexists(self.input_directory / temporary_path)
+        ]
+        if not leftovers:
+            return
+        self.log.error("%d files were left under temporary names:", len(leftovers))
+        for temporary_path in leftovers:
+            self.log.error(
+                "'%s' should be renamed to '%s'",
+                temporary_path,
+                plan.temporaries[temporary_path],
+            )
+
+    def _generate_paths(self, files: List[File]) -> Iterator[Tuple[File, Path]]:
+        """Generates new paths in batches of `batch_size` files"""
+        for batch_start in range(0, len(files), self.batch_size):
+            batch = files[batch_start : batch_start + self.batch_size]
+            self.log.debug("Generating new names for %d files", len(batch))
+            try:
+                new_relative_paths = self.path_generator.generate_batch(batch)
+            except PathGenerationError as error:
+                # Paths are not generated again, as stateful tags (e.g. Count)
+                # would be evaluated twice for the files preceding the failing one
+                self._report_generation_error(error.file, error.__cause__)
+            except Exception as error:
+                self.log.error(
+                    "Error generated when renaming one of %d files starting at %r: %r",
+                    len(batch),
+                    batch[0],
+                    error,
+                )
+                raise
+            self._forget_shared_values(Phase.render, batch)
+            if self.progress is not None:
+                self.progress.advance(
+                    len(batch),
+                    sum(map(_file_size, batch))
+                    if Phase.render in self.phases_reading_contents
+                    else 0,
+                )
+            yield from zip(batch, new_relative_paths)
+
+    def _report_generation_error(
+        self, file: File, error: Optional[BaseException]
+    ) -> NoReturn:
+        assert error is not None
+        if isinstance(error, InvalidFilenameError):
+            # TODO: Introduce flag similar to conflict resolver to take appropriate action
+            self.log.warning(
+                "Invalid name generated for %r: %r",
+                file,
+                error.generated_name,
+            )
+            raise InvalidDestinationError()
+        self.log.error(
+            "Error generated when renaming %r: %r",
+            file,
+            error,
+        )
+        raise error
 
     def resolve_conflict(
         self,
@@ -209,6 +562,8 @@ class Pipeline:
                 source_path,
                 destination_path,
             )
+            if self.reporter is not None:
+                self.reporter.report_skip(source_path, destination_path)
         elif strategy == ConflictResolutionStrategy.override:
             self.log.warning(
                 "Overriding destination '%s' as it already exists", destination_path
@@ -217,6 +572,9 @@ class Pipeline:
         elif strategy == ConflictResolutionStrategy.manual:
             if self.manual_conflict_resolver is None:
                 raise NotImplementedError("Manual conflict resolver not configured")
+            if self.reporter is not None:
+                # Renames executed so far are listed before the prompt
+                self.reporter.flush()
             user_selected_strategy = self.manual_conflict_resolver(
                 source_path, destination_path
             )
@@ -233,24 +591,28 @@ class Pipeline:
             )
 
 
-def build_tag_registry() -> TagRegistry:
-    log.debug("Building tag registry")
-    import tempren.tags
+def build_tag_registry(lazy: bool = True) -> TagRegistry:
+    """Creates registry of the built-in tags
 
+    :param lazy: import tag modules only when their tags are looked up
+    """
+    log.debug("Building tag registry")
     registry = TagRegistry()
-    registry.register_tags_in_package(tempren.tags)
+    if lazy:
+        from tempren.tags._manifest import TAG_MANIFEST
+
+        registry.register_tags_from_manifest(TAG_MANIFEST)
+    else:
+        import tempren.tags
+
+        registry.register_tags_in_package(tempren.tags)
     return registry
 
 
-def build_pipeline(
-    config: RuntimeConfiguration,
-    registry: TagRegistry,
-    manual_conflict_resolver: ManualConflictResolver,  # TODO: Move to the RuntimeConfiguration
-) -> Pipeline:
-    log.debug("Building pipeline")
-    pipeline = Pipeline()
-    pipeline.input_directory = config.input_directory
-    tree_builder = TagTreeBuilder()
+def _configure_path_generation(
+    pipeline: Pipeline, config: RuntimeConfiguration, registry: TagRegistry
+):
+    tree_builder = TagTreeBuilder(default_template_cache())
 
     if config.recursive:
         pipeline.file_gatherer = RecursiveFileGatherer()
@@ -259,18 +621,24 @@ def build_pipeline(
 
     pipeline.file_gatherer.include_hidden = config.include_hidden
 
+    # Tag invocations repeated in name, filter and sort templates are evaluated once
+    shared_instances: SharedTagInstances = {}
+
     def _compile_template(template_text: str) -> Pattern:
         log.debug("Compiling template %r", template_text)
         try:
-            return registry.bind(tree_builder.parse(template_text))
+            return registry.bind(tree_builder.parse(template_text), shared_instances)
         except TemplateError as template_error:
             template_error.template = template_text
             raise template_error
 
     bound_pattern = _compile_template(config.template)
+    phase_patterns = {Phase.render: bound_pattern}
 
     if config.mode == OperationMode.name:
-        pipeline.path_generator = TemplateNameGenerator(bound_pattern)
+        pipeline.path_generator = TemplateNameGenerator(
+            bound_pattern, config.concurrency, config.jobs
+        )
         if config.filter:
             if config.filter_type == FilterType.regex:
                 pipeline.file_filter = RegexFilenameFileFilter(config.filter)
@@ -279,10 +647,13 @@ def build_pipeline(
             elif config.filter_type == FilterType.template:
                 bound_filter_pattern = _compile_template(config.filter)
                 pipeline.file_filter = TemplateFileFilter(bound_filter_pattern)
+                phase_patterns[Phase.filter] = bound_filter_pattern
             else:
                 raise NotImplementedError("Unknown filter type")
     elif config.mode == OperationMode.path:
-        pipeline.path_generator = TemplatePathGenerator(bound_pattern)
+        pipeline.path_generator = TemplatePathGenerator(
+            bound_pattern, config.concurrency, config.jobs
+        )
         if config.filter:
             if config.filter_type == FilterType.regex:
                 pipeline.file_filter = RegexPathFileFilter(config.filter)
@@ -291,6 +662,7 @@ def build_pipeline(
             elif config.filter_type == FilterType.template:
                 bound_filter_pattern = _compile_template(config.filter)
                 pipeline.file_filter = TemplateFileFilter(bound_filter_pattern)
+                phase_patterns[Phase.filter] = bound_filter_pattern
             else:
                 raise NotImplementedError("Unknown filter type")
     else:
@@ -302,20 +674,136 @@ def build_pipeline(
     if config.sort:
         bound_sorter_pattern = _compile_template(config.sort)
         pipeline.sorter = TemplateFileSorter(bound_sorter_pattern, config.sort_invert)
+        phase_patterns[Phase.sort] = bound_sorter_pattern
+    pipeline.phases_reading_contents = {
+        phase
+        for phase, pattern in phase_patterns.items()
+        if reads_file_contents(pattern)
+    }
+    pipeline.shared_tag_instances = _shared_instances_by_last_phase(phase_patterns)
+    if pipeline.file_digests is not None:
+        for pattern in phase_patterns.values():
+            for tag in find_tags(pattern):
+                if isinstance(tag, FileDigestRecorder):
+                    tag.file_digests = pipeline.file_digests
+
+    pipeline.batch_size = max(pipeline.batch_size, config.concurrency)
+    if config.jobs > 1:
+        # Each worker process should receive a chunk large enough to amortize
+        # the inter-process communication
+        pipeline.batch_size = max(pipeline.batch_size, config.jobs * 256)
+
+
+def _shared_instances_by_last_phase(
+    phase_patterns: Mapping[Phase, Pattern]
+) -> Dict[Phase, List[SharedTagInstance]]:
+    """Groups shared tag instances by the last phase in which they are evaluated"""
+    last_phases: Dict[int, Tuple[Phase, SharedTagInstance]] = {}
+    for phase in (Phase.filter, Phase.sort, Phase.render):
+        if phase in phase_patterns:
+            for shared_instance in find_shared_instances(phase_patterns[phase]):
+                last_phases[id(shared_instance)] = (phase, shared_instance)
+    instances_by_phase: Dict[Phase, List[SharedTagInstance]] = {}
+    for phase, shared_instance in last_phases.values():
+        instances_by_phase.setdefault(phase, []).append(shared_instance)
+    return instances_by_phase
+
+
+def build_pipeline(
+    config: RuntimeConfiguration,
+    registry: TagRegistry,
+    manual_conflict_resolver: ManualConflictResolver,  # TODO: Move to the RuntimeConfiguration
+) -> Pipeline:
+    log.debug("Building pipeline")
+    pipeline = Pipeline()
+    pipeline.input_directory = config.input_directory
+    if config.verify_copies:
+        # Digests calculated by the hash tags are reused to verify copies
+        pipeline.file_digests = FileDigestCache()
+    if config.apply_plan is None:
+        _configure_path_generation(pipeline, config, registry)
+    else:
+        # Paths are loaded from the plan, so no template is compiled (and no
+        # tag module is loaded)
+        pipeline.applied_plan = config.apply_plan
+    if config.plan_out is not None:
+        pipeline.plan_writer = PlanWriter(
+            config.plan_out,
+            PlanFileHeader(
+                pipeline.input_directory,
+                config.mode.value,
+                config.output_mode.value,
+                None
+                if config.output_directory is None
+                else config.output_directory.absolute(),
+            ),
+        )
 
     pipeline.conflict_strategy = config.conflict_strategy
     pipeline.manual_conflict_resolver = manual_conflict_resolver
 
+    pipeline.output_directory = config.output_directory
+    pipeline.preserve_sources = config.output_mode != OutputMode.move
+
     if config.dry_run:
-        pipeline.renamer = DryRunRenamer()
-        # FIXME: Use DryRunMover for path mode?
-    else:
-        if config.mode == OperationMode.name:
+        # Renames are simulated using listings made while gathering the files
+        pipeline.snapshot = FilesystemSnapshot(pipeline.input_directory)
+        if config.apply_plan is None:
+            pipeline.file_gatherer.snapshot = pipeline.snapshot
+        pipeline.renamer = DryRunRenamer(pipeline.snapshot, pipeline.preserve_sources)
+    elif config.output_mode == OutputMode.move:
+        if config.output_directory is not None:
+            # Files are moved to a different directory tree
+            pipeline.renamer = FileMover(
+                verify_copies=config.verify_copies, file_digests=pipeline.file_digests
+            )
+        elif config.mode == OperationMode.name:
             pipeline.renamer = FileRenamer()
         elif config.mode == OperationMode.path:
-            pipeline.renamer = FileMover()
+            pipeline.renamer = FileMover(
+                verify_copies=config.verify_copies, file_digests=pipeline.file_digests
+            )
         else:
             raise NotImplementedError("Unknown operation mode")
+    elif config.output_mode == OutputMode.copy:
+        pipeline.renamer = FileCopier(
+            verify=config.verify_copies, file_digests=pipeline.file_digests
+        )
+    elif config.output_mode == OutputMode.reflink:
+        pipeline.renamer = FileCopier(clone_only=True)
+    elif config.output_mode == OutputMode.hardlink:
+        pipeline.renamer = FileHardLinker()
+    elif config.output_mode == OutputMode.symlink:
+        pipeline.renamer = FileSymlinker()
+    else:
+        raise NotImplementedError("Unknown output mode")
 
-    pipeline.renamer = PrintingRenamerWrapper(pipeline.renamer)  # type: ignore
+    if config.journal is not None and not config.dry_run:
+        pipeline.journal = RenameJournal(
+            config.journal, config.input_directory, pipeline.preserve_sources
+        )
+        pipeline.renamer = JournalingRenamerWrapper(pipeline.renamer, pipeline.journal)
+
+    pipeline.reporter = _create_reporter(config)
+    if config.progress:
+        progress_printer = ProgressPrinter(sys.stderr)
+        pipeline.progress = ProgressTracker(progress_printer, progress_printer.interval)
+    if pipeline.reporter is not None:
+        pipeline.renamer = ReportingRenamerWrapper(pipeline.renamer, pipeline.reporter)
     return pipeline
+
+
+def _create_reporter(config: RuntimeConfiguration) -> Optional[RenameReporter]:
+    if config.quiet_summary:
+        return SummaryRenameReporter(sys.stdout)
+    elif config.report_format == ReportFormat.json:
+        return JsonLinesRenameReporter(sys.stdout)
+    elif config.report_format == ReportFormat.nul:
+        return NulSeparatedRenameReporter(sys.stdout)
+    elif config.report_format == ReportFormat.human:
+        # Listing of renames is hidden by decreased verbosity
+        if not log.isEnabledFor(logging.INFO):
+            return None
+        return HumanRenameReporter(sys.stdout)
+    else:
+        raise NotImplementedError("Unknown report format")
@@ -0,0 +1,184 @@
+"""Rename plans exported to JSON lines files (and applied from them)
+
+Generation of new paths may take much longer than renaming the files, so both
+can be done separately. Exported plan stores generated paths together with
+the identity (device, inode, size and modification time) of the source files,
+so files modified in the meantime are not renamed using outdated paths.
+"""
+import json
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+PLAN_FILE_VERSION = 1
+
+
+class PlanFileError(Exception):
+    pass
+
+
+@dataclass
+class PlanFileHeader:
+    input_directory: Path
+    mode: str
+    """Value of the operation mode used to generate the paths"""
+    output_mode: str
+    """Value of the output mode the plan should be applied with"""
+    output_directory: Optional[Path] = None
+
+
+def _identity(stat_result: os.stat_result) -> Dict[str, int]:
+    return {
+        "device": stat_result.st_dev,
+        "inode": stat_result.st_ino,
+        "size": stat_result.st_size,
+        "mtime_ns": stat_result.st_mtime_ns,
+    }
+
+
+class PlanWriter:
+    path: Path
+    header: PlanFileHeader
+
+    def __init__(self, path: Path, header: PlanFileHeader):
+        self.path = path.absolute()
+        self.header = header
+
+    def write(self, renames: Iterable[Tuple[Path, Path]]) -> int:
+        """Writes renames (with paths relative to the input directory) to a new plan file
+
+        :returns: number of written renames
+        """
+        count = 0
+        with open(self.path, "x", encoding="utf-8") as plan_file:
+            try:
+                plan_file.write(self._header_record() + "\n")
+                for source_path, destination_path in renames:
+                    record = {
+                        "type": "rename",
+                        "source": str(source_path),
+                        "destination": str(destination_path),
+                        **_identity(os.stat(self.header.input_directory / source_path)),
+                    }
+                    plan_file.write(json.dumps(record) + "\n")
+                    count += 1
+            except BaseException:
+                # Incomplete plan must not be applied
+                os.unlink(self.path)
+                raise
+        return count
+
+    def _header_record(self) -> str:
+        output_directory = self.header.output_directory
+        return json.dumps(
+            {
+                "type": "header",
+                "version": PLAN_FILE_VERSION,
+                "input_directory": str(self.header.input_directory),
+                "mode": self.header.mode,
+                "output_mode": self.header.output_mode,
+                "output_directory": None
+                if output_directory is None
+                else str(output_directory),
+            }
+        )
+
+
+def _read_records(path: Path) -> Iterable[Tuple[int, Dict[str, Any]]]:
+    """Reads records (JSON objects) together with their line numbers"""
+    with open(path, encoding="utf-8") as plan_file:
+        for line_number, line in enumerate(plan_file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                raise PlanFileError(
+                    f"Invalid record in line {line_number} of '{path}': {error}"
+                ) from error
+            if not isinstance(record, dict):
+                raise PlanFileError(
+                    f"Invalid record in line {line_number} of '{path}': not an object"
+                )
+            yield line_number, record
+
+
+def _field(
+    path: Path,
+    line_number: int,
+    record: Dict[str, Any],
+    key: str,
+    field_type: type,
+    optional: bool = False,
+) -> Any:
+    """Returns value of the record field checking its type"""
+    value = record.get(key)
+    if value is None and optional:
+        return None
+    # bool is a subclass of int, but isn't a valid number in the plan
+    if not isinstance(value, field_type) or isinstance(value, bool):
+        raise PlanFileError(
+            f"Invalid record in line {line_number} of '{path}': "
+            f"'{key}' field is missing or is not a {field_type.__name__}"
+        )
+    return value
+
+
+def _parse_header(
+    path: Path, numbered_record: Optional[Tuple[int, Dict[str, Any]]]
+) -> PlanFileHeader:
+    if numbered_record is None or numbered_record[1].get("type") != "header":
+        raise PlanFileError(f"'{path}' is not a rename plan")
+    line_number, record = numbered_record
+    if record.get("version") != PLAN_FILE_VERSION:
+        raise PlanFileError(
+            f"Unsupported version of the rename plan: {record.get('version')}"
+        )
+    output_directory = _field(
+        path, line_number, record, "output_directory", str, optional=True
+    )
+    return PlanFileHeader(
+        input_directory=Path(_field(path, line_number, record, "input_directory", str)),
+        mode=_field(path, line_number, record, "mode", str),
+        output_mode=_field(path, line_number, record, "output_mode", str),
+        output_directory=None if output_directory is None else Path(output_directory),
+    )
+
+
+def read_plan_header(path: Path) -> PlanFileHeader:
+    return _parse_header(path, next(iter(_read_records(path)), None))
+
+
+def read_plan_renames(path: Path) -> List[Tuple[Path, Path]]:
+    """Reads planned renames skipping ones with changed (or missing) source files"""
+    records = iter(_read_records(path))
+    header = _parse_header(path, next(records, None))
+    renames = []
+    skipped = 0
+    for line_number, record in records:
+        if record.get("type") != "rename":
+            raise PlanFileError(f"Unknown plan record type: {record.get('type')}")
+        source_path = Path(_field(path, line_number, record, "source", str))
+        destination_path = Path(_field(path, line_number, record, "destination", str))
+        planned_identity = {
+            key: _field(path, line_number, record, key, int)
+            for key in ("device", "inode", "size", "mtime_ns")
+        }
+        try:
+            identity = _identity(os.stat(header.input_directory / source_path))
+        except FileNotFoundError:
+            identity = None
+        if identity != planned_identity:
+            log.warning(
+                "Skipping '%s' as it was changed after the plan was created",
+                source_path,
+            )
+            skipped += 1
+            continue
+        renames.append((source_path, destination_path))
+    log.info("%d renames loaded from '%s' (%d skipped)", len(renames), path, skipped)
+    return renames
@@ -0,0 +1,174 @@
+"""Progress of the pipeline execution
+
+Counters are kept by the `ProgressTracker` which passes them to the callback
+at most once per `interval` seconds (and when the phase starts or finishes),
+so it can be used to display progress or embed tempren in other programs.
+"""
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from enum import Enum
+from typing import Callable, Optional, TextIO
+
+DEFAULT_INTERVAL = 0.5
+
+TERMINAL_INTERVAL = 0.2
+"""Interval of updates displayed in the terminal (overwriting the same line)"""
+PLAIN_INTERVAL = 10.0
+"""Interval of updates written as separate lines (e.g. to a log file)"""
+
+
+class Phase(Enum):
+    gather = "gather"
+    """Searching for files in the input directory"""
+
+    filter = "filter"
+    """Selecting files to rename"""
+
+    sort = "sort"
+    """Ordering files before new paths are generated"""
+
+    render = "render"
+    """Generating new paths from the template"""
+
+    rename = "rename"
+    """Renaming (copying or linking) files"""
+
+
+@dataclass
+class Progress:
+    phase: Phase
+    completed: int
+    """Number of files processed in the current phase"""
+    total: Optional[int]
+    """Number of files to process in the current phase (if known)"""
+    elapsed: float
+    """Time (in seconds) since the phase started"""
+    bytes_read: int = 0
+    """Size of the files which contents were read by the tags"""
+    finished: bool = False
+    """The phase is finished"""
+
+    @property
+    def files_per_second(self) -> float:
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_read / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated time (in seconds) remaining to finish the phase"""
+        if self.total is None or not self.completed:
+            return None
+        return (self.total - self.completed) * self.elapsed / self.completed
+
+
+ProgressCallback = Callable[[Progress], None]
+
+
+class ProgressTracker:
+    callback: ProgressCallback
+    interval: float
+    """Minimal time (in seconds) between callback invocations"""
+
+    _phase: Optional[Phase] = None
+    _total: Optional[int] = None
+    _completed: int = 0
+    _bytes_read: int = 0
+    _phase_start_time: float = 0.0
+    _next_update_time: float = 0.0
+
+    def __init__(self, callback: ProgressCallback, interval: float = DEFAULT_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+
+    def start_phase(self, phase: Phase, total: Optional[int] = None):
+        self._phase = phase
+        self._total = total
+        self._completed = 0
+        self._bytes_read = 0
+        self._phase_start_time = time.monotonic()
+        self._update(self._phase_start_time)
+
+    def advance(self, count: int = 1, bytes_read: int = 0):
+        self._completed += count
+        self._bytes_read += bytes_read
+        now = time.monotonic()
+        if now >= self._next_update_time:
+            self._update(now)
+
+    def finish_phase(self):
+        self._update(time.monotonic(), finished=True)
+
+    def _update(self, now: float, finished: bool = False):
+        assert self._phase is not None, "Phase was not started"
+        self._next_update_time = now + self.interval
+        self.callback(
+            Progress(
+                self._phase,
+                self._completed,
+                self._total,
+                now - self._phase_start_time,
+                self._bytes_read,
+                finished,
+            )
+        )
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = "TiB"
+    return f"{size:.1f} {unit}"
+
+
+def format_progress(progress: Progress) -> str:
+    if progress.total is None:
+        parts = [f"{progress.phase.value}: {progress.completed} files"]
+    else:
+        percentage = (
+            progress.completed * 100 // progress.total if progress.total else 100
+        )
+        parts = [
+            f"{progress.phase.value}: {progress.completed}/{progress.total} files ({percentage}%)"
+        ]
+    parts.append(f"{progress.files_per_second:.0f} files/s")
+    if progress.bytes_read:
+        parts.append(f"{_format_size(progress.bytes_per_second)}/s")
+    if progress.finished:
+        parts.append(f"took {timedelta(seconds=round(progress.elapsed))}")
+    elif progress.eta is not None:
+        parts.append(f"ETA {timedelta(seconds=round(progress.eta))}")
+    return ", ".join(parts)
+
+
+class ProgressPrinter:
+    """Displays progress in the (updated) terminal line or in separate lines"""
+
+    stream: TextIO
+    interactive: bool
+    interval: float
+    """Suggested interval of the updates"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.interactive = stream.isatty()
+        self.interval = TERMINAL_INTERVAL if self.interactive else PLAIN_INTERVAL
+
+    def __call__(self, progress: Progress):
+        if self.interactive:
+            # Line is cleared after the (possibly shorter) text
+            self.stream.write(
+                f"\r{format_progress(progress)}\x1b[K"
+                + ("\n" if progress.finished else "")
+            )
+        elif progress.completed or progress.finished:
+            self.stream.write(format_progress(progress) + "\n")
+        else:
+            return
+        self.stream.flush()
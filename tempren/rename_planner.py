@@ -0,0 +1,196 @@
+"""Planning of renames before they are executed
+
+All new paths are known before the first file is renamed, so collisions can be
+detected in memory - against an index of names existing in the destination
+directories (listed once) and names claimed by other renames. Renames forming
+chains (a -> b, b -> c) are ordered so that each destination is freed before it
+is used and cycles (a -> b, b -> a) are broken with temporary names.
+"""
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+TEMPORARY_NAME_PREFIX = ".tempren-"
+
+
+@dataclass(frozen=True)
+class Rename:
+    source: Path
+    destination: Path
+
+
+@dataclass
+class RenamePlan:
+    renames: List[Rename] = field(default_factory=list)
+    """Renames (including temporary ones) which can be executed in this order"""
+
+    conflicts: List[Rename] = field(default_factory=list)
+    """Renames whose destination is already taken (in order of their dependencies)"""
+
+    temporaries: Dict[Path, Path] = field(default_factory=dict)
+    """Temporary paths breaking the cycles mapped to the final destinations"""
+
+
+def _normalized(path: Path) -> Path:
+    return Path(os.path.normpath(path))
+
+
+class RenamePlanner:
+    input_directory: Path
+    list_directory: Callable[[Path], Iterable[str]]
+    """Returns names of entries in the directory (used to build the name index)"""
+    preserve_sources: bool
+    """Source files are kept in place (e.g. copied), so their paths stay taken"""
+
+    def __init__(
+        self,
+        input_directory: Path,
+        list_directory: Callable[[Path], Iterable[str]] = os.listdir,
+        preserve_sources: bool = False,
+    ):
+        self.input_directory = input_directory
+        self.list_directory = list_directory
+        self.preserve_sources = preserve_sources
+
+    def plan(self, renames: Iterable[Tuple[Path, Path]]) -> RenamePlan:
+        """Plans renames of paths relative to the input directory
+
+        If multiple files are renamed to the same path, the first one (in order
+        of provided renames) claims it and the remaining ones end up as conflicts.
+        """
+        candidates = [
+            Rename(source, destination)
+            for source, destination in renames
+            if source != destination
+        ]
+        existing_paths = self._index_existing_paths(
+            rename.destination for rename in candidates
+        )
+        planned, conflicts = self._detect_conflicts(
+            candidates, existing_paths, self.preserve_sources
+        )
+        taken_paths = existing_paths | {
+            _normalized(rename.destination) for rename in planned
+        }
+        temporaries: Dict[Path, Path] = {}
+        return RenamePlan(
+            renames=self._order(planned, taken_paths, temporaries),
+            conflicts=self._order(conflicts),
+            temporaries=temporaries,
+        )
+
+    def _index_existing_paths(self, destinations: Iterable[Path]) -> Set[Path]:
+        existing_paths: Set[Path] = set()
+        directories = {_normalized(destination).parent for destination in destinations}
+        for directory in directories:
+            try:
+                names = self.list_directory(self.input_directory / directory)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            existing_paths.update(directory / name for name in names)
+        log.debug(
+            "Indexed %d paths in %d directories", len(existing_paths), len(directories)
+        )
+        return existing_paths
+
+    @staticmethod
+    def _detect_conflicts(
+        candidates: List[Rename], existing_paths: Set[Path], preserve_sources: bool
+    ) -> Tuple[List[Rename], List[Rename]]:
+        sources: Set[Path] = set()
+        if not preserve_sources:
+            sources = {_normalized(rename.source) for rename in candidates}
+        claimed_paths: Set[Path] = set()
+        conflicting: Set[Rename] = set()
+        for rename in candidates:
+            destination = _normalized(rename.destination)
+            occupied = destination in existing_paths and destination not in sources
+            if occupied or destination in claimed_paths:
+                conflicting.add(rename)
+            else:
+                claimed_paths.add(destination)
+
+        # Sources of conflicting renames stay in place, so renames into them
+        # become conflicts as well
+        by_destination = {
+            _normalized(rename.destination): rename
+            for rename in candidates
+            if rename not in conflicting
+        }
+        pending = list(conflicting)
+        while pending:
+            blocked = by_destination.get(_normalized(pending.pop().source))
+            if blocked is not None and blocked not in conflicting:
+                conflicting.add(blocked)
+                pending.append(blocked)
+
+        planned = [rename for rename in candidates if rename not in conflicting]
+        conflicts = [rename for rename in candidates if rename in conflicting]
+        return planned, conflicts
+
+    @staticmethod
+    def _order(
+        renames: List[Rename],
+        taken_paths: Optional[Set[Path]] = None,
+        temporaries: Optional[Dict[Path, Path]] = None,
+    ) -> List[Rename]:
+        """Orders renames so the destination of each one is freed before it is used
+
+        :param taken_paths: paths which cannot be used as temporary names
+            (if not provided, cycles are left unbroken)
+        :param temporaries: receives used temporary paths (with final destinations)
+        """
+        by_source: Dict[Path, Rename] = {
+            _normalized(rename.source): rename for rename in renames
+        }
+        ordered: List[Rename] = []
+        done: Set[Rename] = set()
+        for rename in renames:
+            # Renames blocking each other form disjoint chains and cycles
+            chain: List[Rename] = []
+            chain_members: Set[Rename] = set()
+            current: Optional[Rename] = rename
+            while (
+                current is not None
+                and current not in done
+                and current not in chain_members
+            ):
+                chain.append(current)
+                chain_members.add(current)
+                current = by_source.get(_normalized(current.destination))
+            done.update(chain)
+            if current not in chain_members or taken_paths is None:
+                # Chain ends with a free destination (or the one freed earlier)
+                ordered.extend(reversed(chain))
+                continue
+
+            # Destinations are unique, so the cycle starts with the first rename
+            assert current is rename
+            temporary_path = RenamePlanner._temporary_path(rename.source, taken_paths)
+            log.debug(
+                "Breaking rename cycle of %d files with '%s'",
+                len(chain),
+                temporary_path,
+            )
+            if temporaries is not None:
+                temporaries[temporary_path] = rename.destination
+            ordered.append(Rename(rename.source, temporary_path))
+            ordered.extend(reversed(chain[1:]))
+            ordered.append(Rename(temporary_path, rename.destination))
+        return ordered
+
+    @staticmethod
+    def _temporary_path(source: Path, taken_paths: Set[Path]) -> Path:
+        index = 0
+        while True:
+            temporary_path = source.with_name(
+                f"{TEMPORARY_NAME_PREFIX}{index}-{source.name}"
+            )
+            if _normalized(temporary_path) not in taken_paths:
+                taken_paths.add(_normalized(temporary_path))
+                return temporary_path
+            index += 1
@@ -0,0 +1,133 @@
+"""Reports of executed renames
+
+Reported renames are formatted into a buffer which is written to the stream
+in batches - every `flush_interval` records or after `flush_delay` seconds -
+so listing millions of renames doesn't go through the logging machinery
+(and doesn't flush the terminal for each of them).
+"""
+import json
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, TextIO
+
+from tempren.filesystem import FileRenamerType
+
+DEFAULT_FLUSH_INTERVAL = 1024
+DEFAULT_FLUSH_DELAY = 0.5
+
+
+class RenameReporter(ABC):
+    stream: TextIO
+    flush_interval: int
+    """Maximal number of buffered records"""
+    flush_delay: float
+    """Maximal time (in seconds) since the last flush after which records are written"""
+    renamed: int
+    overridden: int
+    """Number of renames which overrode the destination file (included in `renamed`)"""
+    skipped: int
+    """Number of renames skipped due to the conflict"""
+
+    _buffer: List[str]
+    _last_flush_time: float
+
+    def __init__(
+        self,
+        stream: TextIO,
+        flush_interval: int = DEFAULT_FLUSH_INTERVAL,
+        flush_delay: float = DEFAULT_FLUSH_DELAY,
+    ):
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.flush_delay = flush_delay
+        self.renamed = 0
+        self.overridden = 0
+        self.skipped = 0
+        self._buffer = []
+        self._last_flush_time = time.monotonic()
+
+    def report_rename(self, source_path: Path, destination_path: Path, override: bool):
+        self.renamed += 1
+        if override:
+            self.overridden += 1
+        record = self._format(source_path, destination_path, override)
+        if record:
+            self._buffer.append(record)
+            if (
+                len(self._buffer) >= self.flush_interval
+                or time.monotonic() - self._last_flush_time >= self.flush_delay
+            ):
+                self.flush()
+
+    def report_skip(self, source_path: Path, destination_path: Path):
+        self.skipped += 1
+
+    @abstractmethod
+    def _format(self, source_path: Path, destination_path: Path, override: bool) -> str:
+        """Formats the record of the rename (empty records are not written)"""
+        raise NotImplementedError()
+
+    def flush(self):
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self._buffer.clear()
+        self.stream.flush()
+        self._last_flush_time = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+
+class HumanRenameReporter(RenameReporter):
+    def _format(self, source_path: Path, destination_path: Path, override: bool) -> str:
+        if override:
+            return (
+                f"Renamed: {source_path}\n         to: {destination_path} (override)\n"
+            )
+        return f"Renamed: {source_path}\n     to: {destination_path}\n"
+
+
+class JsonLinesRenameReporter(RenameReporter):
+    def _format(self, source_path: Path, destination_path: Path, override: bool) -> str:
+        record = {
+            "source": str(source_path),
+            "destination": str(destination_path),
+            "override": override,
+        }
+        return json.dumps(record) + "\n"
+
+
+class NulSeparatedRenameReporter(RenameReporter):
+    """Reports source and destination paths terminated with NUL characters"""
+
+    def _format(self, source_path: Path, destination_path: Path, override: bool) -> str:
+        return f"{source_path}\0{destination_path}\0"
+
+
+class SummaryRenameReporter(RenameReporter):
+    """Reports only the number of renames (when closed)"""
+
+    def _format(self, source_path: Path, destination_path: Path, override: bool) -> str:
+        return ""
+
+    def close(self):
+        self.stream.write(
+            f"Renamed {self.renamed} files "
+            f"({self.overridden} overridden, {self.skipped} skipped)\n"
+        )
+        self.flush()
+
+
+class ReportingRenamerWrapper:
+    """Reports renames executed by the wrapped renamer"""
+
+    def __init__(self, renamer_to_wrap: FileRenamerType, reporter: RenameReporter):
+        self.renamer = renamer_to_wrap
+        self.reporter = reporter
+
+    def __call__(
+        self, source_path: Path, destination_path: Path, override: bool = False
+    ):
+        self.renamer(source_path, destination_path, override)
+        self.reporter.report_rename(source_path, destination_path, override)
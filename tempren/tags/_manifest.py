@@ -0,0 +1,85 @@
+"""Tags defined in the tag modules (see `tempren.template.tag_manifest`)
+
+This file is generated - do not edit it manually.
+"""
+TAG_MANIFEST = {
+    "tempren.tags.audio": [
+        "Album",
+        "Artist",
+        "BitRate",
+        "BitsPerSample",
+        "Channels",
+        "Comment",
+        "Duration",
+        "Genre",
+        "SampleRate",
+        "Title",
+        "Track",
+        "Year",
+    ],
+    "tempren.tags.core": [
+        "AsDuration",
+        "AsInt",
+        "AsSize",
+        "AsTime",
+        "Base",
+        "Count",
+        "Default",
+        "Dir",
+        "Eval",
+        "Ext",
+        "IsMime",
+        "Mime",
+        "MimeExt",
+        "Name",
+        "Round",
+        "Sanitize",
+    ],
+    "tempren.tags.filesystem": [
+        "Group",
+        "MTime",
+        "Owner",
+        "Size",
+    ],
+    "tempren.tags.hash": [
+        "Crc32",
+        "Md5",
+        "Sha1",
+        "Sha224",
+        "Sha256",
+    ],
+    "tempren.tags.image": [
+        "AspectRatio",
+        "ColorMode",
+        "Exif",
+        "Format",
+        "Height",
+        "IsOrientation",
+        "MPx",
+        "Width",
+    ],
+    "tempren.tags.text": [
+        "Capitalize",
+        "Collapse",
+        "Lower",
+        "Pad",
+        "Remove",
+        "Replace",
+        "SplitCase",
+        "Strip",
+        "Title",
+        "Trim",
+        "Unidecode",
+        "Upper",
+    ],
+    "tempren.tags.video": [
+        "AspectRatio",
+        "BitRate",
+        "Duration",
+        "FrameCount",
+        "FrameRate",
+        "Height",
+        "VideoCodec",
+        "Width",
+    ],
+}
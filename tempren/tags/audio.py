@@ -14,6 +14,7 @@ class MutagenTagBase(Tag, ABC):
     """Extracts audio metadata (tags) using mutagen library"""
 
     require_context = False
+    cost = 100
 
     tag_key: str
 
@@ -1,18 +1,18 @@
 import datetime
+import functools
 import itertools
 import mimetypes
 from collections import defaultdict
 from math import ceil, floor
-from pathlib import Path
-from typing import Any, Optional, Union
-
-import isodate
-import magic
-import pathvalidate
+from pathlib import Path, PurePath
+from typing import TYPE_CHECKING, Any, List, Optional, Sequence, Union
 
 from tempren.path_generator import evaluate_expression
 from tempren.template.path_generators import File
-from tempren.template.tree_elements import Tag
+from tempren.template.tree_elements import GeneratedDocstring, Tag
+
+if TYPE_CHECKING:
+    import magic
 
 mimetypes.init()
 
@@ -21,6 +21,7 @@ class CountTag(Tag):
     """Generates sequential numbers for each invocation"""
 
     require_context = False
+    stateful = True
     step: int
     width: int
     _common_counter: Optional[int] = None
@@ -75,8 +76,10 @@ class ExtTag(Tag):
     """
 
     require_context = None
+    pure = True
+    context_types = (PurePath,)
 
-    def process(self, file: File, context: Optional[str]) -> str:
+    def process(self, file: File, context: Optional[Union[str, PurePath]]) -> str:
         if context:
             return str(Path(context).suffix)
         return str(file.relative_path.suffix)
@@ -90,8 +93,10 @@ class BaseTag(Tag):
     """
 
     require_context = None
+    pure = True
+    context_types = (PurePath,)
 
-    def process(self, file: File, context: Optional[str]) -> str:
+    def process(self, file: File, context: Optional[Union[str, PurePath]]) -> str:
         if context:
             return Path(context).stem
         return file.relative_path.stem
@@ -105,8 +110,10 @@ class DirTag(Tag):
     """
 
     require_context = None
+    pure = True
+    context_types = (PurePath,)
 
-    def process(self, file: File, context: Optional[str]) -> Path:
+    def process(self, file: File, context: Optional[Union[str, PurePath]]) -> Path:
         if context:
             return Path(context).parent
         return file.relative_path.parent
@@ -116,8 +123,10 @@ class NameTag(Tag):
     """File name (basename with extension)"""
 
     require_context = None
+    pure = True
+    context_types = (PurePath,)
 
-    def process(self, file: File, context: Optional[str]) -> str:
+    def process(self, file: File, context: Optional[Union[str, PurePath]]) -> str:
         if context:
             return str(Path(context).name)
         return str(file.relative_path.name)
@@ -127,16 +136,34 @@ class SanitizeTag(Tag):
     """Removes filesystem-unsafe characters from provided context"""
 
     require_context = True
+    pure = True
 
     def process(self, file: File, context: Optional[str]) -> str:
         assert context
+        import pathvalidate
+
         return str(pathvalidate.sanitize_filepath(context))
 
 
+def _detect_mime_types(files: Sequence[File]) -> List[str]:
+    """Detects MIME types of multiple files using a single libmagic handle"""
+    detector = _mime_detector()
+    return [detector.from_file(file.absolute_path) for file in files]
+
+
+@functools.lru_cache(maxsize=None)
+def _mime_detector() -> "magic.Magic":
+    """Returns libmagic handle (created on first use) detecting MIME types"""
+    import magic
+
+    return magic.Magic(mime=True)
+
+
 class MimeTag(Tag):
     """MIME type of processed file"""
 
     require_context = False
+    cost = 100
     select_type: bool = False
     select_subtype: bool = False
 
@@ -149,7 +176,15 @@ class MimeTag(Tag):
         self.select_subtype = subtype
 
     def process(self, file: File, context: Optional[str]) -> str:
-        mime_type = magic.from_file(file.absolute_path, mime=True)
+        mime_type = _mime_detector().from_file(file.absolute_path)
+        return self._select_sections(mime_type)
+
+    def process_batch(
+        self, files: Sequence[File], contexts: Sequence[Any]
+    ) -> List[Any]:
+        return list(map(self._select_sections, _detect_mime_types(files)))
+
+    def _select_sections(self, mime_type: str) -> str:
         if self.select_type and not self.select_subtype:
             return mime_type.split("/")[0]
         elif not self.select_type and self.select_subtype:
@@ -161,16 +196,26 @@ class MimeExtTag(Tag):
     """File extension guessed from MIME type"""
 
     require_context = False
+    cost = 100
 
     def process(self, file: File, context: Optional[str]) -> str:
-        mime_type = magic.from_file(file.absolute_path, mime=True)
+        mime_type = _mime_detector().from_file(file.absolute_path)
         return str(mimetypes.guess_extension(mime_type, False))
 
+    def process_batch(
+        self, files: Sequence[File], contexts: Sequence[Any]
+    ) -> List[Any]:
+        return [
+            str(mimetypes.guess_extension(mime_type, False))
+            for mime_type in _detect_mime_types(files)
+        ]
+
 
 class IsMimeTag(Tag):
     """Checks if processed file MIME type matches provided value"""
 
     require_context = False
+    cost = 100
     expected_type_prefix: str
 
     def configure(self, type_prefix: str):  # type: ignore
@@ -181,14 +226,23 @@ class IsMimeTag(Tag):
         self.expected_type_prefix = type_prefix
 
     def process(self, file: File, context: Optional[str]) -> Any:
-        mime_type = magic.from_file(file.absolute_path, mime=True)
+        mime_type = _mime_detector().from_file(file.absolute_path)
         return mime_type.startswith(self.expected_type_prefix)
 
+    def process_batch(
+        self, files: Sequence[File], contexts: Sequence[Any]
+    ) -> List[Any]:
+        return [
+            mime_type.startswith(self.expected_type_prefix)
+            for mime_type in _detect_mime_types(files)
+        ]
+
 
 class DefaultTag(Tag):
     """Returns default value if context is empty"""
 
     require_context = True
+    pure = True
 
     default_value: Any
 
@@ -211,6 +265,8 @@ class AsSizeTag(Tag):
     """
 
     require_context = True
+    pure = True
+    context_types = (int, float)
 
     target_unit_multiplier: int
     precision_digits: Optional[int]
@@ -242,7 +298,7 @@ class AsSizeTag(Tag):
             raise ValueError("Precision have to be positive")
         self.precision_digits = ndigits
 
-    def process(self, file: File, context: Optional[str]) -> str:
+    def process(self, file: File, context: Optional[Union[str, int, float]]) -> str:
         assert context is not None
         size_in_bytes = float(context)
         size_in_target_unit = size_in_bytes / self.target_unit_multiplier
@@ -254,6 +310,8 @@ class RoundTag(Tag):
     """Round provided numeric value to specified number of decimal digits"""
 
     require_context = True
+    pure = True
+    context_types = (int, float)
 
     precision_digits: int
     direction: Optional[bool]
@@ -276,7 +334,7 @@ class RoundTag(Tag):
             self.direction = None
         self.precision_digits = ndigits
 
-    def process(self, file: File, context: Optional[str]) -> Any:
+    def process(self, file: File, context: Optional[Union[str, int, float]]) -> Any:
         assert context is not None
         number = float(context)
         if self.direction is None:
@@ -294,6 +352,7 @@ class EvalTag(Tag):
     """Evaluate context as a Python expression"""
 
     require_context = True
+    pure = True
 
     def configure(self):
         super().configure()
@@ -307,6 +366,8 @@ class AsTimeTag(Tag):
     """Re-format provided date-time (in ISO 8601 representation)"""
 
     require_context = True
+    pure = True
+    context_types = (datetime.datetime,)
 
     destination_format: str
 
@@ -316,15 +377,18 @@ class AsTimeTag(Tag):
         """
         self.destination_format = format
 
-    def process(self, file: File, context: Optional[str]) -> str:  # type: ignore
+    def process(self, file: File, context: Optional[Union[str, datetime.datetime]]) -> str:  # type: ignore
         assert context is not None
-        parsed_datetime = datetime.datetime.fromisoformat(context)
+        if isinstance(context, datetime.datetime):
+            parsed_datetime = context
+        else:
+            parsed_datetime = datetime.datetime.fromisoformat(context)
         return parsed_datetime.strftime(self.destination_format)
 
 
-AsTimeTag.__doc__ = "\n".join(
-    [
-        str(AsTimeTag.__doc__),
+AsTimeTag.__doc__ = GeneratedDocstring(  # type: ignore
+    AsTimeTag.__doc__,
+    lambda: [
         """Possible fields:
 Date
   %a\t Abbreviated weekday name ("Mon")
@@ -357,7 +421,7 @@ Time
 Other
   %c\t System dependent date and time representation
   %%\t "%" character itself""",
-    ]
+    ],
 )
 
 
@@ -365,6 +429,8 @@ class AsDurationTag(Tag):
     """Re-format provided duration (in ISO 8601 representation)"""
 
     require_context = True
+    pure = True
+    context_types = (datetime.timedelta,)
 
     destination_format: str
 
@@ -374,15 +440,20 @@ class AsDurationTag(Tag):
         """
         self.destination_format = format
 
-    def process(self, file: File, context: Optional[str]) -> str:  # type: ignore
+    def process(self, file: File, context: Optional[Union[str, datetime.timedelta]]) -> str:  # type: ignore
         assert context is not None
-        parsed_duration = isodate.parse_duration(context)
+        import isodate
+
+        if isinstance(context, datetime.timedelta):
+            parsed_duration = context
+        else:
+            parsed_duration = isodate.parse_duration(context)
         return isodate.strftime(parsed_duration, self.destination_format)
 
 
-AsDurationTag.__doc__ = "\n".join(
-    [
-        str(AsDurationTag.__doc__),
+AsDurationTag.__doc__ = GeneratedDocstring(  # type: ignore
+    AsDurationTag.__doc__,
+    lambda: [
         """Possible fields:
   %j\t Zero-prefixed day of the year (001..366)
   %d\t Zero-prefixed day of the month (01..31)
@@ -400,7 +471,7 @@ AsDurationTag.__doc__ = "\n".join(
   %P\t ISO8601 duration format
   %p\t ISO8601 duration format in weeks
   %%\t "%" character itself""",
-    ]
+    ],
 )
 
 
@@ -411,6 +482,7 @@ class AsIntTag(Tag):
     """Converts integer from the context from one base to another (removing leading zeros if necessary)"""
 
     require_context = True
+    pure = True
 
     src_base: int
     dst_base: int
@@ -1,6 +1,6 @@
 import datetime
 import os.path
-from typing import Any, Optional
+from typing import Any, List, Optional, Sequence
 
 from tempren.path_generator import File
 from tempren.template.tree_elements import Tag
@@ -10,6 +10,7 @@ class SizeTag(Tag):
     """File size in bytes"""
 
     require_context = False
+    cost = 10
 
     def process(self, file: File, context: Optional[str]) -> int:
         assert context is None
@@ -20,6 +21,7 @@ class MTimeTag(Tag):
     """File modification time (in ISO 8601 format)"""
 
     require_context = False
+    cost = 10
 
     def process(self, file: File, context: Optional[str]) -> Any:
         assert context is None
@@ -32,17 +34,41 @@ class OwnerTag(Tag):
     """Name of the user owning processed file"""
 
     require_context = False
+    cost = 10
 
     def process(self, file: File, context: Optional[str]) -> str:
         # TODO: Maybe if context is present parse it as a path?
         return file.absolute_path.owner()
 
+    def process_batch(
+        self, files: Sequence[File], contexts: Sequence[Any]
+    ) -> List[Any]:
+        import pwd
+
+        file_stats = [os.stat(file.absolute_path) for file in files]
+        # Name is looked up just once for each distinct id
+        uids = {file_stat.st_uid for file_stat in file_stats}
+        user_names = {uid: pwd.getpwuid(uid).pw_name for uid in uids}
+        return [user_names[file_stat.st_uid] for file_stat in file_stats]
+
 
 class GroupTag(Tag):
     """Name of the group owning processed file"""
 
     require_context = False
+    cost = 10
 
     def process(self, file: File, context: Optional[str]) -> str:
         # TODO: Maybe if context is present parse it as a path?
         return file.absolute_path.group()
+
+    def process_batch(
+        self, files: Sequence[File], contexts: Sequence[Any]
+    ) -> List[Any]:
+        import grp
+
+        file_stats = [os.stat(file.absolute_path) for file in files]
+        # Name is looked up just once for each distinct id
+        gids = {file_stat.st_gid for file_stat in file_stats}
+        group_names = {gid: grp.getgrgid(gid).gr_name for gid in gids}
+        return [group_names[file_stat.st_gid] for file_stat in file_stats]
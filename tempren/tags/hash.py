@@ -1,12 +1,15 @@
 import hashlib
 import zlib
+from abc import ABC
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Iterator, List, Optional, Sequence
 
+from tempren.filesystem import FileDigestRecorder
 from tempren.path_generator import File
 from tempren.template.tree_elements import Tag
 
 CHUNK_SIZE = 4096
+BATCH_CHUNK_SIZE = 1024 * 1024
 
 
 def _calculate_hash(algorithm, path: Path, chunk_size: int) -> str:
@@ -16,50 +19,80 @@ def _calculate_hash(algorithm, path: Path, chunk_size: int) -> str:
     return algorithm.hexdigest()
 
 
-class Md5Tag(Tag):
-    """MD5 hash of the file"""
+def _read_chunks(path: Path, buffer: memoryview) -> Iterator[memoryview]:
+    """Reads file contents into the (reused) buffer
+
+    Yielded chunks are valid only until the next one is read.
+    """
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            read_size = f.readinto(buffer)
+            if not read_size:
+                break
+            yield buffer[:read_size]
+
+
+class HashlibTagBase(Tag, FileDigestRecorder, ABC):
+    """Base for tags calculating file hash using hashlib algorithm"""
 
     require_context = False
+    cost = 1000
+
+    algorithm: Callable[[], Any]
 
     def process(self, file: File, context: Optional[str]) -> str:
         assert context is None
-        return _calculate_hash(hashlib.md5(), file.absolute_path, CHUNK_SIZE)
+        algorithm = self.algorithm()
+        digest = _calculate_hash(algorithm, file.absolute_path, CHUNK_SIZE)
+        # Copies of the file can be verified against the same digest
+        self.record_digest(file.absolute_path, algorithm.name, digest)
+        return digest
+
+    def process_batch(
+        self, files: Sequence[File], contexts: Sequence[Any]
+    ) -> List[Any]:
+        # Single, larger buffer is shared by all files in the batch
+        buffer = memoryview(bytearray(BATCH_CHUNK_SIZE))
+        hashes = []
+        for file in files:
+            algorithm = self.algorithm()
+            for chunk in _read_chunks(file.absolute_path, buffer):
+                algorithm.update(chunk)
+            digest = algorithm.hexdigest()
+            self.record_digest(file.absolute_path, algorithm.name, digest)
+            hashes.append(digest)
+        return hashes
+
+
+class Md5Tag(HashlibTagBase):
+    """MD5 hash of the file"""
 
+    algorithm = hashlib.md5
 
-class Sha1Tag(Tag):
-    """SHA1 hash of the file"""
 
-    require_context = False
+class Sha1Tag(HashlibTagBase):
+    """SHA1 hash of the file"""
 
-    def process(self, file: File, context: Optional[str]) -> str:
-        assert context is None
-        return _calculate_hash(hashlib.sha1(), file.absolute_path, CHUNK_SIZE)
+    algorithm = hashlib.sha1
 
 
-class Sha256Tag(Tag):
+class Sha256Tag(HashlibTagBase):
     """SHA256 hash of the file"""
 
-    require_context = False
+    algorithm = hashlib.sha256
 
-    def process(self, file: File, context: Optional[str]) -> str:
-        assert context is None
-        return _calculate_hash(hashlib.sha256(), file.absolute_path, CHUNK_SIZE)
 
-
-class Sha224Tag(Tag):
+class Sha224Tag(HashlibTagBase):
     """SHA224 hash of the file"""
 
-    require_context = False
-
-    def process(self, file: File, context: Optional[str]) -> str:
-        assert context is None
-        return _calculate_hash(hashlib.sha224(), file.absolute_path, CHUNK_SIZE)
+    algorithm = hashlib.sha224
 
 
 class Crc32Tag(Tag):
     """CRC32 hash of the file"""
 
     require_context = False
+    cost = 1000
 
     def process(self, file: File, context: Optional[str]) -> str:
         assert context is None
@@ -68,3 +101,15 @@ class Crc32Tag(Tag):
             for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
                 hash_value = zlib.crc32(chunk, hash_value)
         return f"{hash_value:08x}"
+
+    def process_batch(
+        self, files: Sequence[File], contexts: Sequence[Any]
+    ) -> List[Any]:
+        buffer = memoryview(bytearray(BATCH_CHUNK_SIZE))
+        hashes = []
+        for file in files:
+            hash_value = 0
+            for chunk in _read_chunks(file.absolute_path, buffer):
+                hash_value = zlib.crc32(chunk, hash_value)
+            hashes.append(f"{hash_value:08x}")
+        return hashes
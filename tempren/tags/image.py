@@ -1,4 +1,3 @@
-import itertools
 from abc import ABC, abstractmethod
 from fractions import Fraction
 from typing import Any, Iterator, Optional, Tuple
@@ -12,6 +11,7 @@ from PIL import Image
 from tempren.path_generator import File
 from tempren.template.tree_elements import (
     FileNotSupportedError,
+    GeneratedDocstring,
     MissingMetadataError,
     Tag,
 )
@@ -21,6 +21,7 @@ class PillowTagBase(Tag, ABC):
     """Base for tags extracting metadata from images using Pillow library"""
 
     require_context = False
+    cost = 100
 
     def process(self, file: File, context: Optional[str]) -> Any:
         try:
@@ -128,6 +129,8 @@ class IsOrientationTag(PillowTagBase):
 class ExifTag(Tag):
     """Extract value of any EXIF tag"""
 
+    cost = 100
+
     tag_id: int
     tag_type: int
 
@@ -180,9 +183,11 @@ def _generate_exif_tag_list() -> Iterator[str]:
             yield f"  {tag_name} ({tag_type})"
 
 
-ExifTag.__doc__ = "\n".join(
-    itertools.chain(
-        [str(ExifTag.__doc__), "Available tag names:"],
-        sorted(set(_generate_exif_tag_list())),
-    )
+def _generate_exif_tag_documentation() -> Iterator[str]:
+    yield "Available tag names:"
+    yield from sorted(set(_generate_exif_tag_list()))
+
+
+ExifTag.__doc__ = GeneratedDocstring(  # type: ignore
+    ExifTag.__doc__, _generate_exif_tag_documentation
 )
@@ -12,6 +12,7 @@ class UnidecodeTag(Tag):
     """Replace special unicode characters in context with ASCII equivalents"""
 
     require_context = True
+    pure = True
 
     def process(self, file: File, context: Optional[str]) -> str:
         assert context is not None
@@ -22,6 +23,7 @@ class RemoveTag(Tag):
     """Remove parts of the context based on RegEx patterns"""
 
     require_context = True
+    pure = True
     patterns: List[Pattern]
 
     def configure(self, *patterns: str, ignore_case: bool = False):  # type: ignore
@@ -42,6 +44,7 @@ class ReplaceTag(Tag):
     """Replaces regex pattern with specified replacement"""
 
     require_context = True
+    pure = True
     pattern: Pattern
     replacement: str
 
@@ -59,6 +62,7 @@ class CollapseTag(Tag):
     """Collapse specified repeating characters in context"""
 
     require_context = True
+    pure = True
     pattern: Pattern
 
     def configure(self, characters: str = " "):  # type: ignore
@@ -74,6 +78,7 @@ class UpperTag(Tag):
     """Makes context uppercase"""
 
     require_context = True
+    pure = True
 
     def process(self, file: File, context: Optional[str]) -> str:
         assert context is not None
@@ -84,6 +89,7 @@ class LowerTag(Tag):
     """Makes context lowercase"""
 
     require_context = True
+    pure = True
 
     def process(self, file: File, context: Optional[str]) -> str:
         assert context is not None
@@ -94,6 +100,7 @@ class StripTag(Tag):
     """Removes dangling characters on the ends of provided context"""
 
     require_context = True
+    pure = True
     strip_characters: str = " "
     left: bool = False
     right: bool = False
@@ -116,6 +123,7 @@ class TrimTag(Tag):
     """Trims context to a specified width by cropping left/right side off"""
 
     require_context = True
+    pure = True
     width: int
     left: bool = False
     right: bool = False
@@ -148,6 +156,7 @@ class CapitalizeTag(Tag):
     """Capitalizes first letter of the context"""
 
     require_context = True
+    pure = True
 
     def process(self, file: File, context: Optional[str]) -> str:
         assert context is not None
@@ -158,6 +167,7 @@ class TitleTag(Tag):
     """Capitalizes first letter of every word in the context"""
 
     require_context = True
+    pure = True
 
     def process(self, file: File, context: Optional[str]) -> str:
         assert context is not None
@@ -168,6 +178,7 @@ class PadTag(Tag):
     """Adds padding to the context to match specified width"""
 
     require_context = True
+    pure = True
     width: int
     character: str = " "
     left: bool = False
@@ -200,6 +211,7 @@ class SplitCaseTag(Tag):
     """Split text into words on the case boundary"""
 
     require_context = True
+    pure = True
     separator: str
     _pattern = re.compile(r"([a-z])([A-Z])")
 
@@ -18,6 +18,7 @@ if not MediaInfo.can_parse():
 
 class MediaInfoTagBase(Tag, ABC):
     require_context = False
+    cost = 100
 
     def process(self, file: File, context: Optional[str]) -> Any:
         media_info = MediaInfo.parse(file.absolute_path)
@@ -0,0 +1,150 @@
+"""Concurrent rendering of bound pattern trees
+
+Tags of the same file and of different files are awaited concurrently (by default
+`Tag.aprocess` runs `Tag.process` in a thread pool), so I/O-bound tags (e.g. hashes
+or media metadata on network storage) don't wait for each other. Number of files
+rendered at once is limited by a semaphore.
+
+Stateful tags (e.g. `Count`) depend on the order of invocations, so they are
+evaluated beforehand - sequentially, in order of the rendered files.
+
+Consecutive batches are rendered in the same event loop and thread pool, which
+are created on the first use and closed together with the renderer.
+"""
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from tempren.path_generator import File
+
+from .tree_elements import (
+    ConstantTagValue,
+    MissingMetadataError,
+    Pattern,
+    PatternElement,
+    SharedTagInstance,
+    TagInstance,
+    find_stateful_instances,
+    typed_context,
+)
+
+
+class _FileRenderer:
+    """Renders pattern tree for a single file"""
+
+    file: File
+    stateful_values: Dict[int, Any]
+    """Values of stateful tag instances (indexed by the instance id)"""
+
+    def __init__(self, file: File, stateful_values: Dict[int, Any]):
+        self.file = file
+        self.stateful_values = stateful_values
+
+    async def render(self, pattern: Pattern) -> str:
+        values = await asyncio.gather(
+            *(self.evaluate(sub_element) for sub_element in pattern.sub_elements)
+        )
+        return "".join(map(str, values))
+
+    async def render_value(self, pattern: Pattern) -> Any:
+        """Asynchronous version of `Pattern.process_as_value`"""
+        if len(pattern.sub_elements) == 1 and isinstance(
+            pattern.sub_elements[0], (TagInstance, ConstantTagValue)
+        ):
+            return await self.evaluate(pattern.sub_elements[0])
+        return await self.render(pattern)
+
+    async def evaluate(self, element: PatternElement) -> Any:
+        if isinstance(element, Pattern):
+            return await self.render(element)
+        if isinstance(element, SharedTagInstance):
+            return await element.aevaluate_once(self.file, self._evaluate_tag(element))
+        if isinstance(element, TagInstance):
+            return await self._evaluate_tag(element)(self.file)
+        return element.process(self.file)
+
+    def _evaluate_tag(self, tag_instance: TagInstance):
+        async def evaluate(file: File) -> Any:
+            if id(tag_instance) in self.stateful_values:
+                return self.stateful_values[id(tag_instance)]
+            context = await self._evaluate_context(tag_instance)
+            try:
+                return await tag_instance.tag.aprocess(file, context)
+            except MissingMetadataError:
+                return ""
+
+        return evaluate
+
+    async def _evaluate_context(self, tag_instance: TagInstance) -> Any:
+        if tag_instance.context is None:
+            return None
+        if tag_instance.tag.context_types:
+            return typed_context(
+                await self.render_value(tag_instance.context),
+                tag_instance.tag.context_types,
+            )
+        return await self.render(tag_instance.context)
+
+
+class AsyncPatternRenderer:
+    """Renders pattern for multiple files concurrently"""
+
+    pattern: Pattern
+    concurrency: int
+    """Maximal number of files rendered at once"""
+    _stateful_instances: List[TagInstance]
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __init__(self, pattern: Pattern, concurrency: int):
+        assert concurrency > 0, "concurrency limit have to be positive"
+        self.pattern = pattern
+        self.concurrency = concurrency
+        self._stateful_instances = find_stateful_instances(pattern)
+
+    def render_all(self, files: Sequence[File]) -> List[str]:
+        """Renders pattern for all files
+
+        :returns: rendered values in the order of provided files
+        """
+        return self._get_loop().run_until_complete(self._render_all(files))
+
+    def close(self):
+        """Closes the event loop and its thread pool"""
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._loop.set_default_executor(
+                ThreadPoolExecutor(max_workers=self.concurrency)
+            )
+            weakref.finalize(self, self._loop.close)
+        return self._loop
+
+    async def _render_all(self, files: Sequence[File]) -> List[str]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def render(file_renderer: _FileRenderer) -> str:
+            async with semaphore:
+                return await file_renderer.render(self.pattern)
+
+        file_renderers = [self._prepare(file) for file in files]
+        renders = [
+            asyncio.ensure_future(render(renderer)) for renderer in file_renderers
+        ]
+        try:
+            return list(await asyncio.gather(*renders))
+        except BaseException:
+            # Loop is reused, so renders of other files can't be left pending
+            for pending_render in renders:
+                pending_render.cancel()
+            raise
+
+    def _prepare(self, file: File) -> _FileRenderer:
+        stateful_values: Dict[int, Any] = {}
+        for tag_instance in self._stateful_instances:
+            stateful_values[id(tag_instance)] = tag_instance.process(file)
+        return _FileRenderer(file, stateful_values)
@@ -0,0 +1,120 @@
+"""On-disk cache of parsed (unbound) template trees
+
+Parsing a template requires loading ANTLR runtime together with generated
+lexer/parser modules. When the same templates are used over and over again
+(especially ones requiring the ANTLR parser), parsed pattern trees can be
+stored in the user cache directory and reused by the consecutive invocations.
+Templates handled by the descent parser are parsed faster than they are loaded
+from the cache, so the cache is used only if the TEMPREN_TEMPLATE_CACHE
+environment variable is set (to a non-empty value).
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .tree_elements import Pattern
+
+CACHE_FORMAT_VERSION = 1
+"""Should be changed whenever pickled tree elements change in incompatible way"""
+
+ENABLE_CACHE_VARIABLE = "TEMPREN_TEMPLATE_CACHE"
+
+
+def default_cache_directory() -> Path:
+    """Returns directory for the cached templates (following XDG specification)"""
+    cache_home = os.environ.get("XDG_CACHE_HOME", None)
+    if cache_home:
+        cache_root = Path(cache_home)
+    else:
+        cache_root = Path.home() / ".cache"
+    return cache_root / "tempren" / "templates"
+
+
+def default_template_cache() -> Optional["TemplateCache"]:
+    """Returns cache in the default directory (or None if it wasn't enabled)"""
+    if not os.environ.get(ENABLE_CACHE_VARIABLE):
+        return None
+    return TemplateCache(default_cache_directory())
+
+
+def code_version(package_directory: Path) -> str:
+    """Identifies the modules of the package by their names, sizes and modification times
+
+    Changes to the parsers or tree elements (e.g. in a source checkout) result
+    in a different version, so stale pattern trees are not loaded.
+    """
+    version = hashlib.sha256()
+    with os.scandir(package_directory) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            if entry.name.endswith(".py"):
+                stat_result = entry.stat()
+                version.update(
+                    f"{entry.name}\0{stat_result.st_size}\0{stat_result.st_mtime_ns}\0".encode()
+                )
+    return version.hexdigest()
+
+
+class TemplateCache:
+    """Stores parsed pattern trees keyed by template text and version of the code"""
+
+    log: logging.Logger
+    directory: Path
+    _version: Optional[str]
+
+    def __init__(self, directory: Path, version: Optional[str] = None):
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.directory = directory
+        self._version = version
+
+    @property
+    def version(self) -> str:
+        # Modules are checked only when the cache is actually used
+        if self._version is None:
+            self._version = code_version(Path(__file__).parent)
+        return self._version
+
+    def _entry_path(self, text: str) -> Path:
+        key = "\0".join((str(CACHE_FORMAT_VERSION), self.version, text))
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.pickle"
+
+    def load(self, text: str) -> Optional[Pattern]:
+        """Returns cached pattern tree or None if the template was not cached yet"""
+        entry_path = self._entry_path(text)
+        try:
+            with open(entry_path, "rb") as entry_file:
+                pattern = pickle.load(entry_file)
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            self.log.debug("Could not load cached template %r: %s", text, exc)
+            return None
+        if not isinstance(pattern, Pattern) or pattern.source_representation != text:
+            self.log.debug("Invalid cache entry found for template %r", text)
+            return None
+        self.log.debug("Using cached pattern tree for template %r", text)
+        return pattern
+
+    def store(self, text: str, pattern: Pattern):
+        """Saves pattern tree in the cache (errors are silently ignored)"""
+        entry_path = self._entry_path(text)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Entry is written to a temporary file first, so concurrent invocations
+            # never see a partially written entry
+            file_descriptor, temporary_path = tempfile.mkstemp(
+                dir=self.directory, suffix=".tmp"
+            )
+            try:
+                with os.fdopen(file_descriptor, "wb") as entry_file:
+                    pickle.dump(pattern, entry_file, pickle.HIGHEST_PROTOCOL)
+                os.replace(temporary_path, entry_path)
+            except BaseException:
+                os.unlink(temporary_path)
+                raise
+        except Exception as exc:
+            self.log.debug("Could not cache template %r: %s", text, exc)
@@ -0,0 +1,170 @@
+"""Translation of bound pattern trees into specialized Python functions
+
+`Pattern.process` interprets the element tree on every invocation - for each file
+it walks all sub-elements, renders tag contexts recursively and joins intermediate
+strings. The compiler performs this walk only once: it generates a source of
+a single render function (with raw text inlined as constants and tag contexts
+passed directly as nested expressions) and compiles it with the interpreter.
+"""
+from typing import Any, Callable, Dict, List, Tuple
+
+from tempren.path_generator import File
+
+from .tree_elements import (
+    ConstantTagValue,
+    MissingMetadataError,
+    Pattern,
+    PatternElement,
+    RawText,
+    SharedTagInstance,
+    TagInstance,
+    typed_context,
+)
+
+RenderFunction = Callable[[File], str]
+
+_COMPILED_FILENAME = "<tempren-template>"
+
+
+class _PatternCompiler:
+    """Generates source code of the function rendering pattern"""
+
+    namespace: Dict[str, Any]
+    definitions: List[str]
+    _name_counter: int
+
+    def __init__(self):
+        self.namespace = {
+            "MissingMetadataError": MissingMetadataError,
+            "str": str,
+            "typed_context": typed_context,
+        }
+        self.definitions = []
+        self._name_counter = 0
+
+    def _unique_name(self, prefix: str) -> str:
+        self._name_counter += 1
+        return f"_{prefix}{self._name_counter}"
+
+    def _bind(self, prefix: str, value: Any) -> str:
+        name = self._unique_name(prefix)
+        self.namespace[name] = value
+        return name
+
+    def compile_pattern(self, pattern: Pattern) -> str:
+        """Returns expression rendering provided pattern as a string"""
+        parts: List[str] = []
+        pending_text: List[str] = []
+        for element in pattern.sub_elements:
+            if isinstance(element, RawText):
+                pending_text.append(element.text)
+                continue
+            if pending_text:
+                parts.append(repr("".join(pending_text)))
+                pending_text = []
+            parts.append(self.compile_element(element))
+        if pending_text:
+            parts.append(repr("".join(pending_text)))
+
+        if not parts:
+            return "''"
+        if len(parts) == 1:
+            return parts[0]
+        return "".join(("(", " + ".join(parts), ")"))
+
+    def compile_value(self, pattern: Pattern) -> str:
+        """Returns expression equivalent to `pattern.process_as_value`"""
+        if len(pattern.sub_elements) == 1:
+            element = pattern.sub_elements[0]
+            if isinstance(element, TagInstance):
+                return f"{self.compile_tag_instance(element)}(file)"
+            if isinstance(element, ConstantTagValue):
+                return self._bind("value", element.value)
+        return self.compile_pattern(pattern)
+
+    def compile_element(self, element: PatternElement) -> str:
+        """Returns expression rendering provided element as a string"""
+        if isinstance(element, Pattern):
+            return self.compile_pattern(element)
+        if isinstance(element, TagInstance):
+            return f"str({self.compile_tag_instance(element)}(file))"
+        # Unknown elements are processed by the tree interpreter
+        process_name = self._bind("process", element.process)
+        return f"str({process_name}(file))"
+
+    def compile_tag_instance(self, tag_instance: TagInstance) -> str:
+        """Defines function returning (non-stringified) tag value
+
+        :returns: name of the defined function
+        """
+        if tag_instance.context is None:
+            context_expression = "None"
+        elif tag_instance.tag.context_types:
+            context_types_name = self._bind(
+                "context_types", tag_instance.tag.context_types
+            )
+            value_expression = self.compile_value(tag_instance.context)
+            context_expression = (
+                f"typed_context({value_expression}, {context_types_name})"
+            )
+        else:
+            context_expression = self.compile_pattern(tag_instance.context)
+        process_name = self._bind("process", tag_instance.tag.process)
+        function_name = self._unique_name("tag")
+        self.definitions.append(
+            "\n".join(
+                (
+                    f"def {function_name}(file):",
+                    "    try:",
+                    f"        return {process_name}(file, {context_expression})",
+                    "    except MissingMetadataError:",
+                    "        return ''",
+                )
+            )
+        )
+        if isinstance(tag_instance, SharedTagInstance):
+            # Value cache is shared with other (possibly interpreted) occurrences
+            evaluate_once_name = self._bind("evaluate_once", tag_instance.evaluate_once)
+            shared_function_name = self._unique_name("shared_tag")
+            self.definitions.append(
+                "\n".join(
+                    (
+                        f"def {shared_function_name}(file):",
+                        f"    return {evaluate_once_name}(file, {function_name})",
+                    )
+                )
+            )
+            return shared_function_name
+        return function_name
+
+
+def generate_source(pattern: Pattern) -> str:
+    """Returns source code of the module defining `render(file)` function"""
+    return _generate(pattern)[0]
+
+
+def _generate(pattern: Pattern) -> Tuple[str, Dict[str, Any]]:
+    compiler = _PatternCompiler()
+    render_expression = compiler.compile_pattern(pattern)
+    source = "\n\n".join(
+        compiler.definitions
+        + ["\n".join(("def render(file):", f"    return {render_expression}"))]
+    )
+    return source, compiler.namespace
+
+
+def compile_pattern(pattern: Pattern) -> RenderFunction:
+    """Compiles bound pattern into function equivalent to `pattern.process`
+
+    If code cannot be generated or compiled (e.g. because of excessive tag
+    nesting), the pattern tree interpreter is returned instead.
+    """
+    try:
+        source, namespace = _generate(pattern)
+        code = compile(source, _COMPILED_FILENAME, "exec")
+    except (SyntaxError, RecursionError, MemoryError):
+        return pattern.process
+    exec(code, namespace)
+    render_function = namespace["render"]
+    render_function.__doc__ = pattern.source_representation
+    return render_function
@@ -0,0 +1,235 @@
+"""Hand-written recursive-descent parser of the tag templates
+
+Parser recognizes exactly the same language as the ANTLR grammar (see `grammar`
+directory) and builds identical (unbound) pattern trees, but doesn't require
+ANTLR runtime nor the generated lexer/parser modules to be loaded.
+
+Only well-formed templates are handled here - when the template contains a syntax
+error (or relies on lexer error recovery, e.g. by including a character that
+is skipped by the ANTLR lexer), `FallbackRequired` is raised and the template should
+be parsed by the ANTLR-generated parser, which remains the reference
+implementation and produces error diagnostics.
+"""
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from .tree_builder import ArgValue, merge_locations, unescape
+from .tree_elements import (
+    Location,
+    Pattern,
+    PatternElement,
+    RawText,
+    TagName,
+    TagPlaceholder,
+)
+
+# Counterparts of the lexer rules from TagTemplateLexer.g4
+_TEXT = re.compile(r"(?:\\[{}|]|[^%{}|\t\n\r])+")
+_ID = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
+_NUMERIC_VALUE = re.compile(r"-?[0-9]+")
+_BOOLEAN_VALUES = {"true": True, "True": True, "false": False, "False": False}
+_GLOBAL_WHITESPACE = "\t\n\r"
+_TAG_WHITESPACE = "\t\n\r"
+_ARGS_WHITESPACE = " \t\n\r"
+
+
+class FallbackRequired(Exception):
+    """Template cannot be parsed without the ANTLR-generated parser"""
+
+
+class _DescentParser:
+    text: str
+    position: int
+    _newlines: List[int]
+
+    def __init__(self, text: str):
+        self.text = text
+        self.position = 0
+        self._newlines = [
+            index for index, character in enumerate(text) if character == "\n"
+        ]
+
+    def _location(self, start: int, length: int) -> Location:
+        return Location(
+            line=bisect_left(self._newlines, start) + 1, column=start, length=length
+        )
+
+    def _skip(self, whitespace: str):
+        text = self.text
+        position = self.position
+        while position < len(text) and text[position] in whitespace:
+            position += 1
+        self.position = position
+
+    def _peek(self) -> Optional[str]:
+        if self.position < len(self.text):
+            return self.text[self.position]
+        return None
+
+    def _expect(self, character: str):
+        if self._peek() != character:
+            raise FallbackRequired()
+        self.position += 1
+
+    def parse_root_pattern(self) -> Pattern:
+        pattern = self.parse_pattern()
+        if self.position != len(self.text):
+            raise FallbackRequired()
+        return pattern
+
+    def parse_pattern(self) -> Pattern:
+        elements: List[PatternElement] = []
+        while True:
+            self._skip(_GLOBAL_WHITESPACE)
+            character = self._peek()
+            if character is None or character in "{}|":
+                break
+            if character == "%":
+                elements.append(self.parse_tag())
+            else:
+                elements.append(self.parse_raw_text())
+
+        if self._peek() != "|":
+            return Pattern(elements)
+        context = Pattern(elements)
+        while self._peek() == "|":
+            self.position += 1
+            self._skip(_GLOBAL_WHITESPACE)
+            if self._peek() != "%":
+                raise FallbackRequired()
+            tag_placeholder = self.parse_tag()
+            tag_placeholder.context = context
+            context = Pattern([tag_placeholder])
+            self._skip(_GLOBAL_WHITESPACE)
+        return context
+
+    def parse_raw_text(self) -> RawText:
+        match = _TEXT.match(self.text, self.position)
+        if not match:
+            raise FallbackRequired()
+        self.position = match.end()
+        raw_text = RawText(text=unescape(match.group()))
+        raw_text.location = self._location(match.start(), len(match.group()))
+        return raw_text
+
+    def _parse_id(self) -> Tuple[str, Location]:
+        match = _ID.match(self.text, self.position)
+        if not match:
+            raise FallbackRequired()
+        self.position = match.end()
+        return match.group(), self._location(match.start(), len(match.group()))
+
+    def parse_tag(self) -> TagPlaceholder:
+        self._expect("%")
+        category_name = None
+        category_location = None
+        self._skip(_TAG_WHITESPACE)
+        tag_name, tag_name_location = self._parse_id()
+        self._skip(_TAG_WHITESPACE)
+        if self._peek() == ".":
+            self.position += 1
+            category_name, category_location = tag_name, tag_name_location
+            self._skip(_TAG_WHITESPACE)
+            tag_name, tag_name_location = self._parse_id()
+            self._skip(_TAG_WHITESPACE)
+        args, kwargs = self.parse_argument_list()
+
+        context = None
+        self._skip(_GLOBAL_WHITESPACE)
+        if self._peek() == "{":
+            self.position += 1
+            context = self.parse_pattern()
+            self._expect("}")
+
+        tag = TagPlaceholder(
+            tag_name=TagName(tag_name, category_name),
+            args=args,
+            kwargs=kwargs,
+            context=context,
+        )
+        if category_location is not None:
+            if category_location.line != tag_name_location.line:
+                raise FallbackRequired()
+            tag.location = merge_locations(category_location, tag_name_location)
+        else:
+            tag.location = tag_name_location
+        return tag
+
+    def parse_argument_list(self) -> Tuple[List[ArgValue], Dict[str, ArgValue]]:
+        self._expect("(")
+        args: List[ArgValue] = []
+        kwargs: Dict[str, ArgValue] = {}
+        self._skip(_ARGS_WHITESPACE)
+        if self._peek() == ")":
+            self.position += 1
+            return args, kwargs
+        while True:
+            arg_name, arg_value = self.parse_argument()
+            if arg_name is None:
+                args.append(arg_value)
+            else:
+                kwargs[arg_name] = arg_value
+            self._skip(_ARGS_WHITESPACE)
+            character = self._peek()
+            self.position += 1
+            if character == ")":
+                return args, kwargs
+            if character != ",":
+                raise FallbackRequired()
+            self._skip(_ARGS_WHITESPACE)
+
+    def parse_argument(self) -> Tuple[Optional[str], ArgValue]:
+        match = _ID.match(self.text, self.position)
+        if match is None or match.group() in _BOOLEAN_VALUES:
+            return None, self.parse_argument_value()
+        self.position = match.end()
+        self._skip(_ARGS_WHITESPACE)
+        if self._peek() != "=":
+            return match.group(), True
+        self.position += 1
+        self._skip(_ARGS_WHITESPACE)
+        return match.group(), self.parse_argument_value()
+
+    def parse_argument_value(self) -> ArgValue:
+        character = self._peek()
+        if character == "'" or character == '"':
+            return unescape(self._parse_string_value(character))
+        match = _NUMERIC_VALUE.match(self.text, self.position)
+        if match:
+            self.position = match.end()
+            return int(match.group())
+        match = _ID.match(self.text, self.position)
+        if match and match.group() in _BOOLEAN_VALUES:
+            self.position = match.end()
+            return _BOOLEAN_VALUES[match.group()]
+        raise FallbackRequired()
+
+    def _parse_string_value(self, quote: str) -> str:
+        """Returns content of the longest quoted string (as the ANTLR lexer does)"""
+        text = self.text
+        start = self.position
+        end = None
+        index = start + 1
+        while index < len(text):
+            if text[index] == quote:
+                end = index
+                # Quote preceded by a backslash may be an escaped one as well
+                if index - 1 == start or text[index - 1] != "\\":
+                    break
+            index += 1
+        if end is None:
+            raise FallbackRequired()
+        self.position = end + 1
+        return text[start + 1 : end]
+
+
+def parse_template(text: str) -> Pattern:
+    """Builds (unbound) pattern tree using recursive-descent parser
+
+    :raises FallbackRequired: template should be parsed with the ANTLR parser
+    """
+    try:
+        return _DescentParser(text).parse_root_pattern()
+    except RecursionError:
+        raise FallbackRequired()
@@ -0,0 +1,342 @@
+"""Compilation of expression templates (used by template filters and sorters)
+
+Expression template is a Python expression with tag invocations embedded. Instead
+of rendering tag values with `repr` into the expression source and parsing it for
+every file, the expression structure is compiled only once: each top-level tag
+invocation is replaced with a call loading the tag value. Values are loaded lazily
+(when the expression needs them), so operands skipped by the short-circuiting
+operators don't invoke their tags at all.
+"""
+import ast
+import copy
+import io
+import sys
+import tokenize
+from typing import Any, Callable, Dict, List, Optional
+
+from tempren.path_generator import (
+    ExpressionEvaluationError,
+    File,
+    _evaluation_locals,
+    evaluate_expression,
+)
+
+from .tree_elements import (
+    ConstantTagValue,
+    Pattern,
+    PatternElement,
+    RawText,
+    TagInstance,
+)
+
+_COMPILED_FILENAME = "<tempren-expression>"
+_VALUE_NAME_PREFIX = "__tempren_value"
+_LOAD_VALUE_NAME = "__tempren_load_value"
+
+ValueLoader = Callable[[int], Any]
+ExpressionFunction = Callable[[ValueLoader], Any]
+
+
+class _TagProcessingError(Exception):
+    """Carries exception raised by the tag out of the expression evaluation"""
+
+    pass
+
+
+class CompiledExpression:
+    """Expression template compiled into a function loading tag values on demand
+
+    Tag values are passed to the compiled code as Python objects, so they don't need
+    to have evaluable `repr`. If the expression cannot be compiled that way (e.g. tag
+    invocation is embedded in a string literal), it is rendered and evaluated for
+    each file, as a fallback.
+    """
+
+    pattern: Pattern
+    prefix: str
+    suffix: str
+    reorder_operands: bool
+    value_elements: List[PatternElement]
+    """Tag invocations (top-level sub-elements) providing the expression values"""
+    value_names: List[str]
+    """Variable names assigned to the tag values in the generated source"""
+    function: Optional[ExpressionFunction]
+    """Compiled expression or None if fallback evaluation is used"""
+    ordered_function: Optional[ExpressionFunction]
+    """Expression with operands in the original order (if `function` reorders them)"""
+
+    def __init__(
+        self,
+        pattern: Pattern,
+        prefix: str = "",
+        suffix: str = "",
+        reorder_operands: bool = False,
+    ):
+        """
+        :param reorder_operands: move cheaper operands of the boolean operators
+            ahead of more expensive ones; allowed only for expressions used
+            as a condition (where just truthiness of the result is relevant)
+        """
+        self.pattern = pattern
+        self.prefix = prefix
+        self.suffix = suffix
+        self.reorder_operands = reorder_operands
+        self.value_elements = []
+        self.value_names = []
+        self.function = None
+        self.ordered_function = None
+        self._compile()
+
+    def _compile(self):
+        source = self._generate_source()
+        if source is None or not self._names_are_standalone(source):
+            return
+        try:
+            tree = ast.parse(source, _COMPILED_FILENAME, "eval")
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            return
+        if any(
+            isinstance(node, (ast.Yield, ast.YieldFrom, ast.Await))
+            for node in ast.walk(tree)
+        ):
+            # These would change the meaning of the wrapping function
+            return
+        value_indices = {name: index for index, name in enumerate(self.value_names)}
+        tree = _ValueLoadInserter(value_indices).visit(tree)
+        self.function = _build_function(tree)
+        if self.function is None or not self.reorder_operands:
+            return
+        costs = [_element_cost(element) for element in self.value_elements]
+        reordered_tree = copy.deepcopy(tree)
+        if _reorder_operands(reordered_tree.body, costs):
+            reordered_function = _build_function(reordered_tree)
+            if reordered_function is not None:
+                self.ordered_function = self.function
+                self.function = reordered_function
+
+    def _generate_source(self) -> Optional[str]:
+        """Generates expression source with tag invocations replaced by variables"""
+        source_parts = [self.prefix]
+        for element in self.pattern.sub_elements:
+            if _is_value_element(element):
+                value_name = f"{_VALUE_NAME_PREFIX}{len(self.value_names)}"
+                self.value_elements.append(element)
+                self.value_names.append(value_name)
+                # Whitespace keeps the name from being glued to adjacent tokens
+                # (leading one is omitted where it would be an indentation)
+                separator = " " if any(source_parts) else ""
+                source_parts.append(f"{separator}{value_name} ")
+            elif isinstance(element, RawText):
+                source_parts.append(element.text)
+            else:
+                return None
+        source_parts.append(self.suffix)
+        return "".join(source_parts)
+
+    def _names_are_standalone(self, source: str) -> bool:
+        """Checks if each value variable is referenced exactly once in the source
+
+        Variable name could end up inside a string literal or a comment, where
+        substituting rendered value and binding variable are not equivalent.
+        """
+        try:
+            name_tokens = [
+                token.string
+                for token in tokenize.generate_tokens(io.StringIO(source).readline)
+                if token.type == tokenize.NAME
+            ]
+        except (tokenize.TokenError, SyntaxError):
+            return False
+        return _LOAD_VALUE_NAME not in name_tokens and all(
+            name_tokens.count(name) == 1 for name in self.value_names
+        )
+
+    def evaluate(self, file: File) -> Any:
+        """Evaluates expression for the file
+
+        Exceptions raised by the tags are propagated as is. If operands were
+        reordered, failures are confirmed using operands in the original order.
+
+        :raises ExpressionEvaluationError: if the expression evaluation failed
+        """
+        if self.function is None:
+            rendered_expression = (
+                self.prefix + self.pattern.process_as_expression(file) + self.suffix
+            )
+            return evaluate_expression(rendered_expression)
+
+        values: Dict[int, Any] = {}
+        tag_errors: Dict[int, Exception] = {}
+        for index, element in enumerate(self.value_elements):
+            # Stateful tags need to be invoked for each file regardless of the result
+            if isinstance(element, TagInstance) and element.tag.stateful:
+                values[index] = element.process(file)
+
+        def load_value(index: int) -> Any:
+            try:
+                return values[index]
+            except KeyError:
+                pass
+            if index in tag_errors:
+                # Failing tag is not invoked again by the evaluation in original order
+                raise _TagProcessingError() from tag_errors[index]
+            try:
+                value = self.value_elements[index].process(file)
+            except Exception as exc:
+                tag_errors[index] = exc
+                raise _TagProcessingError() from exc
+            values[index] = value
+            return value
+
+        if self.ordered_function is None:
+            return self._evaluate_function(self.function, load_value, values)
+        try:
+            return self._evaluate_function(self.function, load_value, values)
+        except Exception:
+            # Reordered operand could fail (expression or tag error, e.g. unsupported
+            # file) where the original order short-circuits - result and errors
+            # are reported as if operands were evaluated in the original order
+            return self._evaluate_function(self.ordered_function, load_value, values)
+
+    def _evaluate_function(
+        self,
+        function: ExpressionFunction,
+        load_value: ValueLoader,
+        values: Dict[int, Any],
+    ) -> Any:
+        try:
+            return function(load_value)
+        except _TagProcessingError as tag_processing_error:
+            tag_error = tag_processing_error.__cause__
+        except Exception as exc:
+            raise ExpressionEvaluationError(self._render(values)) from exc
+        assert tag_error is not None
+        raise tag_error
+
+    def _render(self, values: Dict[int, Any]) -> str:
+        """Renders expression source (as displayed to the user) from tag values
+
+        Values which were not needed by the evaluation are rendered as an ellipsis.
+        """
+        value_index = 0
+        rendered_parts = [self.prefix]
+        for element in self.pattern.sub_elements:
+            if _is_value_element(element):
+                if value_index in values:
+                    rendered_parts.append(repr(values[value_index]))
+                else:
+                    rendered_parts.append("...")
+                value_index += 1
+            else:
+                assert isinstance(element, RawText)
+                rendered_parts.append(element.text)
+        rendered_parts.append(self.suffix)
+        return "".join(rendered_parts)
+
+
+class _ValueLoadInserter(ast.NodeTransformer):
+    """Replaces value variables with calls loading the values"""
+
+    value_indices: Dict[str, int]
+
+    def __init__(self, value_indices: Dict[str, int]):
+        self.value_indices = value_indices
+
+    def visit_Name(self, node: ast.Name) -> ast.expr:
+        if node.id not in self.value_indices:
+            return node
+        load_call = ast.Call(
+            func=ast.Name(id=_LOAD_VALUE_NAME, ctx=ast.Load()),
+            args=[ast.Constant(value=self.value_indices[node.id])],
+            keywords=[],
+        )
+        return ast.copy_location(load_call, node)
+
+
+def _build_function(tree: ast.Expression) -> Optional[ExpressionFunction]:
+    """Compiles expression tree into a function accepting value loader"""
+    parameters = [ast.arg(arg=_LOAD_VALUE_NAME)]
+    if sys.version_info >= (3, 8):
+        arguments = ast.arguments(
+            posonlyargs=[],
+            args=parameters,
+            kwonlyargs=[],
+            kw_defaults=[],
+            defaults=[],
+        )
+    else:
+        # Positional-only parameters were introduced in Python 3.8
+        arguments = ast.arguments(
+            args=parameters, kwonlyargs=[], kw_defaults=[], defaults=[]
+        )
+    lambda_node = ast.Lambda(args=arguments, body=tree.body)
+    function_tree = ast.fix_missing_locations(
+        ast.Expression(body=ast.copy_location(lambda_node, tree.body))
+    )
+    try:
+        code = compile(function_tree, _COMPILED_FILENAME, "eval")
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return None
+    return eval(code, dict(_evaluation_locals))
+
+
+def _loaded_value_index(node: ast.AST) -> Optional[int]:
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == _LOAD_VALUE_NAME
+    ):
+        index_node = node.args[0]
+        assert isinstance(index_node, ast.Constant)
+        assert isinstance(index_node.value, int)
+        return index_node.value
+    return None
+
+
+def _operand_cost(operand: ast.expr, costs: List[int]) -> int:
+    loaded_indices = map(_loaded_value_index, ast.walk(operand))
+    return sum(costs[index] for index in loaded_indices if index is not None)
+
+
+def _reorder_operands(node: ast.expr, costs: List[int]) -> bool:
+    """Sorts operands of boolean operators (in boolean context) by their cost
+
+    Truthiness of `a and b` (`a or b`) doesn't depend on the operand order, so
+    operands can be swapped as long as only the truthiness of the result is used.
+
+    :returns: True if the order of any operands was changed
+    """
+    if isinstance(node, ast.BoolOp):
+        changed = any([_reorder_operands(value, costs) for value in node.values])
+        reordered_values = sorted(
+            node.values, key=lambda operand: _operand_cost(operand, costs)
+        )
+        if any(a is not b for a, b in zip(reordered_values, node.values)):
+            node.values = reordered_values
+            changed = True
+        return changed
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return _reorder_operands(node.operand, costs)
+    if isinstance(node, ast.IfExp):
+        return any(
+            [
+                _reorder_operands(node.test, costs),
+                _reorder_operands(node.body, costs),
+                _reorder_operands(node.orelse, costs),
+            ]
+        )
+    return False
+
+
+def _element_cost(element: PatternElement) -> int:
+    """Estimates cost of the element evaluation (see `Tag.cost`)"""
+    if isinstance(element, TagInstance):
+        context_cost = 0 if element.context is None else _element_cost(element.context)
+        return element.tag.cost + context_cost
+    if isinstance(element, Pattern):
+        return sum(map(_element_cost, element.sub_elements))
+    return 0
+
+
+def _is_value_element(element: PatternElement) -> bool:
+    return isinstance(element, (TagInstance, ConstantTagValue))
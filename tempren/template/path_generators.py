@@ -1,36 +1,132 @@
 import logging
-from abc import ABC
+import pickle
+from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Sequence
 
-from tempren.path_generator import File, InvalidFilenameError, PathGenerator
-from tempren.template.tree_elements import Pattern
+from tempren.path_generator import (
+    File,
+    InvalidFilenameError,
+    PathGenerationError,
+    PathGenerator,
+)
+from tempren.template.compiler import RenderFunction, compile_pattern
+from tempren.template.tree_elements import Pattern, PatternElement, TagInstance
+
+if TYPE_CHECKING:
+    from tempren.template.async_renderer import AsyncPatternRenderer
+    from tempren.template.process_renderer import ProcessPoolPatternRenderer
+
+
+def uses_batch_processing(element: PatternElement) -> bool:
+    """Checks if any tag used in the element provides batched implementation"""
+    if isinstance(element, TagInstance):
+        if element.tag.supports_batch_processing():
+            return True
+        return element.context is not None and uses_batch_processing(element.context)
+    if isinstance(element, Pattern):
+        return any(map(uses_batch_processing, element.sub_elements))
+    return False
 
 
 class TemplateGenerator(PathGenerator, ABC):
     log: logging.Logger
     pattern: Pattern
+    batch_processing: bool
+    """Render batches with the pattern tree (instead of the compiled function)"""
+    _render: RenderFunction
+    _async_renderer: Optional["AsyncPatternRenderer"] = None
+    _process_renderer: Optional["ProcessPoolPatternRenderer"] = None
 
-    def __init__(self, pattern: Pattern):
+    def __init__(self, pattern: Pattern, concurrency: int = 1, jobs: int = 1):
+        """
+        :param concurrency: number of files rendered concurrently (in batches)
+        :param jobs: number of processes rendering batches in parallel
+            (concurrency is used only if the pattern cannot be rendered in parallel)
+        """
         self.log = logging.getLogger(__name__)
         self.log.debug("Creating template generator with template: %s", pattern)
         self.pattern = pattern
+        self._render = compile_pattern(pattern)
+        self.batch_processing = uses_batch_processing(pattern)
+        if jobs > 1:
+            self._process_renderer = self._create_process_renderer(pattern, jobs)
+        if concurrency > 1 and self._process_renderer is None:
+            # asyncio is imported only when needed, as it slows down the startup
+            from tempren.template.async_renderer import AsyncPatternRenderer
+
+            self._async_renderer = AsyncPatternRenderer(pattern, concurrency)
+
+    def _create_process_renderer(
+        self, pattern: Pattern, jobs: int
+    ) -> Optional["ProcessPoolPatternRenderer"]:
+        from tempren.template.process_renderer import ProcessPoolPatternRenderer
+
+        try:
+            return ProcessPoolPatternRenderer(pattern, jobs)
+        except (pickle.PicklingError, TypeError, AttributeError) as error:
+            self.log.warning(
+                "Template cannot be rendered in parallel (%s), using a single process",
+                error,
+            )
+            return None
 
     def generate_replacement(self, file: File) -> str:
         self.log.debug("Rendering template for '%s'", file.relative_path)
-        rendered_template = self.pattern.process(file)
+        rendered_template = self._render(file)
         self.log.debug("Rendered template: '%s'", rendered_template)
         return rendered_template
 
+    def generate_replacement_batch(self, files: Sequence[File]) -> List[str]:
+        """Renders template for multiple files
+
+        :raises PathGenerationError: if rendering fails for a file rendered
+            on its own (when files are rendered together, the original exception
+            is raised as the failing file is unknown)
+        """
+        if self._process_renderer is not None:
+            self.log.debug("Rendering template in parallel for %d files", len(files))
+            return self._process_renderer.render_all(files)
+        if self._async_renderer is not None:
+            self.log.debug("Rendering template concurrently for %d files", len(files))
+            return self._async_renderer.render_all(files)
+        if not self.batch_processing:
+            replacements = []
+            for file in files:
+                try:
+                    replacements.append(self.generate_replacement(file))
+                except Exception as error:
+                    raise PathGenerationError(file) from error
+            return replacements
+        self.log.debug("Rendering template for %d files", len(files))
+        return self.pattern.process_batch(files)
 
-class TemplateNameGenerator(TemplateGenerator):
     def generate(self, file: File) -> Path:
-        new_name = self.generate_replacement(file)
+        return self.replacement_to_path(file, self.generate_replacement(file))
+
+    def generate_batch(self, files: Sequence[File]) -> List[Path]:
+        replacements = self.generate_replacement_batch(files)
+        paths = []
+        for file, replacement in zip(files, replacements):
+            try:
+                paths.append(self.replacement_to_path(file, replacement))
+            except InvalidFilenameError as error:
+                raise PathGenerationError(file) from error
+        return paths
+
+    @abstractmethod
+    def replacement_to_path(self, file: File, replacement: str) -> Path:
+        raise NotImplementedError()
+
+
+class TemplateNameGenerator(TemplateGenerator):
+    def replacement_to_path(self, file: File, replacement: str) -> Path:
         try:
-            return file.relative_path.with_name(new_name)
+            return file.relative_path.with_name(replacement)
         except ValueError:
-            raise InvalidFilenameError(new_name)
+            raise InvalidFilenameError(replacement)
 
 
 class TemplatePathGenerator(TemplateGenerator):
-    def generate(self, file: File) -> Path:
-        return Path(self.generate_replacement(file))
+    def replacement_to_path(self, file: File, replacement: str) -> Path:
+        return Path(replacement)
@@ -0,0 +1,162 @@
+"""Rendering of bound pattern trees in a pool of worker processes
+
+CPU-bound templates (e.g. text transformations of many names) are limited
+by the interpreter lock, so chunks of files are rendered by separate processes,
+each one with its own copy of the pattern (sent once, when the pool starts).
+
+Stateful tags (e.g. `Count`) depend on the order of invocations, so they are
+evaluated in the parent process - sequentially, in order of the rendered files.
+Workers substitute them with the values computed this way.
+"""
+import io
+import logging
+import math
+import pickle
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional, Sequence, Tuple
+
+from tempren.path_generator import File
+
+from .compiler import RenderFunction, compile_pattern
+from .tree_elements import (
+    Pattern,
+    SharedTagInstance,
+    Tag,
+    TagInstance,
+    find_shared_instances,
+    find_stateful_instances,
+)
+
+log = logging.getLogger(__name__)
+
+MIN_CHUNK_SIZE = 16
+"""Minimal number of files sent to a single worker at once"""
+
+
+class _PrecomputedValueTag(Tag):
+    """Returns value of the stateful tag computed by the parent process"""
+
+    require_context = False
+
+    index: int
+
+    def __init__(self, index: int):
+        self.index = index
+
+    def process(self, file: File, context: Optional[str]) -> Any:
+        return _precomputed_values[self.index]
+
+
+class _PatternPickler(pickle.Pickler):
+    """Pickles pattern replacing stateful tag instances with references to their values"""
+
+    def __init__(self, file, stateful_instances: Sequence[TagInstance]):
+        super().__init__(file)
+        self._stateful_indexes = {
+            id(tag_instance): index
+            for index, tag_instance in enumerate(stateful_instances)
+        }
+
+    def persistent_id(self, obj: Any) -> Optional[int]:
+        if isinstance(obj, TagInstance):
+            return self._stateful_indexes.get(id(obj))
+        return None
+
+
+class _PatternUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid: int) -> TagInstance:
+        return TagInstance(tag=_PrecomputedValueTag(pid))
+
+
+def _pickle_pattern(
+    pattern: Pattern, stateful_instances: Sequence[TagInstance]
+) -> bytes:
+    stream = io.BytesIO()
+    _PatternPickler(stream, stateful_instances).dump(pattern)
+    return stream.getvalue()
+
+
+_worker_render: Optional[RenderFunction] = None
+_worker_shared_instances: Sequence[SharedTagInstance] = ()
+_precomputed_values: Sequence[Any] = ()
+
+
+def _initialize_worker(pickled_pattern: bytes):
+    global _worker_render, _worker_shared_instances
+    pattern = _PatternUnpickler(io.BytesIO(pickled_pattern)).load()
+    _worker_render = compile_pattern(pattern)
+    _worker_shared_instances = find_shared_instances(pattern)
+
+
+def _render_chunk(
+    files: Sequence[File], stateful_values: Sequence[Sequence[Any]]
+) -> List[str]:
+    global _precomputed_values
+    assert _worker_render is not None, "worker not initialized"
+    rendered = []
+    for file, values in zip(files, stateful_values):
+        _precomputed_values = values
+        rendered.append(_worker_render(file))
+    # Worker renders each file only once
+    for shared_instance in _worker_shared_instances:
+        shared_instance.forget(files)
+    return rendered
+
+
+class ProcessPoolPatternRenderer:
+    """Renders pattern for multiple files in parallel, using worker processes"""
+
+    pattern: Pattern
+    jobs: int
+    """Number of worker processes"""
+    _render: RenderFunction
+    _stateful_instances: List[TagInstance]
+    _pickled_pattern: bytes
+    _executor: Optional[ProcessPoolExecutor] = None
+
+    def __init__(self, pattern: Pattern, jobs: int):
+        """
+        :raises pickle.PicklingError: if the pattern cannot be sent to workers
+        """
+        assert jobs > 0, "number of jobs have to be positive"
+        self.pattern = pattern
+        self.jobs = jobs
+        self._render = compile_pattern(pattern)
+        self._stateful_instances = find_stateful_instances(pattern)
+        self._pickled_pattern = _pickle_pattern(pattern, self._stateful_instances)
+
+    def render_all(self, files: Sequence[File]) -> List[str]:
+        """Renders pattern for all files
+
+        :returns: rendered values in the order of provided files
+        """
+        if len(files) <= MIN_CHUNK_SIZE:
+            # Rendering in the parent is cheaper than sending a single chunk
+            return [self._render(file) for file in files]
+        stateful_values = [self._evaluate_stateful(file) for file in files]
+        chunk_size = max(MIN_CHUNK_SIZE, math.ceil(len(files) / self.jobs))
+        chunks: List[Tuple[Sequence[File], Sequence[Sequence[Any]]]] = [
+            (
+                files[start : start + chunk_size],
+                stateful_values[start : start + chunk_size],
+            )
+            for start in range(0, len(files), chunk_size)
+        ]
+        executor = self._get_executor()
+        futures = [executor.submit(_render_chunk, *chunk) for chunk in chunks]
+        return [value for future in futures for value in future.result()]
+
+    def _evaluate_stateful(self, file: File) -> List[Any]:
+        return [tag_instance.process(file) for tag_instance in self._stateful_instances]
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            log.debug("Starting %d worker processes", self.jobs)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.jobs,
+                initializer=_initialize_worker,
+                initargs=(self._pickled_pattern,),
+            )
+            weakref.finalize(self, self._executor.shutdown)
+        return self._executor
@@ -0,0 +1,62 @@
+"""Generation of the tag manifest used for lazy tag module loading
+
+Manifest lists tags defined in each of `tempren.tags` modules so tag names can be
+resolved without importing all tag modules (together with their dependencies).
+It should be regenerated whenever tags are added, removed or renamed:
+
+    python -m tempren.template.tag_manifest
+"""
+import importlib
+import json
+from pathlib import Path
+from types import ModuleType
+
+from .tree_builder import TagManifest, find_tag_classes, walk_tag_modules
+from .tree_elements import TagFactoryFromClass
+
+MANIFEST_MODULE_NAME = "_manifest"
+
+
+def generate_tag_manifest(package: ModuleType) -> TagManifest:
+    """Imports all tag modules in the package and collects names of their tags"""
+    manifest: TagManifest = {}
+    for module_name in walk_tag_modules(package):
+        module = importlib.import_module(module_name)
+        manifest[module_name] = sorted(
+            TagFactoryFromClass(tag_class).tag_name
+            for tag_class in find_tag_classes(module)
+        )
+    return manifest
+
+
+def render_tag_manifest(manifest: TagManifest) -> str:
+    """Returns source code of the manifest module"""
+    lines = [
+        '"""Tags defined in the tag modules (see `tempren.template.tag_manifest`)',
+        "",
+        "This file is generated - do not edit it manually.",
+        '"""',
+        "TAG_MANIFEST = {",
+    ]
+    for module_name, tag_names in manifest.items():
+        lines.append(f"    {json.dumps(module_name)}: [")
+        lines.extend(f"        {json.dumps(tag_name)}," for tag_name in tag_names)
+        lines.append("    ],")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def manifest_path(package: ModuleType) -> Path:
+    assert package.__file__
+    return Path(package.__file__).parent / f"{MANIFEST_MODULE_NAME}.py"
+
+
+def main():
+    import tempren.tags
+
+    manifest = generate_tag_manifest(tempren.tags)
+    manifest_path(tempren.tags).write_text(render_tag_manifest(manifest))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,19 +6,16 @@ from dataclasses import dataclass
 from functools import reduce
 from logging import Logger
 from types import ModuleType
-from typing import Dict, List, Mapping, Optional, Tuple, Type, Union
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple, Type, Union
 
-from antlr4 import CommonTokenStream, InputStream  # type: ignore
-from antlr4.error.ErrorListener import ErrorListener  # type: ignore
-
-from .grammar.TagTemplateLexer import TagTemplateLexer
-from .grammar.TagTemplateParser import TagTemplateParser
-from .grammar.TagTemplateParserVisitor import TagTemplateParserVisitor
+from .cache import TemplateCache
 from .tree_elements import (
+    ConstantTagValue,
     Location,
     Pattern,
     PatternElement,
     RawText,
+    SharedTagInstance,
     Tag,
     TagFactory,
     TagFactoryFromClass,
@@ -29,6 +26,12 @@ from .tree_elements import (
 
 ArgValue = Union[str, int, bool]
 
+SharedTagInstances = Dict[Hashable, SharedTagInstance]
+"""Canonical tag instances indexed by the tag factory, arguments and context"""
+
+TagManifest = Dict[str, List[str]]
+"""Names of the tags defined in the tag modules (indexed by module name)"""
+
 
 escaped_characters = ("'", "\\", "{", "}", "|")
 replacements = list(("\\" + ec, ec) for ec in escaped_characters)
@@ -40,18 +43,35 @@ def unescape(text: str) -> str:
     )
 
 
-IGNORED_TERMINAL = object()
-ARGUMENT_VALUE_TYPES = (
-    TagTemplateLexer.NUMERIC_VALUE,
-    TagTemplateLexer.BOOLEAN_VALUE,
-    TagTemplateLexer.STRING_VALUE,
-)
+def find_tag_classes(
+    module: ModuleType, tag_class_suffix: str = "Tag"
+) -> List[Type[Tag]]:
+    """Returns (non-abstract) tag classes found in the module"""
 
+    def is_tag_class(klass: type):
+        if (
+            not inspect.isclass(klass)
+            or not issubclass(klass, Tag)
+            or inspect.isabstract(klass)
+            or klass == Tag
+        ):
+            return False
+        return klass.__name__.endswith(tag_class_suffix)
 
-def location_from_symbol(symbol) -> Location:
-    return Location(
-        line=symbol.line, column=symbol.start, length=symbol.stop - symbol.start + 1
-    )
+    return [tag_class for _, tag_class in inspect.getmembers(module, is_tag_class)]
+
+
+def walk_tag_modules(package: ModuleType) -> Iterator[str]:
+    """Yields names of the modules in the package (and its subpackages)
+
+    Private modules (with names starting with an underscore) are skipped.
+    """
+    for _, name, is_pkg in pkgutil.walk_packages(
+        package.__path__, package.__name__ + "."
+    ):
+        if is_pkg or name.rpartition(".")[2].startswith("_"):
+            continue
+        yield name
 
 
 def merge_locations(first: Optional[Location], second: Location) -> Location:
@@ -63,169 +83,55 @@ def merge_locations(first: Optional[Location], second: Location) -> Location:
     )
 
 
-class _TreeVisitor(TagTemplateParserVisitor):
-    def defaultResult(self) -> List[PatternElement]:
-        return list()
-
-    def visitTerminal(self, node):
-        if node.getSymbol().type not in ARGUMENT_VALUE_TYPES:
-            return IGNORED_TERMINAL
-        raise NotImplementedError()
-
-    def aggregateResult(
-        self, pattern: List[PatternElement], element: PatternElement
-    ) -> List[PatternElement]:
-        if element is IGNORED_TERMINAL:
-            return pattern
-        return pattern + [element]
-
-    def visitRootPattern(self, ctx: TagTemplateParser.RootPatternContext) -> Pattern:
-        return self.visitPattern(ctx.pattern())
-
-    def visitPipeList(
-        self, ctx: TagTemplateParser.PipeListContext
-    ) -> List[TagPlaceholder]:
-        if ctx.errorNonTagInPipeList:
-            non_tag_symbol = ctx.errorNonTagInPipeList.children[0].symbol
-            raise TemplateSyntaxError(
-                message=f"non-tag in the pipe list"
-            ).with_location(location_from_symbol(non_tag_symbol))
-        tag_list = self.visitChildren(ctx)
-        return list(filter(bool, tag_list))
-
-    def visitPattern(self, ctx: TagTemplateParser.PatternContext) -> Pattern:
-        pattern_elements = self.visitChildren(ctx)
-        pipe_list = ctx.pipeList()
-        if pipe_list:
-            pipe_tags = self.visitPipeList(pipe_list)
-            context = Pattern(pattern_elements[:-1])
-            for tag_placeholder in pipe_tags:
-                tag_placeholder.context = context
-                context = Pattern([tag_placeholder])
-            return context
-        return Pattern(pattern_elements)
-
-    def visitTag(self, ctx: TagTemplateParser.TagContext) -> TagPlaceholder:
-        category_name = None
-        if ctx.categoryId:
-            category_name = ctx.categoryId.text
-        if ctx.errorMissingTagId:
-            raise TemplateSyntaxError(message=f"missing tag name").with_location(
-                location_from_symbol(ctx.errorMissingTagId)
-            )
-        if ctx.errorMissingCategoryId:
-            raise TemplateSyntaxError(message=f"missing category name").with_location(
-                location_from_symbol(ctx.errorMissingCategoryId)
-            )
-        if ctx.errorNoArgumentList:
-            raise TemplateSyntaxError(
-                message=f"missing argument list for tag '{ctx.errorNoArgumentList.text}'"
-            ).with_location(location_from_symbol(ctx.errorNoArgumentList))
-        tag_name: str = ctx.tagId.text  # type: ignore
-        if ctx.errorUnclosedContext:
-            raise TemplateSyntaxError(
-                message=f"missing closing context bracket for tag '{tag_name}'"
-            ).with_location(location_from_symbol(ctx.errorUnclosedContext))
-        args, kwargs = self.visitArgumentList(ctx.argumentList())
-        context = None
-        context_pattern = ctx.pattern()
-        if context_pattern is not None:
-            context = self.visitPattern(ctx.pattern())
-
-        tag = TagPlaceholder(
-            tag_name=TagName(tag_name, category_name),
-            args=args,
-            kwargs=kwargs,
-            context=context,
-        )
+def _argument_key(value: ArgValue) -> Tuple[type, ArgValue]:
+    # Type is included to differentiate e.g. True from 1
+    return type(value), value
 
-        tag_name_location = location_from_symbol(ctx.tagId)
-        if ctx.categoryId:
-            tag_category_location = location_from_symbol(ctx.categoryId)
-            tag.location = merge_locations(tag_category_location, tag_name_location)
-        else:
-            tag.location = tag_name_location
-        return tag
-
-    def visitArgumentList(
-        self, ctx: TagTemplateParser.ArgumentListContext
-    ) -> Tuple[List[ArgValue], Mapping[str, ArgValue]]:
-        if ctx.errorUnclosedArgumentList:
-            raise TemplateSyntaxError(
-                message="missing closing argument list bracket"
-            ).with_location(location_from_symbol(ctx.errorUnclosedArgumentList))
-        collected_arguments = super().visitArgumentList(ctx)
-        args = [
-            arg_val for arg_name, arg_val in collected_arguments if arg_name is None
-        ]
-        kwargs = {
-            arg_name: arg_val
-            for arg_name, arg_val in collected_arguments
-            if arg_name is not None
-        }
-        return args, kwargs
-
-    def visitArgumentValue(
-        self, ctx: TagTemplateParser.ArgumentValueContext
-    ) -> ArgValue:
-        if ctx.BOOLEAN_VALUE():
-            return ctx.BOOLEAN_VALUE().getText().lower() == "true"
-        elif ctx.NUMERIC_VALUE():
-            return int(ctx.NUMERIC_VALUE().getText())
-        elif ctx.STRING_VALUE():
-            str_val = ctx.STRING_VALUE().getText()
-            assert len(str_val) >= 2
-            str_val = str_val[1:-1]
-            return unescape(str_val)
-        raise NotImplementedError("Unknown argument value token: " + ctx.getText())
-
-    def visitArgument(
-        self, ctx: TagTemplateParser.ArgumentContext
-    ) -> Tuple[Optional[str], ArgValue]:
-        arg_name = ctx.ARG_NAME().getText() if ctx.ARG_NAME() else None
-        if ctx.argumentValue():
-            arg_value = self.visitArgumentValue(ctx.argumentValue())
-        else:
-            arg_value = True
-        return arg_name, arg_value
 
-    def visitRawText(self, ctx: TagTemplateParser.RawTextContext) -> RawText:
-        symbol = ctx.TEXT().getSymbol()
-        # CHECK: is location necessary for RawText?
-        raw_text = RawText(text=unescape(ctx.TEXT().getText()))
-        raw_text.location = location_from_symbol(symbol)
-        return raw_text
+def _context_key(context: Optional[Pattern]) -> Optional[Tuple[Any, ...]]:
+    if context is None:
+        return None
+    element_keys: List[Any] = []
+    for element in context.sub_elements:
+        if isinstance(element, ConstantTagValue):
+            element_keys.append((ConstantTagValue, element.text, repr(element.value)))
+        elif isinstance(element, RawText):
+            element_keys.append((RawText, element.text))
+        else:
+            # Shared instances are canonical, so other elements can be compared by identity
+            element_keys.append(id(element))
+    return tuple(element_keys)
 
 
 class TagTreeBuilder:
     log: logging.Logger
+    cache: Optional[TemplateCache]
 
-    def __init__(self):
+    def __init__(self, cache: Optional[TemplateCache] = None):
         self.log = logging.getLogger(self.__class__.__name__)
+        self.cache = cache
 
     def parse(self, text: str) -> Pattern:
+        if self.cache is not None:
+            cached_pattern = self.cache.load(text)
+            if cached_pattern is not None:
+                return cached_pattern
+
         self.log.debug("Parsing '%s'", text)
-        lexer = TagTemplateLexer(InputStream(text))
-        token_stream = CommonTokenStream(lexer)
-        token_stream.fill()
-        parser = TagTemplateParser(token_stream)
-        parser.addErrorListener(TagTemplateErrorListener())
-
-        visitor = _TreeVisitor()
-        root_pattern = visitor.visitRootPattern(parser.rootPattern())
-        root_pattern.source_representation = text
-        return root_pattern
+        from .descent_parser import FallbackRequired, parse_template
 
+        try:
+            root_pattern = parse_template(text)
+        except FallbackRequired:
+            self.log.debug("Falling back to ANTLR parser")
+            # ANTLR runtime is imported only when it is actually needed
+            from . import antlr_parser
 
-class TagTemplateErrorListener(ErrorListener):
-    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
-        error_location = Location(line, column, len(offendingSymbol.text))
-        if "extraneous input" in msg or "mismatched input" in msg:
-            raise TemplateSyntaxError(
-                f"unexpected symbol '{offendingSymbol.text}'"
-            ).with_location(error_location)
-        else:
-            raise TemplateSyntaxError(msg).with_location(error_location)
+            root_pattern = antlr_parser.parse_template(text)
+        root_pattern.source_representation = text
+        if self.cache is not None:
+            self.cache.store(text, root_pattern)
+        return root_pattern
 
 
 class TemplateError(Exception):
@@ -357,6 +263,50 @@ class TagCategory:
         return self.tag_map.get(tag_name, None)
 
 
+class LazyTagCategory(TagCategory):
+    """Category which imports its tag module when one of the tags is looked up"""
+
+    module_name: str
+    tag_names: List[str]
+    loaded: bool
+
+    def __init__(
+        self,
+        name: str,
+        module_name: str,
+        tag_names: List[str],
+        description: Optional[str] = None,
+    ):
+        super().__init__(name, description)
+        self.module_name = module_name
+        self.tag_names = tag_names
+        self.loaded = False
+
+    def load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        self.log.debug(f"Loading {self.module_name} module")
+        try:
+            module = importlib.import_module(self.module_name)
+        except NotImplementedError as exc:
+            self.log.warning(
+                f"Module {self.module_name} is currently unsupported: {exc}"
+            )
+            return
+        except Exception as exc:
+            self.log.error("Could not load module %s: %s", self.module_name, exc)
+            return
+        for tag_class in find_tag_classes(module):
+            self.register_tag(tag_class)
+
+    def find_tag_factory(self, tag_name: str) -> Optional[TagFactory]:
+        # Modules are imported only for tags which they define
+        if tag_name in self.tag_names:
+            self.load()
+        return super().find_tag_factory(tag_name)
+
+
 class TagRegistry:
     log: Logger
     _tag_class_suffix = "Tag"
@@ -412,21 +362,37 @@ class TagRegistry:
 
         return tag_factory
 
-    def bind(self, pattern: Pattern) -> Pattern:
-        return self._rewrite_pattern(pattern)
+    def bind(
+        self, pattern: Pattern, shared_instances: Optional[SharedTagInstances] = None
+    ) -> Pattern:
+        """Replaces tag placeholders with tag instances
 
-    def _rewrite_pattern(self, pattern: Pattern) -> Pattern:
+        When `shared_instances` mapping is provided, equivalent (non-stateful) tag
+        invocations are bound to a single, canonical tag instance shared by all
+        patterns bound with the same mapping.
+        """
+        return self._rewrite_pattern(pattern, shared_instances)
+
+    def _rewrite_pattern(
+        self, pattern: Pattern, shared_instances: Optional[SharedTagInstances]
+    ) -> Pattern:
         new_elements: List[PatternElement] = []
         for element in pattern.sub_elements:
             if isinstance(element, TagPlaceholder):
-                new_elements.append(self._rewrite_tag_placeholder(element))
+                new_elements.append(
+                    self._rewrite_tag_placeholder(element, shared_instances)
+                )
             else:
                 new_elements.append(element)
         bound_pattern = Pattern(new_elements)
         bound_pattern.source_representation = pattern.source_representation
         return bound_pattern
 
-    def _rewrite_tag_placeholder(self, tag_placeholder: TagPlaceholder) -> TagInstance:
+    def _rewrite_tag_placeholder(
+        self,
+        tag_placeholder: TagPlaceholder,
+        shared_instances: Optional[SharedTagInstances],
+    ) -> Union[TagInstance, ConstantTagValue]:
         try:
             tag_factory = self.get_tag_factory(tag_placeholder.tag_name)
 
@@ -456,20 +422,85 @@ class TagRegistry:
 
         context_pattern: Optional[Pattern] = None
         if tag_placeholder.context:
-            context_pattern = self._rewrite_pattern(tag_placeholder.context)
+            context_pattern = self._rewrite_pattern(
+                tag_placeholder.context, shared_instances
+            )
 
-        return TagInstance(tag, context=context_pattern)
+        tag_instance = TagInstance(tag, context=context_pattern)
+        if tag.pure and self._is_constant(context_pattern):
+            constant_value = self._fold_tag_instance(tag_instance)
+            if constant_value is not None:
+                constant_value.location = tag_placeholder.location
+                return constant_value
+        if shared_instances is not None and not tag.stateful:
+            return self._share_tag_instance(
+                tag_instance, tag_factory, tag_placeholder, shared_instances
+            )
+        return tag_instance
+
+    def _share_tag_instance(
+        self,
+        tag_instance: TagInstance,
+        tag_factory: TagFactory,
+        tag_placeholder: TagPlaceholder,
+        shared_instances: SharedTagInstances,
+    ) -> SharedTagInstance:
+        instance_key = (
+            id(tag_factory),
+            type(tag_instance.tag),
+            tuple(_argument_key(arg) for arg in tag_placeholder.args),
+            tuple(
+                sorted(
+                    (name, _argument_key(arg))
+                    for name, arg in tag_placeholder.kwargs.items()
+                )
+            ),
+            _context_key(tag_instance.context),
+        )
+        shared_instance = shared_instances.get(instance_key, None)
+        if shared_instance is None:
+            shared_instance = SharedTagInstance(
+                tag_instance.tag, context=tag_instance.context
+            )
+            shared_instances[instance_key] = shared_instance
+        else:
+            self.log.debug("Reusing tag instance for '%s'", tag_placeholder.tag_name)
+            shared_instance.occurrences += 1
+        return shared_instance
+
+    @staticmethod
+    def _is_constant(pattern: Optional[Pattern]) -> bool:
+        if pattern is None:
+            # Tags invoked without context usually make use of the processed file
+            return False
+        return all(isinstance(element, RawText) for element in pattern.sub_elements)
+
+    def _fold_tag_instance(
+        self, tag_instance: TagInstance
+    ) -> Optional[ConstantTagValue]:
+        try:
+            # Pure tags don't access the processed file
+            value = tag_instance.process(None)  # type: ignore
+        except Exception as exc:
+            # Leave the error to be reported when the template is rendered
+            self.log.debug("Could not evaluate %s at bind time: %s", tag_instance, exc)
+            return None
+        self.log.debug("Tag %s evaluated at bind time to %r", tag_instance, value)
+        return ConstantTagValue(text=str(value), value=value)
 
     def register_category(
         self, category_name: str, description: Optional[str] = None
     ) -> TagCategory:
         # TODO: This method should receive already build (non-empty) TagCategory
-        if self.find_category(category_name) is not None:
-            raise ValueError(f"Category '{category_name}' already registered")
-        new_category = TagCategory(category_name)
-        self.category_map[category_name] = new_category
+        new_category = TagCategory(category_name, description)
+        self._add_category(new_category)
         return new_category
 
+    def _add_category(self, category: TagCategory):
+        if self.find_category(category.name) is not None:
+            raise ValueError(f"Category '{category.name}' already registered")
+        self.category_map[category.name] = category
+
     def register_tags_in_module(self, module: ModuleType):
         self.log.debug(f"Discovering tags in module '{module}'")
 
@@ -478,29 +509,15 @@ class TagRegistry:
         else:
             category_name = module.__name__
 
-        def is_tag_class(klass: type):
-            if (
-                not inspect.isclass(klass)
-                or not issubclass(klass, Tag)
-                or inspect.isabstract(klass)
-                or klass == Tag
-            ):
-                return False
-            return klass.__name__.endswith(self._tag_class_suffix)
-
         # TODO: do not register empty modules
         module_category = self.register_category(category_name)
-        for _, tag_class in inspect.getmembers(module, is_tag_class):
+        for tag_class in find_tag_classes(module, self._tag_class_suffix):
             module_category.register_tag(tag_class)
 
     def register_tags_in_package(self, package):
         self.log.debug(f"Discovering tags in package '{package}'")
 
-        for _, name, is_pkg in pkgutil.walk_packages(
-            package.__path__, package.__name__ + "."
-        ):
-            if is_pkg:
-                continue
+        for name in walk_tag_modules(package):
             try:
                 self.log.debug(f"Trying to load {name} module")
                 module = importlib.import_module(name)
@@ -508,4 +525,13 @@ class TagRegistry:
             except NotImplementedError as exc:
                 self.log.warning(f"Module {name} is currently unsupported: {exc}")
             except Exception as exc:
-                self.log.error(exc, f"Could not load module {name}")
+                self.log.error("Could not load module %s: %s", name, exc)
+
+    def register_tags_from_manifest(self, manifest: TagManifest):
+        """Registers categories listed in the manifest without importing tag modules
+
+        Tag module is imported only when one of its tags is looked up.
+        """
+        for module_name, tag_names in manifest.items():
+            category_name = module_name.rpartition(".")[2]
+            self._add_category(LazyTagCategory(category_name, module_name, tag_names))
@@ -1,12 +1,29 @@
 import textwrap
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Any, List, Mapping, Optional, Type
-
-from docstring_parser import parse as parse_docstring
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
 
 from tempren.path_generator import File
 
+if TYPE_CHECKING:
+    import asyncio
+
+    from docstring_parser import Docstring
+
 
 @dataclass
 class TagName:
@@ -44,6 +61,10 @@ class PatternElement(ABC):
     def process(self, file: File) -> Any:
         raise NotImplementedError()
 
+    def process_batch(self, files: Sequence[File]) -> List[Any]:
+        """Processes multiple files at once (see `Tag.process_batch`)"""
+        return [self.process(file) for file in files]
+
 
 @dataclass
 class RawText(PatternElement):
@@ -56,6 +77,20 @@ class RawText(PatternElement):
         return self.text
 
 
+@dataclass
+class ConstantTagValue(RawText):
+    """Represents tag invocation evaluated once, when the template was bound
+
+    Rendered text is the same as the one produced by the original tag invocation,
+    but the value returned by the tag is kept for expression rendering.
+    """
+
+    value: Any = None
+
+    def process(self, file: File) -> Any:
+        return self.value
+
+
 @dataclass
 class Pattern(PatternElement):
     """Represents pattern tree - a chain of text/tag invocations"""
@@ -74,6 +109,37 @@ class Pattern(PatternElement):
             )
         )
 
+    def process_as_value(self, file: File) -> Any:
+        """Renders pattern as a string unless it consists of a single tag invocation
+
+        In such case, value returned by the tag is returned as is (without
+        conversion to a string).
+        """
+        if len(self.sub_elements) == 1 and isinstance(
+            self.sub_elements[0], (TagInstance, ConstantTagValue)
+        ):
+            return self.sub_elements[0].process(file)
+        return self.process(file)
+
+    def process_batch(self, files: Sequence[File]) -> List[str]:
+        """Renders pattern for multiple files, processing sub-elements in batches"""
+        if not self.sub_elements:
+            return ["" for _ in files]
+        sub_element_values = [
+            sub_element.process_batch(files) for sub_element in self.sub_elements
+        ]
+        return [
+            "".join(map(str, file_values)) for file_values in zip(*sub_element_values)
+        ]
+
+    def process_as_value_batch(self, files: Sequence[File]) -> List[Any]:
+        """Batched version of `process_as_value`"""
+        if len(self.sub_elements) == 1 and isinstance(
+            self.sub_elements[0], (TagInstance, ConstantTagValue)
+        ):
+            return self.sub_elements[0].process_batch(files)
+        return self.process_batch(files)
+
     def process_as_expression(self, file: File) -> str:
         """Recursively renders pattern as an expression string
 
@@ -92,7 +158,7 @@ class Pattern(PatternElement):
         """Renders value returned by tag invocation as a string representation (as to be used in evaluated
         expressions)"""
         tag_value = element.process(file)
-        if isinstance(element, TagInstance):
+        if isinstance(element, (TagInstance, ConstantTagValue)):
             return repr(tag_value)
         return str(tag_value)
 
@@ -134,6 +200,36 @@ class Tag(ABC):
     When set to None - context is optional (tag decides what to do with it).
     """
 
+    pure: bool = False
+    """Determine if tag output depends only on its configuration and context
+
+    Pure tags invoked with a context which doesn't depend on the processed file
+    are evaluated just once - when the template is bound.
+    """
+
+    stateful: bool = False
+    """Determine if tag output depends on its previous invocations
+
+    Instances of stateful tags are never shared between template invocations.
+    """
+
+    context_types: Tuple[type, ...] = ()
+    """Types of (non-string) context values accepted by the tag
+
+    When the context consists of a single tag invocation which returns a value
+    of one of these types, the value is passed to the `process` method as is.
+    Otherwise, the context is rendered as a string.
+    """
+
+    cost: int = 1
+    """Relative cost of the tag evaluation
+
+    Used to decide which operands of filter expressions should be evaluated first.
+    Tags operating only on the path use the default value, tags reading filesystem
+    metadata use 10, tags reading the file header (e.g. media metadata) use 100
+    and tags reading the whole file contents use 1000.
+    """
+
     def configure(self):
         """Initialize tag instance with configuration options provided by the user"""
         pass
@@ -143,6 +239,73 @@ class Tag(ABC):
         """Execute tag logic on a single file/context"""
         raise NotImplementedError()
 
+    def process_batch(
+        self, files: Sequence[File], contexts: Sequence[Any]
+    ) -> List[Any]:
+        """Execute tag logic on multiple files/contexts at once
+
+        Default implementation invokes `process` for each file. Tags which can
+        amortize their work between files (e.g. reuse library handles or group
+        system calls) should override it. If `MissingMetadataError` is raised,
+        values are calculated again, one by one, using `process`.
+        """
+        return [self.process(file, context) for file, context in zip(files, contexts)]
+
+    async def aprocess(self, file: File, context: Optional[str]) -> Any:
+        """Asynchronous version of `process` used by concurrent rendering
+
+        Default implementation runs `process` in the executor (thread pool) of
+        the running event loop. Stateful tags are never processed this way.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.process, file, context)
+
+    @classmethod
+    def supports_batch_processing(cls) -> bool:
+        """Checks if the tag provides its own `process_batch` implementation"""
+        return cls.process_batch is not Tag.process_batch
+
+
+def typed_context(value: Any, context_types: Tuple[type, ...]) -> Any:
+    """Returns context value if it is accepted by the tag or its string form otherwise"""
+    if isinstance(value, context_types):
+        # bool is a subclass of int, but shouldn't be treated as a number
+        if not isinstance(value, bool) or bool in context_types:
+            return value
+    return str(value)
+
+
+class GeneratedDocstring:
+    """Class docstring extended with details generated on the first access
+
+    Generating documentation (e.g. from metadata tables of external libraries)
+    is deferred until it is actually requested (by `--help` or `--list-tags`).
+    """
+
+    _docstring: Optional[str]
+    _generate_details: Optional[Callable[[], Iterable[str]]]
+
+    def __init__(
+        self, docstring: Optional[str], generate_details: Callable[[], Iterable[str]]
+    ):
+        self._docstring = docstring
+        self._generate_details = generate_details
+
+    def __get__(self, instance, owner=None) -> str:
+        if self._generate_details is not None:
+            details = self._generate_details()
+            self._docstring = "\n".join([str(self._docstring), *details])
+            self._generate_details = None
+        return str(self._docstring)
+
+
+def _parse_docstring(docstring: Optional[str]) -> "Docstring":
+    from docstring_parser import parse
+
+    return parse(docstring if docstring else "")
+
 
 class TagFactory(ABC):
     @property
@@ -174,6 +337,9 @@ class TagFactoryFromClass(TagFactory):
     _tag_class_suffix = "Tag"
     _tag_class: Type[Tag]
     _tag_name: str
+    # Docstrings are parsed only when documentation is requested
+    _class_docstring: Optional["Docstring"] = None
+    _configure_docstring: Optional["Docstring"] = None
 
     @property
     def tag_name(self) -> str:
@@ -218,6 +384,20 @@ class TagFactoryFromClass(TagFactory):
             return None
         return "\n".join(argument_description)
 
+    @property
+    def _parsed_class_docstring(self) -> "Docstring":
+        if self._class_docstring is None:
+            self._class_docstring = _parse_docstring(self._tag_class.__doc__)
+        return self._class_docstring
+
+    @property
+    def _parsed_configure_docstring(self) -> "Docstring":
+        if self._configure_docstring is None:
+            self._configure_docstring = _parse_docstring(
+                self._tag_class.configure.__doc__
+            )
+        return self._configure_docstring
+
     @property
     def short_description(self) -> str:
         if self._parsed_class_docstring.short_description:
@@ -230,12 +410,6 @@ class TagFactoryFromClass(TagFactory):
 
     def __init__(self, tag_class: Type[Tag], tag_name: Optional[str] = None):
         self._tag_class = tag_class
-        self._parsed_class_docstring = parse_docstring(
-            tag_class.__doc__ if tag_class.__doc__ else ""
-        )
-        self._parsed_configure_docstring = parse_docstring(
-            tag_class.configure.__doc__ if tag_class.configure.__doc__ else ""
-        )
         if tag_name:
             self._tag_name = tag_name
         else:
@@ -261,8 +435,183 @@ class TagInstance(PatternElement):
     context: Optional[Pattern] = None
 
     def process(self, file: File) -> Any:
-        context_str = self.context.process(file) if self.context else None
+        return self._process_with_context(file, self.process_context(file))
+
+    def _process_with_context(self, file: File, context: Any) -> Any:
         try:
-            return self.tag.process(file, context_str)
+            return self.tag.process(file, context)
         except MissingMetadataError:
             return ""
+
+    def process_batch(self, files: Sequence[File]) -> List[Any]:
+        contexts = self.process_context_batch(files)
+        try:
+            return list(self.tag.process_batch(files, contexts))
+        except MissingMetadataError:
+            return [
+                self._process_with_context(file, context)
+                for file, context in zip(files, contexts)
+            ]
+
+    def process_context(self, file: File) -> Any:
+        """Renders context in the form accepted by the tag"""
+        if self.context is None:
+            return None
+        if self.tag.context_types:
+            return typed_context(
+                self.context.process_as_value(file), self.tag.context_types
+            )
+        return self.context.process(file)
+
+    def process_context_batch(self, files: Sequence[File]) -> List[Any]:
+        """Batched version of `process_context`"""
+        if self.context is None:
+            return [None for _ in files]
+        if self.tag.context_types:
+            return [
+                typed_context(value, self.tag.context_types)
+                for value in self.context.process_as_value_batch(files)
+            ]
+        return self.context.process_batch(files)
+
+
+@dataclass
+class SharedTagInstance(TagInstance):
+    """Represents a tag bound to the implementation used in multiple template places
+
+    If the instance occurs more than once, its value is calculated only once
+    for each file and reused by the consecutive invocations.
+    """
+
+    occurrences: int = field(default=1, compare=False)
+    _values: Dict[Tuple[Path, Path], Any] = field(
+        default_factory=dict, init=False, compare=False, repr=False
+    )
+    _pending: Dict[Tuple[Path, Path], "asyncio.Future[Any]"] = field(
+        default_factory=dict, init=False, compare=False, repr=False
+    )
+
+    def process(self, file: File) -> Any:
+        return self.evaluate_once(file, super().process)
+
+    def process_batch(self, files: Sequence[File]) -> List[Any]:
+        if self.occurrences < 2:
+            return super().process_batch(files)
+        keys = [(file.input_directory, file.relative_path) for file in files]
+        missing_files = {
+            key: file for key, file in zip(keys, files) if key not in self._values
+        }
+        if missing_files:
+            missing_values = super().process_batch(list(missing_files.values()))
+            self._values.update(zip(missing_files.keys(), missing_values))
+        return [self._values[key] for key in keys]
+
+    def forget(self, files: Iterable[File]):
+        """Drops values cached for the files (which won't be evaluated again)"""
+        for file in files:
+            self._values.pop((file.input_directory, file.relative_path), None)
+
+    def clear(self):
+        """Drops all cached values"""
+        self._values.clear()
+
+    def evaluate_once(self, file: File, evaluate: Callable[[File], Any]) -> Any:
+        """Returns value cached for the file or calculates it using `evaluate`"""
+        if self.occurrences < 2:
+            return evaluate(file)
+        key = (file.input_directory, file.relative_path)
+        try:
+            return self._values[key]
+        except KeyError:
+            value = evaluate(file)
+            self._values[key] = value
+            return value
+
+    async def aevaluate_once(
+        self, file: File, evaluate: Callable[[File], Awaitable[Any]]
+    ) -> Any:
+        """Asynchronous version of `evaluate_once`
+
+        Concurrent evaluations for the same file await a single invocation.
+        """
+        if self.occurrences < 2:
+            return await evaluate(file)
+        key = (file.input_directory, file.relative_path)
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        pending = self._pending.get(key)
+        if pending is None:
+            import asyncio
+
+            pending = asyncio.ensure_future(evaluate(file))
+            self._pending[key] = pending
+        try:
+            value = await pending
+        finally:
+            self._pending.pop(key, None)
+        self._values[key] = value
+        return value
+
+
+def find_stateful_instances(element: PatternElement) -> List[TagInstance]:
+    """Returns stateful tag instances used in the element (in evaluation order)"""
+    if isinstance(element, TagInstance):
+        if element.tag.stateful:
+            # Context is rendered (synchronously) together with the tag
+            return [element]
+        if element.context is None:
+            return []
+        return find_stateful_instances(element.context)
+    if isinstance(element, Pattern):
+        return [
+            instance
+            for sub_element in element.sub_elements
+            for instance in find_stateful_instances(sub_element)
+        ]
+    return []
+
+
+def find_shared_instances(element: PatternElement) -> List[SharedTagInstance]:
+    """Returns tag instances used in the element which cache their values"""
+    instances: Dict[int, SharedTagInstance] = {}
+
+    def find(element: PatternElement):
+        if isinstance(element, SharedTagInstance) and element.occurrences > 1:
+            instances[id(element)] = element
+        if isinstance(element, TagInstance) and element.context is not None:
+            find(element.context)
+        elif isinstance(element, Pattern):
+            for sub_element in element.sub_elements:
+                find(sub_element)
+
+    find(element)
+    return list(instances.values())
+
+
+def find_tags(element: PatternElement) -> List[Tag]:
+    """Returns tags used in the element (including the ones in contexts)"""
+    if isinstance(element, TagInstance):
+        tags = [element.tag]
+        if element.context is not None:
+            tags.extend(find_tags(element.context))
+        return tags
+    if isinstance(element, Pattern):
+        return [
+            tag
+            for sub_element in element.sub_elements
+            for tag in find_tags(sub_element)
+        ]
+    return []
+
+
+def reads_file_contents(element: PatternElement) -> bool:
+    """Checks whether any tag in the element reads the whole file contents (see `Tag.cost`)"""
+    if isinstance(element, TagInstance):
+        return element.tag.cost >= 1000 or (
+            element.context is not None and reads_file_contents(element.context)
+        )
+    if isinstance(element, Pattern):
+        return any(map(reads_file_contents, element.sub_elements))
+    return False
@@ -5,9 +5,26 @@ from typing import Callable
 import pytest
 from _pytest.tmpdir import TempPathFactory
 
+from tempren.filesystem import FileDigestCache
 from tempren.path_generator import File
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache_directory(
+    tmp_path_factory: TempPathFactory, monkeypatch: pytest.MonkeyPatch
+) -> Path:
+    """Prevents tests from using (and polluting) the user cache directory"""
+    cache_directory = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_directory))
+    return cache_directory
+
+
+@pytest.fixture
+def recorded_digests() -> FileDigestCache:
+    """Cache of the file digests (calculated by the hash tags)"""
+    return FileDigestCache()
+
+
 @pytest.fixture
 def nonexistent_path() -> Path:
     return Path("nonexistent", "path")
@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
@@ -234,6 +235,13 @@ class TestNameTag:
 
         assert filename == "file.name"
 
+    def test_path_context(self, nonexistent_file: File):
+        tag = NameTag()
+
+        filename = tag.process(nonexistent_file, Path("test/file.name"))
+
+        assert filename == "file.name"
+
 
 class TestSanitizeTag:
     def test_no_special_chars(self, nonexistent_file: File):
@@ -367,6 +375,41 @@ class TestIsMimeTag:
         assert is_flac
 
 
+@pytest.mark.parametrize(
+    "tag_factory",
+    [
+        MimeTag,
+        lambda: _mime_tag(type=True),
+        MimeExtTag,
+        lambda: _is_mime_tag("audio"),
+    ],
+)
+def test_mime_batch_processing(tag_factory, audio_data_dir: Path, text_data_dir: Path):
+    tag = tag_factory()
+    files = [
+        File(audio_data_dir, Path("sample.mp3")),
+        File(text_data_dir, Path("hello.txt")),
+        File(audio_data_dir, Path("sample.flac")),
+    ]
+    expected_values = [tag.process(file, None) for file in files]
+
+    values = tag.process_batch(files, [None] * len(files))
+
+    assert values == expected_values
+
+
+def _mime_tag(**kwargs) -> MimeTag:
+    tag = MimeTag()
+    tag.configure(**kwargs)
+    return tag
+
+
+def _is_mime_tag(type_prefix: str) -> IsMimeTag:
+    tag = IsMimeTag()
+    tag.configure(type_prefix)
+    return tag
+
+
 class TestDefaultTag:
     def test_no_default_value_provided(self):
         tag = DefaultTag()
@@ -427,6 +470,14 @@ class TestAsSizeTag:
 
         assert size_in_unit == "1"
 
+    def test_numeric_context(self, nonexistent_file: File):
+        tag = AsSizeTag()
+        tag.configure("K")
+
+        size_in_unit = tag.process(nonexistent_file, 2048)
+
+        assert size_in_unit == "2"
+
     @pytest.mark.parametrize(
         "unit,unit_multiplier",
         [
@@ -573,6 +624,14 @@ class TestAsTimeTag:
 
         assert result == "15-10-20"
 
+    def test_datetime_context(self, nonexistent_file: File):
+        tag = AsTimeTag()
+        tag.configure("%d-%m-%y")
+
+        result = tag.process(nonexistent_file, datetime(2020, 10, 15, 11, 33, 39))
+
+        assert result == "15-10-20"
+
 
 class TestAsDurationTag:
     def test_invalid_input(self, nonexistent_file: File):
@@ -590,6 +649,14 @@ class TestAsDurationTag:
 
         assert result == "06-05-04-03-02-0001"
 
+    def test_timedelta_context(self, nonexistent_file: File):
+        tag = AsDurationTag()
+        tag.configure("%H:%M:%S")
+
+        result = tag.process(nonexistent_file, timedelta(hours=1, minutes=2, seconds=3))
+
+        assert result == "01:02:03"
+
 
 class TestAsIntTag:
     def test_invalid_input(self, nonexistent_file: File):
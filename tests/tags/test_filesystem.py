@@ -1,9 +1,21 @@
 import datetime
 import os.path
 from pathlib import Path
+from typing import List
+
+import pytest
 
 from tempren.path_generator import File
 from tempren.tags.filesystem import GroupTag, MTimeTag, OwnerTag, SizeTag
+from tempren.template.tree_elements import Tag
+
+
+@pytest.fixture
+def nested_files(nested_data_dir: Path) -> List[File]:
+    return [
+        File(nested_data_dir, path.relative_to(nested_data_dir))
+        for path in sorted(nested_data_dir.rglob("*.file"))
+    ]
 
 
 class TestSizeTag:
@@ -61,3 +73,13 @@ class TestGroupTag:
         group = tag.process(hello_file, None)
 
         assert hello_group == group
+
+
+@pytest.mark.parametrize("tag", [OwnerTag(), GroupTag()])
+def test_batch_processing(tag: Tag, nested_files: List[File]):
+    expected_values = [tag.process(file, None) for file in nested_files]
+
+    values = tag.process_batch(nested_files, [None] * len(nested_files))
+
+    assert tag.supports_batch_processing()
+    assert values == expected_values
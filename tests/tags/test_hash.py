@@ -1,7 +1,18 @@
 from pathlib import Path
 
+import pytest
+
+from tempren.filesystem import FileDigestCache
 from tempren.path_generator import File
-from tempren.tags.hash import Crc32Tag, Md5Tag, Sha1Tag, Sha224Tag, Sha256Tag
+from tempren.tags.hash import (
+    BATCH_CHUNK_SIZE,
+    Crc32Tag,
+    Md5Tag,
+    Sha1Tag,
+    Sha224Tag,
+    Sha256Tag,
+)
+from tempren.template.tree_elements import Tag
 
 
 class TestMd5Tag:
@@ -35,6 +46,38 @@ class TestSha256Tag:
             result == "66a045b452102c59d840ec097d59d9467e13a3f34f6494e539ffd32c1bb35f18"
         )
 
+    def test_digest_is_recorded(
+        self, text_data_dir: Path, recorded_digests: FileDigestCache
+    ):
+        tag = Sha256Tag()
+        tag.file_digests = recorded_digests
+        hello_file = File(text_data_dir, Path("hello.txt"))
+
+        result = tag.process(hello_file, None)
+
+        assert recorded_digests.find(hello_file.absolute_path.stat()) == (
+            "sha256",
+            result,
+        )
+
+    def test_batch_digests_are_recorded(
+        self, text_data_dir: Path, recorded_digests: FileDigestCache
+    ):
+        tag = Sha256Tag()
+        tag.file_digests = recorded_digests
+        files = [
+            File(text_data_dir, Path("hello.txt")),
+            File(text_data_dir, Path("markdown.md")),
+        ]
+
+        results = tag.process_batch(files, [None, None])
+
+        for file, result in zip(files, results):
+            assert recorded_digests.find(file.absolute_path.stat()) == (
+                "sha256",
+                result,
+            )
+
 
 class TestSha224Tag:
     def test_text_file_hash(self, text_data_dir: Path):
@@ -54,3 +97,21 @@ class TestCrc32Tag:
         result = tag.process(hello_file, None)
 
         assert result == "31963516"
+
+
+@pytest.mark.parametrize(
+    "tag", [Md5Tag(), Sha1Tag(), Sha256Tag(), Sha224Tag(), Crc32Tag()]
+)
+def test_batch_processing(tag: Tag, text_data_dir: Path):
+    large_file_path = text_data_dir / "large.bin"
+    large_file_path.write_bytes(bytes(range(256)) * (BATCH_CHUNK_SIZE // 100))
+    files = [
+        File(text_data_dir, Path("hello.txt")),
+        File(text_data_dir, Path("large.bin")),
+        File(text_data_dir, Path("markdown.md")),
+    ]
+    expected_values = [tag.process(file, None) for file in files]
+
+    values = tag.process_batch(files, [None] * len(files))
+
+    assert values == expected_values
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Any, Callable, Mapping, Optional, Tuple
+from typing import Any, Callable, List, Mapping, Optional, Sequence, Tuple
 
 from tempren.path_generator import File
 from tempren.template.tree_builder import ArgValue
@@ -16,6 +16,8 @@ class MockTag(Tag):
     configure_invoked: bool = False
     process_invoked: bool = False
     require_context: Optional[bool] = None
+    pure: bool = False
+    context_types: Tuple[type, ...] = ()
 
     def configure(self, *args, **kwargs):
         self.configure_invoked = True
@@ -35,3 +37,19 @@ class GeneratorTag(Tag):
 
     def process(self, file: File, context: Optional[str]) -> Any:
         return self.output_generator(file, context)
+
+
+@dataclass
+class BatchGeneratorTag(GeneratorTag):
+    """Generator tag with batched implementation recording processed batches"""
+
+    batches: List[List[File]] = field(default_factory=list)
+
+    def process_batch(
+        self, files: Sequence[File], contexts: Sequence[Any]
+    ) -> List[Any]:
+        self.batches.append(list(files))
+        return [
+            self.output_generator(file, context)
+            for file, context in zip(files, contexts)
+        ]
@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, Optional
+
+import pytest
+
+from tempren.path_generator import File
+from tempren.tags.core import CountTag
+from tempren.template.async_renderer import (
+    AsyncPatternRenderer,
+    find_stateful_instances,
+)
+from tempren.template.tree_elements import (
+    ConstantTagValue,
+    MissingMetadataError,
+    Pattern,
+    RawText,
+    SharedTagInstance,
+    Tag,
+    TagInstance,
+)
+
+from .mocks import GeneratorTag, MockTag
+
+
+@dataclass
+class ConcurrencyTrackingTag(Tag):
+    """Sleeps for the time depending on the file name and tracks concurrent calls"""
+
+    active: int = 0
+    max_active: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def process(self, file: File, context: Optional[str]) -> Any:
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        # Later files finish earlier
+        time.sleep(0.02 / int(file.relative_path.stem))
+        with self.lock:
+            self.active -= 1
+        return file.relative_path.stem
+
+
+@dataclass
+class AsyncTag(Tag):
+    invoked_for: List[File] = field(default_factory=list)
+
+    def process(self, file: File, context: Optional[str]) -> Any:
+        raise AssertionError("synchronous implementation shouldn't be used")
+
+    async def aprocess(self, file: File, context: Optional[str]) -> Any:
+        self.invoked_for.append(file)
+        await asyncio.sleep(0)
+        return f"async-{context}"
+
+
+def _files(directory: Path, count: int) -> List[File]:
+    return [File(directory, Path(f"{index}.file")) for index in range(1, count + 1)]
+
+
+def _count_tag() -> CountTag:
+    tag = CountTag()
+    tag.configure()
+    return tag
+
+
+class TestAsyncPatternRenderer:
+    def test_output_order_is_preserved(self, nonexistent_absolute_path: Path):
+        files = _files(nonexistent_absolute_path, 8)
+        pattern = Pattern([RawText("name-"), TagInstance(tag=ConcurrencyTrackingTag())])
+        renderer = AsyncPatternRenderer(pattern, concurrency=4)
+
+        assert renderer.render_all(files) == [pattern.process(file) for file in files]
+
+    def test_concurrency_is_limited(self, nonexistent_absolute_path: Path):
+        files = _files(nonexistent_absolute_path, 12)
+        tag = ConcurrencyTrackingTag()
+        pattern = Pattern([TagInstance(tag=tag), TagInstance(tag=tag)])
+        renderer = AsyncPatternRenderer(pattern, concurrency=3)
+
+        renderer.render_all(files)
+
+        # Two tag invocations per file
+        assert 1 < tag.max_active <= 2 * 3
+
+    def test_stateful_tags_are_deterministic(self, nonexistent_absolute_path: Path):
+        files = _files(nonexistent_absolute_path, 10)
+        pattern = Pattern(
+            [
+                TagInstance(tag=ConcurrencyTrackingTag()),
+                RawText("-"),
+                TagInstance(tag=_count_tag()),
+            ]
+        )
+        renderer = AsyncPatternRenderer(pattern, concurrency=5)
+
+        rendered = renderer.render_all(files)
+
+        assert rendered == [f"{index + 1}-{index}" for index in range(10)]
+
+    def test_async_implementation_is_used(self, nonexistent_file: File):
+        tag = AsyncTag()
+        pattern = Pattern(
+            [TagInstance(tag=tag, context=Pattern([TagInstance(tag=MockTag())]))]
+        )
+        renderer = AsyncPatternRenderer(pattern, concurrency=2)
+
+        assert renderer.render_all([nonexistent_file]) == ["async-Mock output"]
+        assert tag.invoked_for == [nonexistent_file]
+
+    def test_shared_instance_is_evaluated_once(self, nonexistent_file: File):
+        tag = AsyncTag()
+        shared_instance = SharedTagInstance(tag=tag)
+        shared_instance.occurrences = 2
+        pattern = Pattern([shared_instance, RawText("/"), shared_instance])
+        renderer = AsyncPatternRenderer(pattern, concurrency=2)
+
+        assert renderer.render_all([nonexistent_file]) == ["async-None/async-None"]
+        assert tag.invoked_for == [nonexistent_file]
+
+    def test_missing_metadata_error_is_handled(self, nonexistent_file: File):
+        def _tag_implementation(file, context):
+            raise MissingMetadataError()
+
+        pattern = Pattern(
+            [RawText("a"), TagInstance(tag=GeneratorTag(_tag_implementation))]
+        )
+        renderer = AsyncPatternRenderer(pattern, concurrency=2)
+
+        assert renderer.render_all([nonexistent_file]) == ["a"]
+
+    def test_typed_context(self, nonexistent_file: File):
+        outer_tag = MockTag(context_types=(int,))
+        context_pattern = Pattern([ConstantTagValue(text="12", value=12)])
+        pattern = Pattern([TagInstance(tag=outer_tag, context=context_pattern)])
+        renderer = AsyncPatternRenderer(pattern, concurrency=2)
+
+        renderer.render_all([nonexistent_file])
+
+        assert outer_tag.context == 12
+
+    def test_tag_errors_are_propagated(self, nonexistent_file: File):
+        def _tag_implementation(file, context):
+            raise ValueError("tag error")
+
+        pattern = Pattern([TagInstance(tag=GeneratorTag(_tag_implementation))])
+        renderer = AsyncPatternRenderer(pattern, concurrency=2)
+
+        with pytest.raises(ValueError):
+            renderer.render_all([nonexistent_file])
+
+    def test_loop_and_threads_are_reused(self, nonexistent_absolute_path: Path):
+        thread_names = set()
+
+        def _tag_implementation(file, context):
+            thread_names.add(threading.current_thread().name)
+            return file.relative_path.stem
+
+        files = _files(nonexistent_absolute_path, 4)
+        pattern = Pattern([TagInstance(tag=GeneratorTag(_tag_implementation))])
+        renderer = AsyncPatternRenderer(pattern, concurrency=2)
+
+        loops = []
+        for batch_start in range(0, len(files), 2):
+            renderer.render_all(files[batch_start : batch_start + 2])
+            loops.append(renderer._loop)
+        renderer.close()
+
+        assert loops[0] is loops[1]
+        assert loops[0] is not None and loops[0].is_closed()
+        assert len(thread_names) <= 2
+
+    def test_renderer_can_be_used_after_error(self, nonexistent_file: File):
+        def _tag_implementation(file, context):
+            if not invocations:
+                invocations.append(file)
+                raise ValueError("tag error")
+            return "value"
+
+        invocations: List[File] = []
+        pattern = Pattern([TagInstance(tag=GeneratorTag(_tag_implementation))])
+        renderer = AsyncPatternRenderer(pattern, concurrency=2)
+
+        with pytest.raises(ValueError):
+            renderer.render_all([nonexistent_file])
+        assert renderer.render_all([nonexistent_file]) == ["value"]
+
+
+def test_find_stateful_instances():
+    stateful_instance = TagInstance(tag=_count_tag())
+    nested_stateful_instance = TagInstance(tag=_count_tag())
+    pattern = Pattern(
+        [
+            TagInstance(tag=MockTag(), context=Pattern([nested_stateful_instance])),
+            stateful_instance,
+            TagInstance(tag=MockTag()),
+        ]
+    )
+
+    assert find_stateful_instances(pattern) == [
+        nested_stateful_instance,
+        stateful_instance,
+    ]
@@ -0,0 +1,135 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import tempren.template
+from tempren.template import antlr_parser
+from tempren.template.cache import (
+    TemplateCache,
+    code_version,
+    default_cache_directory,
+    default_template_cache,
+)
+from tempren.template.tree_builder import TagTreeBuilder, TemplateSyntaxError
+from tempren.template.tree_elements import Pattern
+
+
+def parse(text: str) -> Pattern:
+    return TagTreeBuilder().parse(text)
+
+
+class TestTemplateCache:
+    def test_missing_entry(self, tmp_path: Path):
+        cache = TemplateCache(tmp_path, "1.0.0")
+
+        assert cache.load("%Name()") is None
+
+    def test_stored_pattern_is_loaded(self, tmp_path: Path):
+        cache = TemplateCache(tmp_path, "1.0.0")
+        pattern = parse("Text %Category.Tag(1, 'a', flag){%Other()}|%Piped()")
+
+        cache.store(pattern.source_representation, pattern)
+        loaded_pattern = cache.load(pattern.source_representation)
+
+        assert loaded_pattern == pattern
+        assert loaded_pattern is not pattern
+        assert loaded_pattern.source_representation == pattern.source_representation
+        assert (
+            loaded_pattern.sub_elements[0].location == pattern.sub_elements[0].location
+        )
+
+    def test_entries_are_version_specific(self, tmp_path: Path):
+        pattern = parse("%Name()")
+        TemplateCache(tmp_path, "1.0.0").store("%Name()", pattern)
+
+        assert TemplateCache(tmp_path, "1.0.1").load("%Name()") is None
+
+    def test_corrupted_entry_is_ignored(self, tmp_path: Path):
+        cache = TemplateCache(tmp_path, "1.0.0")
+        cache.store("%Name()", parse("%Name()"))
+        for entry_path in tmp_path.iterdir():
+            entry_path.write_bytes(b"garbage")
+
+        assert cache.load("%Name()") is None
+
+    def test_unwritable_directory_is_ignored(self, tmp_path: Path):
+        cache_file = tmp_path / "file"
+        cache_file.write_text("not a directory")
+        cache = TemplateCache(cache_file / "cache", "1.0.0")
+
+        cache.store("%Name()", parse("%Name()"))
+
+        assert cache.load("%Name()") is None
+
+    def test_default_directory_follows_xdg_specification(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+        assert default_cache_directory() == tmp_path / "tempren" / "templates"
+
+    def test_cache_is_disabled_by_default(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.delenv("TEMPREN_TEMPLATE_CACHE", raising=False)
+
+        assert default_template_cache() is None
+
+    def test_cache_can_be_enabled(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        monkeypatch.setenv("TEMPREN_TEMPLATE_CACHE", "1")
+
+        cache = default_template_cache()
+
+        assert cache is not None
+        assert cache.directory == tmp_path / "tempren" / "templates"
+
+    def test_entries_are_invalidated_by_code_changes(self, tmp_path: Path):
+        module_path = tmp_path / "tree_elements.py"
+        module_path.write_text("class Pattern: pass\n")
+        os.utime(module_path, ns=(1_000_000_000, 1_000_000_000))
+        original_version = code_version(tmp_path)
+
+        module_path.write_text("class Pattern: changed = True\n")
+        os.utime(module_path, ns=(1_000_000_000, 1_000_000_000))
+
+        assert code_version(tmp_path) != original_version
+
+    def test_default_version_identifies_template_modules(self, tmp_path: Path):
+        template_package = Path(tempren.template.__file__).parent
+
+        assert TemplateCache(tmp_path).version == code_version(template_package)
+
+
+class TestTagTreeBuilderCache:
+    def test_parsed_template_is_cached(self, tmp_path: Path):
+        cache = TemplateCache(tmp_path, "1.0.0")
+        tree_builder = TagTreeBuilder(cache)
+
+        pattern = tree_builder.parse("%Upper(){%Name()}")
+
+        assert cache.load("%Upper(){%Name()}") == pattern
+
+    def test_cached_template_is_not_parsed(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        cache = TemplateCache(tmp_path, "1.0.0")
+        expected_pattern = TagTreeBuilder(cache).parse("%Upper(){%Name()}")
+
+        def _failing_parse_template(text: str):
+            pytest.fail("Template shouldn't be parsed")
+
+        monkeypatch.setattr(antlr_parser, "parse_template", _failing_parse_template)
+        pattern = TagTreeBuilder(cache).parse("%Upper(){%Name()}")
+
+        assert pattern == expected_pattern
+
+    def test_syntax_errors_are_not_cached(self, tmp_path: Path):
+        cache = TemplateCache(tmp_path, "1.0.0")
+        tree_builder = TagTreeBuilder(cache)
+
+        with pytest.raises(TemplateSyntaxError):
+            tree_builder.parse("%Upper(")
+
+        assert not list(tmp_path.iterdir())
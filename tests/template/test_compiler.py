@@ -0,0 +1,205 @@
+from pathlib import Path
+
+import pytest
+
+from tempren.path_generator import File
+from tempren.pipeline import build_tag_registry
+from tempren.template.compiler import compile_pattern, generate_source
+from tempren.template.tree_builder import TagTreeBuilder
+from tempren.template.tree_elements import (
+    ConstantTagValue,
+    MissingMetadataError,
+    Pattern,
+    RawText,
+    SharedTagInstance,
+    TagInstance,
+)
+
+from .mocks import GeneratorTag, MockTag
+
+
+def _raise_missing_metadata(file, context):
+    raise MissingMetadataError()
+
+
+def _tag(implementation, context=None) -> TagInstance:
+    return TagInstance(tag=GeneratorTag(implementation), context=context)
+
+
+def _typed_tag(implementation, context) -> TagInstance:
+    tag = GeneratorTag(implementation)
+    tag.context_types = (int, float)
+    return TagInstance(tag=tag, context=context)
+
+
+equivalence_patterns = [
+    Pattern(),
+    Pattern([RawText("")]),
+    Pattern([RawText("text")]),
+    Pattern([RawText("foo"), RawText("bar")]),
+    Pattern([RawText("'quoted' \"text\" \\ {}\n")]),
+    Pattern([_tag(lambda file, context: 123)]),
+    Pattern([_tag(lambda file, context: file.relative_path)]),
+    Pattern([_tag(lambda file, context: None)]),
+    Pattern([RawText("a"), _tag(lambda file, context: 1.5), RawText("b")]),
+    Pattern([RawText("foo"), _tag(_raise_missing_metadata), RawText("bar")]),
+    Pattern(
+        [
+            _tag(
+                lambda file, context: context.upper(),
+                context=Pattern(
+                    [RawText("ctx-"), _tag(lambda file, context: file.relative_path)]
+                ),
+            )
+        ]
+    ),
+    Pattern(
+        [
+            _tag(
+                lambda file, context: f"[{context}]",
+                context=Pattern([_tag(_raise_missing_metadata)]),
+            )
+        ]
+    ),
+    Pattern(
+        [
+            _tag(
+                lambda file, context: repr(context),
+                context=Pattern([]),
+            )
+        ]
+    ),
+    Pattern([Pattern([RawText("nested "), _tag(lambda file, context: 42)])]),
+    Pattern(
+        [
+            _typed_tag(
+                lambda file, context: repr(context),
+                context=Pattern([_tag(lambda file, context: 42)]),
+            )
+        ]
+    ),
+    Pattern(
+        [
+            _typed_tag(
+                lambda file, context: repr(context),
+                context=Pattern([_tag(lambda file, context: True)]),
+            )
+        ]
+    ),
+    Pattern(
+        [
+            _typed_tag(
+                lambda file, context: repr(context),
+                context=Pattern([ConstantTagValue(text="1.5", value=1.5)]),
+            )
+        ]
+    ),
+    Pattern(
+        [
+            _typed_tag(
+                lambda file, context: repr(context),
+                context=Pattern([RawText("4"), _tag(lambda file, context: 2)]),
+            )
+        ]
+    ),
+]
+
+
+class TestCompilePattern:
+    @pytest.mark.parametrize("pattern", equivalence_patterns)
+    def test_equivalent_to_tree_interpreter(
+        self, pattern: Pattern, nonexistent_file: File
+    ):
+        render = compile_pattern(pattern)
+
+        assert render(nonexistent_file) == pattern.process(nonexistent_file)
+
+    def test_raw_text_is_inlined(self):
+        pattern = Pattern([RawText("foo"), RawText("bar")])
+
+        source = generate_source(pattern)
+
+        assert "'foobar'" in source
+        assert "def _tag" not in source
+
+    def test_tag_is_invoked_on_each_render(self, nonexistent_file: File):
+        mock_tag = MockTag(process_output="output")
+        render = compile_pattern(Pattern([TagInstance(tag=mock_tag)]))
+
+        assert render(nonexistent_file) == "output"
+        assert mock_tag.process_invoked
+        assert mock_tag.file == nonexistent_file
+        assert mock_tag.context is None
+
+    def test_context_is_passed_to_tag(self, nonexistent_file: File):
+        outer_tag = MockTag()
+        context_pattern = Pattern(
+            [RawText("Context "), TagInstance(MockTag(process_output="output"))]
+        )
+        render = compile_pattern(Pattern([TagInstance(outer_tag, context_pattern)]))
+
+        render(nonexistent_file)
+
+        assert outer_tag.context == "Context output"
+
+    def test_tag_errors_are_propagated(self, nonexistent_file: File):
+        def _raise_value_error(file, context):
+            raise ValueError("tag error")
+
+        render = compile_pattern(Pattern([_tag(_raise_value_error)]))
+
+        with pytest.raises(ValueError) as exc:
+            render(nonexistent_file)
+        assert exc.match("tag error")
+
+    def test_shared_tag_value_cache_is_used(self, nonexistent_file: File):
+        invocations = 0
+
+        def _tag_implementation(file, context):
+            nonlocal invocations
+            invocations += 1
+            return invocations
+
+        shared_instance = SharedTagInstance(tag=GeneratorTag(_tag_implementation))
+        shared_instance.occurrences = 2
+        pattern = Pattern([shared_instance])
+
+        assert pattern.process(nonexistent_file) == "1"
+        assert compile_pattern(pattern)(nonexistent_file) == "1"
+        assert invocations == 1
+
+    def test_deep_nesting(self, nonexistent_file: File):
+        pattern = Pattern([RawText("text")])
+        for _ in range(150):
+            pattern = Pattern(
+                [_tag(lambda file, context: context + ".", context=pattern)]
+            )
+
+        render = compile_pattern(pattern)
+
+        assert render(nonexistent_file) == pattern.process(nonexistent_file)
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "%Upper(){%Name()}",
+        "%Base()_%Count(start=5, width=3)%Ext()",
+        "%Lower(){%Base()}|%Capitalize()",
+        "%Size() bytes, %AsSize('K', 2){%Size()} KiB",
+        "%Default('none'){%Strip(){   }}",
+        "%Md5()-%Crc32()",
+        "%Mime(type=true)/%Mime(subtype=true)",
+        "%Name(){%Dir()}",
+        "%Round(1){%AsSize('K', 2){%Size()}}",
+    ],
+)
+def test_bound_templates_equivalence(template: str, text_data_dir: Path):
+    registry = build_tag_registry()
+    tree_builder = TagTreeBuilder()
+    interpreted_pattern = registry.bind(tree_builder.parse(template))
+    render = compile_pattern(registry.bind(tree_builder.parse(template)))
+
+    for file_name in ("hello.txt", "markdown.md"):
+        file = File(text_data_dir, Path(file_name))
+        assert render(file) == interpreted_pattern.process(file)
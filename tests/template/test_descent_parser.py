@@ -0,0 +1,171 @@
+import random
+from typing import Any, List
+
+import pytest
+
+from tempren.template import antlr_parser, descent_parser
+from tempren.template.tree_builder import TagTreeBuilder, TemplateSyntaxError
+from tempren.template.tree_elements import Pattern, RawText, TagPlaceholder
+
+
+def _tree_summary(element) -> Any:
+    """Returns comparable representation of the tree including locations"""
+    if isinstance(element, Pattern):
+        return [_tree_summary(sub_element) for sub_element in element.sub_elements]
+    if isinstance(element, RawText):
+        return "raw", element.text, element.location
+    assert isinstance(element, TagPlaceholder)
+    return (
+        "tag",
+        element.tag_name,
+        [(type(arg), arg) for arg in element.args],
+        [(name, type(value), value) for name, value in element.kwargs.items()],
+        None if element.context is None else _tree_summary(element.context),
+        element.location,
+    )
+
+
+def _reference_result(template: str) -> Any:
+    try:
+        return _tree_summary(antlr_parser.parse_template(template))
+    except TemplateSyntaxError as exc:
+        return "error", exc.message, exc.location
+
+
+def _tested_result(template: str) -> Any:
+    try:
+        return _tree_summary(TagTreeBuilder().parse(template))
+    except TemplateSyntaxError as exc:
+        return "error", exc.message, exc.location
+
+
+valid_templates = [
+    "",
+    "text",
+    "\t\n\r",
+    "text\twith\nwhitespace\r",
+    "escaped \\{ \\} \\| \\' \\\\ \\",
+    "\\\\{",
+    "%Tag()",
+    "%Category.Tag()",
+    "%_tag_1()",
+    "%\tTag\t.\rName\n()",
+    "%Tag(1, -12, 007, -0)",
+    "%Tag(true, True, false, False, TRUE, truex)",
+    "%Tag(flag)",
+    "%Tag( name = 'value' , other=\n2 )",
+    "%Tag(name='first', name='second')",
+    "%Tag('', \"\", 'quote\\'', \"double\\\"quote\", 'a\\'b', 'multi\nline')",
+    "%Tag('\\\\{ \\} \\|')",
+    "%Tag(){}",
+    "%Tag(){context}",
+    "%Tag()\t{context}",
+    "%Tag(){%Nested(){%Deeper(1)}}",
+    "text|%Tag()",
+    "|%Tag()",
+    "text|%First()|\n%Second(){ignored context}",
+    "%Tag(){text|%Piped()}",
+    "first line\n%Tag()\nsecond line %C.T(\n'x\ny')z",
+]
+
+invalid_templates = [
+    "%",
+    "%%",
+    "%Tag",
+    "%Tag(",
+    "%Tag(1",
+    "%Tag('unclosed",
+    "%Tag(-)",
+    "%Tag(a b)",
+    "%Tag(a=)",
+    "%Tag(1,)",
+    "%Tag(,)",
+    "%Tag(=1)",
+    "%Tag(a=b)",
+    "%Tag('a\\''b')",
+    "%Tag(){",
+    "%Tag(){text",
+    "%Tag()}",
+    "%.Tag()",
+    "%Category.()",
+    "%C.D.E()",
+    "%()text",
+    "{",
+    "}",
+    "|",
+    "||",
+    "text|",
+    "%Tag()|",
+    "text|plain",
+    "a|%Tag()|b",
+    "a|%Tag()b",
+]
+
+lexer_recovery_templates = [
+    "% Tag()",
+    "%Tag ()",
+    "%1Tag()",
+    "%Tag(@)",
+    "%Tag(--1)",
+]
+
+
+class TestDescentParser:
+    @pytest.mark.parametrize("template", valid_templates)
+    def test_valid_template(self, template: str):
+        pattern = descent_parser.parse_template(template)
+
+        assert _tree_summary(pattern) == _reference_result(template)
+
+    @pytest.mark.parametrize("template", invalid_templates + lexer_recovery_templates)
+    def test_fallback_is_required(self, template: str):
+        with pytest.raises(descent_parser.FallbackRequired):
+            descent_parser.parse_template(template)
+
+
+@pytest.mark.parametrize(
+    "template", valid_templates + invalid_templates + lexer_recovery_templates
+)
+def test_equivalent_to_antlr_parser(template: str):
+    assert _tested_result(template) == _reference_result(template)
+
+
+_FRAGMENTS = [
+    "%Tag()",
+    "%C.Tag(1, n='s')",
+    '%Tag(flag, -2, "q\\"")',
+    "%",
+    "Tag",
+    ".",
+    "(",
+    ")",
+    "{",
+    "}",
+    "|",
+    ",",
+    "=",
+    "'",
+    "\\",
+    "\\{",
+    "text",
+    " ",
+    "\t",
+    "\n",
+    "true",
+    "1",
+    "@",
+]
+
+
+def _random_template(generator: random.Random) -> str:
+    fragments: List[str] = [
+        generator.choice(_FRAGMENTS) for _ in range(generator.randint(0, 10))
+    ]
+    return "".join(fragments)
+
+
+def test_differential_random_corpus():
+    generator = random.Random(2022)
+    for _ in range(1000):
+        template = _random_template(generator)
+        assert _tested_result(template) == _reference_result(template), template
@@ -0,0 +1,272 @@
+import datetime
+
+import pytest
+
+from tempren.path_generator import ExpressionEvaluationError, File
+from tempren.template.expression import CompiledExpression
+from tempren.template.tree_elements import (
+    ConstantTagValue,
+    FileNotSupportedError,
+    MissingMetadataError,
+    Pattern,
+    RawText,
+    TagInstance,
+)
+
+from .mocks import GeneratorTag, MockTag
+
+
+def _tag_instance(value, cost: int = 1) -> TagInstance:
+    mock_tag = MockTag()
+    mock_tag.process_output = value
+    mock_tag.cost = cost
+    return TagInstance(tag=mock_tag)
+
+
+def _invoked(tag_instance: TagInstance) -> bool:
+    assert isinstance(tag_instance.tag, MockTag)
+    return tag_instance.tag.process_invoked
+
+
+class TestCompiledExpression:
+    @pytest.mark.parametrize(
+        "pattern",
+        [
+            Pattern([RawText("1 + 2")]),
+            Pattern([_tag_instance(1), RawText(" + 2")]),
+            Pattern([_tag_instance("foo"), RawText(".startswith('f')")]),
+            Pattern([RawText("len("), _tag_instance("foo"), RawText(")")]),
+            Pattern([ConstantTagValue("1", value=1), RawText("+"), _tag_instance(2)]),
+        ],
+    )
+    def test_expression_is_compiled(self, pattern: Pattern):
+        expression = CompiledExpression(pattern)
+
+        assert expression.function is not None
+
+    @pytest.mark.parametrize(
+        "pattern,expected_value",
+        [
+            (Pattern([_tag_instance(1), RawText(" + 2")]), 3),
+            (Pattern([_tag_instance("foo"), RawText(".startswith('f')")]), True),
+            (Pattern([RawText("len("), _tag_instance("foo"), RawText(")")]), 3),
+            (Pattern([_tag_instance(2), RawText("*"), _tag_instance(3)]), 6),
+            (Pattern([ConstantTagValue("1", value=1), RawText("+1")]), 2),
+            (
+                Pattern(
+                    [
+                        RawText("any(c in "),
+                        _tag_instance("foo"),
+                        RawText(" for c in 'xo')"),
+                    ]
+                ),
+                True,
+            ),
+        ],
+    )
+    def test_compiled_evaluation(
+        self, pattern: Pattern, expected_value, nonexistent_file: File
+    ):
+        expression = CompiledExpression(pattern)
+
+        assert expression.evaluate(nonexistent_file) == expected_value
+
+    @pytest.mark.parametrize(
+        "pattern,expected_value",
+        [
+            (
+                Pattern([RawText("'prefix-"), _tag_instance(1), RawText("'")]),
+                "prefix-1",
+            ),
+            (Pattern([RawText("'foo' # "), _tag_instance(1)]), "foo"),
+            (Pattern([_tag_instance("a"), _tag_instance("b")]), "ab"),
+            (Pattern([RawText("1"), _tag_instance(2)]), 12),
+            (Pattern([RawText("b"), _tag_instance("foo")]), b"foo"),
+            (Pattern([_tag_instance(1), RawText("0")]), 10),
+            (
+                Pattern([RawText("__tempren_value0 if 0 else "), _tag_instance(1)]),
+                1,
+            ),
+        ],
+    )
+    def test_fallback_evaluation(
+        self, pattern: Pattern, expected_value, nonexistent_file: File
+    ):
+        expression = CompiledExpression(pattern)
+
+        assert expression.function is None
+        assert expression.evaluate(nonexistent_file) == expected_value
+
+    def test_tags_are_not_rendered_as_source(self, nonexistent_file: File):
+        timestamp = datetime.datetime(2022, 1, 2, 3, 4, 5)
+        pattern = Pattern([_tag_instance(timestamp), RawText(".year == 2022")])
+        expression = CompiledExpression(pattern)
+
+        assert expression.evaluate(nonexistent_file)
+
+    def test_prefix_and_suffix(self, nonexistent_file: File):
+        pattern = Pattern([_tag_instance(1), RawText(", "), _tag_instance("a")])
+        expression = CompiledExpression(pattern, prefix="(", suffix=", )")
+
+        assert expression.evaluate(nonexistent_file) == (1, "a")
+
+    def test_error_contains_rendered_expression(self, nonexistent_file: File):
+        pattern = Pattern([_tag_instance("foo"), RawText(" + 1")])
+        expression = CompiledExpression(pattern, prefix="(", suffix=", )")
+
+        with pytest.raises(ExpressionEvaluationError) as exc_info:
+            expression.evaluate(nonexistent_file)
+
+        assert exc_info.value.expression == "('foo' + 1, )"
+        assert "str" in exc_info.value.message
+
+    def test_skipped_operands_are_not_evaluated(self, nonexistent_file: File):
+        first_tag = _tag_instance(False)
+        second_tag = _tag_instance(True)
+        pattern = Pattern([first_tag, RawText(" and "), second_tag])
+        expression = CompiledExpression(pattern)
+
+        assert not expression.evaluate(nonexistent_file)
+        assert _invoked(first_tag)
+        assert not _invoked(second_tag)
+
+    def test_cheaper_operands_are_evaluated_first(self, nonexistent_file: File):
+        expensive_tag = _tag_instance(True, cost=100)
+        cheap_tag = _tag_instance(0, cost=1)
+        pattern = Pattern(
+            [expensive_tag, RawText(" and "), cheap_tag, RawText(" > 10")]
+        )
+        expression = CompiledExpression(pattern, reorder_operands=True)
+
+        assert not expression.evaluate(nonexistent_file)
+        assert _invoked(cheap_tag)
+        assert not _invoked(expensive_tag)
+
+    @pytest.mark.parametrize(
+        "template_parts,cheap_value",
+        [
+            (["not (", "expensive", " or ", "cheap", ")"], True),
+            (["0 if ", "expensive", " and ", "cheap", " else 1"], False),
+            (["(", "expensive", " and ", "cheap", ") and True"], False),
+        ],
+    )
+    def test_operands_are_reordered_in_boolean_context(
+        self, template_parts, cheap_value: bool, nonexistent_file: File
+    ):
+        expensive_tag = _tag_instance(True, cost=100)
+        cheap_tag = _tag_instance(cheap_value, cost=1)
+        tag_instances = {"expensive": expensive_tag, "cheap": cheap_tag}
+        pattern = Pattern(
+            [tag_instances.get(part, RawText(part)) for part in template_parts]
+        )
+        expression = CompiledExpression(pattern, reorder_operands=True)
+
+        expression.evaluate(nonexistent_file)
+
+        assert expression.ordered_function is not None
+        assert not _invoked(expensive_tag)
+
+    def test_operands_are_not_reordered_in_value_context(self):
+        pattern = Pattern(
+            [
+                RawText("("),
+                _tag_instance("", cost=100),
+                RawText(" or "),
+                _tag_instance("default"),
+                RawText(") == 'default'"),
+            ]
+        )
+        expression = CompiledExpression(pattern, reorder_operands=True)
+
+        assert expression.ordered_function is None
+
+    def test_operands_are_not_reordered_by_default(self):
+        pattern = Pattern(
+            [_tag_instance(True, cost=100), RawText(" and "), _tag_instance(True)]
+        )
+        expression = CompiledExpression(pattern)
+
+        assert expression.ordered_function is None
+
+    def test_reordered_error_is_reported_in_original_order(
+        self, nonexistent_file: File
+    ):
+        expensive_tag = _tag_instance(False, cost=100)
+        cheap_tag = _tag_instance("foo")
+        pattern = Pattern([expensive_tag, RawText(" and "), cheap_tag, RawText(" + 1")])
+        expression = CompiledExpression(pattern, reorder_operands=True)
+
+        assert expression.evaluate(nonexistent_file) is False
+
+    @pytest.mark.parametrize(
+        "tag_error", [FileNotSupportedError(), MissingMetadataError()]
+    )
+    def test_reordered_tag_error_is_reported_in_original_order(
+        self, tag_error: Exception, nonexistent_file: File
+    ):
+        def failing_generator(file, context):
+            raise tag_error
+
+        expensive_tag = _tag_instance(False, cost=100)
+        failing_tag = TagInstance(tag=GeneratorTag(failing_generator))
+        pattern = Pattern([expensive_tag, RawText(" and "), failing_tag])
+        expression = CompiledExpression(pattern, reorder_operands=True)
+
+        assert not expression.evaluate(nonexistent_file)
+
+    def test_reordered_tag_error_is_raised_once(self, nonexistent_file: File):
+        invocations = []
+
+        def failing_generator(file, context):
+            invocations.append(file)
+            raise FileNotSupportedError()
+
+        failing_tag = TagInstance(tag=GeneratorTag(failing_generator))
+        pattern = Pattern(
+            [_tag_instance(True, cost=100), RawText(" and "), failing_tag]
+        )
+        expression = CompiledExpression(pattern, reorder_operands=True)
+
+        with pytest.raises(FileNotSupportedError):
+            expression.evaluate(nonexistent_file)
+        assert len(invocations) == 1
+
+    def test_not_evaluated_values_are_rendered_as_ellipsis(
+        self, nonexistent_file: File
+    ):
+        pattern = Pattern(
+            [
+                _tag_instance(0),
+                RawText(" and "),
+                _tag_instance(1),
+                RawText(" or 1 / "),
+                _tag_instance(0),
+            ]
+        )
+        expression = CompiledExpression(pattern)
+
+        with pytest.raises(ExpressionEvaluationError) as exc_info:
+            expression.evaluate(nonexistent_file)
+
+        assert exc_info.value.expression == "0 and ... or 1 / 0"
+
+    def test_tag_errors_are_propagated(self, nonexistent_file: File):
+        def failing_generator(file, context):
+            raise FileNotSupportedError()
+
+        pattern = Pattern(
+            [TagInstance(tag=GeneratorTag(failing_generator)), RawText(" > 1")]
+        )
+        expression = CompiledExpression(pattern)
+
+        with pytest.raises(FileNotSupportedError):
+            expression.evaluate(nonexistent_file)
+
+    def test_stateful_tags_are_always_evaluated(self, nonexistent_file: File):
+        stateful_tag = _tag_instance(1)
+        stateful_tag.tag.stateful = True
+        pattern = Pattern([RawText("False and "), stateful_tag])
+        expression = CompiledExpression(pattern)
+
+        assert not expression.evaluate(nonexistent_file)
+        assert _invoked(stateful_tag)
@@ -3,12 +3,14 @@ from pathlib import Path
 
 import pytest
 
-from tempren.path_generator import File, InvalidFilenameError
+from tempren.path_generator import File, InvalidFilenameError, PathGenerationError
 from tempren.template.path_generators import (
     TemplateNameGenerator,
     TemplatePathGenerator,
 )
-from tempren.template.tree_elements import Pattern, RawText
+from tempren.template.tree_elements import Pattern, RawText, TagInstance
+
+from .mocks import BatchGeneratorTag, GeneratorTag
 
 
 def static_pattern(text: str) -> Pattern:
@@ -46,3 +48,72 @@ class TestTemplatePathGenerator:
         dst_path = generator.generate(src_file)
 
         assert dst_path == Path("new/file/path")
+
+
+class TestBatchGeneration:
+    def test_batched_tags_are_processed_in_batch(self, text_data_dir: Path):
+        tag = BatchGeneratorTag(lambda file, context: file.relative_path.stem)
+        generator = TemplateNameGenerator(
+            Pattern([TagInstance(tag=tag), RawText(".new")])
+        )
+        files = [
+            File(text_data_dir, Path("hello.txt")),
+            File(text_data_dir, Path("markdown.md")),
+        ]
+
+        dst_paths = generator.generate_batch(files)
+
+        assert generator.batch_processing
+        assert dst_paths == [Path("hello.new"), Path("markdown.new")]
+        assert tag.batches == [files]
+
+    def test_compiled_template_is_used_without_batched_tags(self, text_data_dir: Path):
+        tag = GeneratorTag(lambda file, context: file.relative_path.stem)
+        generator = TemplatePathGenerator(
+            Pattern([RawText("dir/"), TagInstance(tag=tag)])
+        )
+        files = [
+            File(text_data_dir, Path("hello.txt")),
+            File(text_data_dir, Path("markdown.md")),
+        ]
+
+        dst_paths = generator.generate_batch(files)
+
+        assert not generator.batch_processing
+        assert dst_paths == [Path("dir/hello"), Path("dir/markdown")]
+
+    def test_invalid_name_in_batch(self, text_data_dir: Path):
+        tag = BatchGeneratorTag(lambda file, context: "file/path")
+        generator = TemplateNameGenerator(Pattern([TagInstance(tag=tag)]))
+        file = File(text_data_dir, Path("hello.txt"))
+
+        with pytest.raises(PathGenerationError) as exc:
+            generator.generate_batch([file])
+
+        assert exc.value.file == file
+        assert isinstance(exc.value.__cause__, InvalidFilenameError)
+
+    def test_rendering_stops_at_failing_file(self, text_data_dir: Path):
+        rendered_files = []
+
+        def render(file: File, context):
+            rendered_files.append(file)
+            if file.relative_path.name == "markdown.md":
+                raise ValueError("unsupported")
+            return file.relative_path.stem
+
+        generator = TemplateNameGenerator(
+            Pattern([TagInstance(tag=GeneratorTag(render))])
+        )
+        files = [
+            File(text_data_dir, Path("hello.txt")),
+            File(text_data_dir, Path("markdown.md")),
+            File(text_data_dir, Path("other.txt")),
+        ]
+
+        with pytest.raises(PathGenerationError) as exc:
+            generator.generate_batch(files)
+
+        assert exc.value.file == files[1]
+        assert isinstance(exc.value.__cause__, ValueError)
+        assert rendered_files == files[:2]
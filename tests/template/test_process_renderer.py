@@ -0,0 +1,103 @@
+import os
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from tempren.path_generator import File
+from tempren.tags.core import CountTag
+from tempren.tags.text import UpperTag
+from tempren.template.path_generators import TemplateNameGenerator
+from tempren.template.process_renderer import MIN_CHUNK_SIZE, ProcessPoolPatternRenderer
+from tempren.template.tree_elements import Pattern, RawText, TagInstance
+
+from .mocks import GeneratorTag, MockTag
+
+
+def _files(directory: Path, count: int) -> List[File]:
+    return [File(directory, Path(f"{index}.file")) for index in range(count)]
+
+
+class PidTag(MockTag):
+    def process(self, file, context):
+        return os.getpid()
+
+
+def _count_tag(**kwargs) -> CountTag:
+    tag = CountTag()
+    tag.configure(**kwargs)
+    return tag
+
+
+class TestProcessPoolPatternRenderer:
+    def test_output_order_is_preserved(self, nonexistent_absolute_path: Path):
+        files = _files(nonexistent_absolute_path, 5 * MIN_CHUNK_SIZE)
+        name_instance = TagInstance(tag=MockTag(process_output="name"))
+        pattern = Pattern(
+            [
+                RawText("prefix-"),
+                TagInstance(tag=UpperTag(), context=Pattern([name_instance])),
+            ]
+        )
+        renderer = ProcessPoolPatternRenderer(pattern, jobs=2)
+
+        assert renderer.render_all(files) == [pattern.process(file) for file in files]
+
+    def test_stateful_tags_are_deterministic(self, nonexistent_absolute_path: Path):
+        files = _files(nonexistent_absolute_path, 5 * MIN_CHUNK_SIZE)
+        serial_pattern = Pattern(
+            [
+                TagInstance(tag=_count_tag(start=5)),
+                RawText("-"),
+                TagInstance(tag=MockTag()),
+            ]
+        )
+        parallel_pattern = Pattern(
+            [
+                TagInstance(tag=_count_tag(start=5)),
+                RawText("-"),
+                TagInstance(tag=MockTag()),
+            ]
+        )
+        renderer = ProcessPoolPatternRenderer(parallel_pattern, jobs=3)
+
+        # Small batches are rendered in the parent process
+        rendered = renderer.render_all(files[:2]) + renderer.render_all(files[2:])
+
+        assert rendered == [serial_pattern.process(file) for file in files]
+
+    def test_nested_stateful_tag(self, nonexistent_absolute_path: Path):
+        files = _files(nonexistent_absolute_path, 2 * MIN_CHUNK_SIZE)
+        context = Pattern([TagInstance(tag=_count_tag()), RawText("x")])
+        pattern = Pattern([TagInstance(tag=UpperTag(), context=context)])
+        renderer = ProcessPoolPatternRenderer(pattern, jobs=2)
+
+        assert renderer.render_all(files) == [
+            f"{index}X" for index in range(len(files))
+        ]
+
+    def test_workers_render_chunks(self, nonexistent_absolute_path: Path):
+        files = _files(nonexistent_absolute_path, 4 * MIN_CHUNK_SIZE)
+        pattern = Pattern([TagInstance(tag=PidTag())])
+        renderer = ProcessPoolPatternRenderer(pattern, jobs=2)
+
+        process_ids = set(renderer.render_all(files))
+
+        assert str(os.getpid()) not in process_ids
+
+    def test_unpicklable_pattern(self):
+        pattern = Pattern([TagInstance(tag=GeneratorTag(lambda file, context: ""))])
+
+        with pytest.raises(Exception):
+            ProcessPoolPatternRenderer(pattern, jobs=2)
+
+
+def test_generator_falls_back_to_single_process(
+    nonexistent_absolute_path: Path, caplog
+):
+    files = _files(nonexistent_absolute_path, 2 * MIN_CHUNK_SIZE)
+    pattern = Pattern([TagInstance(tag=GeneratorTag(lambda file, context: "name"))])
+    generator = TemplateNameGenerator(pattern, jobs=2)
+
+    assert generator.generate_batch(files) == [Path("name") for _ in files]
+    assert "cannot be rendered in parallel" in caplog.text
@@ -0,0 +1,50 @@
+import pytest
+
+import tempren.tags
+import tests.template.test_module
+from tempren.pipeline import build_tag_registry
+from tempren.template.tag_manifest import (
+    generate_tag_manifest,
+    manifest_path,
+    render_tag_manifest,
+)
+
+
+def test_generate_tag_manifest__requires_all_modules_to_be_supported():
+    with pytest.raises(NotImplementedError):
+        generate_tag_manifest(tests.template.test_module)
+
+
+def test_rendered_manifest_defines_manifest():
+    manifest = {"package.module": ["First", "Second"], "package.empty": []}
+
+    namespace: dict = {}
+    exec(render_tag_manifest(manifest), namespace)
+
+    assert namespace["TAG_MANIFEST"] == manifest
+
+
+def test_builtin_tag_manifest_is_up_to_date():
+    try:
+        manifest = generate_tag_manifest(tempren.tags)
+    except NotImplementedError as exc:
+        pytest.skip(f"Not all tag modules are supported: {exc}")
+
+    expected_source = render_tag_manifest(manifest)
+    assert manifest_path(tempren.tags).read_text() == expected_source, (
+        "Tag manifest is outdated - regenerate it with "
+        "`python -m tempren.template.tag_manifest`"
+    )
+
+
+def test_lazy_registry_provides_all_builtin_tags():
+    eager_registry = build_tag_registry(lazy=False)
+    lazy_registry = build_tag_registry(lazy=True)
+
+    assert lazy_registry.categories == eager_registry.categories
+    for category_name in eager_registry.categories:
+        eager_category = eager_registry.find_category(category_name)
+        lazy_category = lazy_registry.find_category(category_name)
+        assert eager_category is not None and lazy_category is not None
+        for tag_name in eager_category.tag_map:
+            assert lazy_category.find_tag_factory(tag_name) is not None
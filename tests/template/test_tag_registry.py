@@ -9,21 +9,25 @@ from tempren.template.tree_builder import (
     ConfigurationError,
     ContextForbiddenError,
     ContextMissingError,
+    LazyTagCategory,
     TagCategory,
     TagRegistry,
     UnknownCategoryError,
     UnknownTagError,
 )
 from tempren.template.tree_elements import (
+    ConstantTagValue,
+    MissingMetadataError,
     Pattern,
     RawText,
+    SharedTagInstance,
     Tag,
     TagFactoryFromClass,
     TagInstance,
     TagName,
 )
 
-from .mocks import MockTag
+from .mocks import GeneratorTag, MockTag
 from .test_tree_builder import parse
 
 
@@ -345,6 +349,182 @@ class TestTagRegistry:
             ]
         )
 
+    @staticmethod
+    def _pure_tag_registry(output_generator) -> TagRegistry:
+        registry = TagRegistry()
+        category = registry.register_category("Test")
+
+        def pure_tag_factory(*args, **kwargs):
+            tag = GeneratorTag(output_generator)
+            tag.pure = True
+            return tag
+
+        category.register_tag_factory(pure_tag_factory, "Pure")
+        category.register_tag(MockTag, "Impure")
+        return registry
+
+    def test_bind__pure_tag_with_constant_context_is_folded(self):
+        pattern = parse("%Pure(){context}")
+        registry = self._pure_tag_registry(lambda file, context: context.upper())
+
+        bound_pattern = registry.bind(pattern)
+
+        assert bound_pattern == Pattern([ConstantTagValue("CONTEXT", "CONTEXT")])
+
+    def test_bind__nested_pure_tags_are_folded(self):
+        pattern = parse("%Pure(){%Pure(){con}text}")
+        registry = self._pure_tag_registry(lambda file, context: f"<{context}>")
+
+        bound_pattern = registry.bind(pattern)
+
+        assert bound_pattern == Pattern(
+            [ConstantTagValue("<<con>text>", "<<con>text>")]
+        )
+
+    def test_bind__folded_value_keeps_original_type(self):
+        pattern = parse("%Pure(){2}")
+        registry = self._pure_tag_registry(lambda file, context: int(context) * 3)
+
+        bound_pattern = registry.bind(pattern)
+
+        folded_value = bound_pattern.sub_elements[0]
+        assert isinstance(folded_value, ConstantTagValue)
+        assert folded_value.text == "6"
+        assert folded_value.value == 6
+
+    def test_bind__pure_tag_without_context_is_not_folded(self):
+        pattern = parse("%Pure()")
+        registry = self._pure_tag_registry(lambda file, context: "value")
+
+        bound_pattern = registry.bind(pattern)
+
+        assert isinstance(bound_pattern.sub_elements[0], TagInstance)
+
+    def test_bind__pure_tag_with_file_dependent_context_is_not_folded(self):
+        pattern = parse("%Pure(){%Impure()}")
+        registry = self._pure_tag_registry(lambda file, context: context)
+
+        bound_pattern = registry.bind(pattern)
+
+        assert isinstance(bound_pattern.sub_elements[0], TagInstance)
+
+    def test_bind__impure_tag_is_not_folded(self):
+        pattern = parse("%Impure(){context}")
+        registry = self._pure_tag_registry(lambda file, context: context)
+
+        bound_pattern = registry.bind(pattern)
+
+        assert isinstance(bound_pattern.sub_elements[0], TagInstance)
+
+    def test_bind__failing_pure_tag_is_not_folded(self):
+        pattern = parse("%Pure(){not a number}")
+        registry = self._pure_tag_registry(lambda file, context: float(context))
+
+        bound_pattern = registry.bind(pattern)
+
+        assert isinstance(bound_pattern.sub_elements[0], TagInstance)
+
+    def test_bind__pure_tag_missing_metadata_is_folded(self):
+        def _raise_missing_metadata(file, context):
+            raise MissingMetadataError()
+
+        pattern = parse("%Pure(){context}")
+        registry = self._pure_tag_registry(_raise_missing_metadata)
+
+        bound_pattern = registry.bind(pattern)
+
+        assert bound_pattern == Pattern([ConstantTagValue("", "")])
+
+    def test_bind__folded_tag_is_rendered_as_value_in_expressions(
+        self, nonexistent_file
+    ):
+        pattern = parse("%Pure(){text} == 'TEXT'")
+        registry = self._pure_tag_registry(lambda file, context: context.upper())
+
+        bound_pattern = registry.bind(pattern)
+
+        rendered_expression = bound_pattern.process_as_expression(nonexistent_file)
+        assert rendered_expression == "'TEXT' == 'TEXT'"
+
+    @staticmethod
+    def _mock_tag_registry() -> TagRegistry:
+        registry = TagRegistry()
+        category = registry.register_category("Test")
+        category.register_tag(MockTag, "Mock")
+
+        def stateful_tag_factory(*args, **kwargs):
+            tag = MockTag()
+            tag.stateful = True
+            return tag
+
+        category.register_tag_factory(stateful_tag_factory, "Stateful")
+        return registry
+
+    def test_bind__tag_instances_are_not_shared_by_default(self):
+        registry = self._mock_tag_registry()
+
+        bound_pattern = registry.bind(parse("%Mock()"))
+
+        assert not isinstance(bound_pattern.sub_elements[0], SharedTagInstance)
+
+    def test_bind__equivalent_tags_are_shared_between_patterns(self):
+        registry = self._mock_tag_registry()
+        shared_instances = {}
+
+        first_pattern = registry.bind(parse("%Mock(1, a='b')"), shared_instances)
+        second_pattern = registry.bind(
+            parse("Text %Test.Mock(1, a='b')"), shared_instances
+        )
+
+        shared_instance = first_pattern.sub_elements[0]
+        assert isinstance(shared_instance, SharedTagInstance)
+        assert second_pattern.sub_elements[1] is shared_instance
+        assert shared_instance.occurrences == 2
+
+    def test_bind__equivalent_tags_are_shared_within_pattern(self):
+        registry = self._mock_tag_registry()
+
+        bound_pattern = registry.bind(parse("%Mock(){a}%Mock(){a}"), {})
+
+        assert bound_pattern.sub_elements[0] is bound_pattern.sub_elements[1]
+
+    def test_bind__tags_with_equivalent_contexts_are_shared(self):
+        registry = self._mock_tag_registry()
+
+        bound_pattern = registry.bind(parse("%Mock(){%Mock()}_%Mock(){%Mock()}"), {})
+
+        assert bound_pattern.sub_elements[0] is bound_pattern.sub_elements[2]
+
+    @pytest.mark.parametrize(
+        "first_template,second_template",
+        [
+            ("%Mock(1)", "%Mock(2)"),
+            ("%Mock(1)", "%Mock(true)"),
+            ("%Mock(a=1)", "%Mock(b=1)"),
+            ("%Mock(){a}", "%Mock(){b}"),
+            ("%Mock(){a}", "%Mock()"),
+            ("%Mock(){%Mock(1)}", "%Mock(){%Mock(2)}"),
+        ],
+    )
+    def test_bind__different_tags_are_not_shared(
+        self, first_template: str, second_template: str
+    ):
+        registry = self._mock_tag_registry()
+        shared_instances = {}
+
+        first_pattern = registry.bind(parse(first_template), shared_instances)
+        second_pattern = registry.bind(parse(second_template), shared_instances)
+
+        assert first_pattern.sub_elements[0] is not second_pattern.sub_elements[0]
+
+    def test_bind__stateful_tags_are_not_shared(self):
+        registry = self._mock_tag_registry()
+
+        bound_pattern = registry.bind(parse("%Stateful()%Stateful()"), {})
+
+        assert bound_pattern.sub_elements[0] is not bound_pattern.sub_elements[1]
+        assert not isinstance(bound_pattern.sub_elements[0], SharedTagInstance)
+
     def test_register_tags_in_module__finds_first_level_tags(self):
         registry = TagRegistry()
         from .test_module import first_level
@@ -423,6 +603,81 @@ class TestTagRegistry:
 
         assert ["first_level", "second_level"] == registry.categories
 
+    def test_register_tags_in_package__skips_private_modules(self):
+        registry = TagRegistry()
+        import tests.template.test_module
+
+        registry.register_tags_in_package(tests.template.test_module)
+
+        with pytest.raises(UnknownTagError):
+            registry.get_tag_factory(TagName("Private"))
+
+    test_manifest = {
+        "tests.template.test_module.first_level": ["FirstLevel"],
+        "tests.template.test_module.submodule.second_level": ["SecondLevel"],
+        "tests.template.test_module.unsupported_module": ["Unsupported"],
+    }
+
+    def test_register_tags_from_manifest__creates_categories(self):
+        registry = TagRegistry()
+
+        registry.register_tags_from_manifest(self.test_manifest)
+
+        assert [
+            "first_level",
+            "second_level",
+            "unsupported_module",
+        ] == registry.categories
+
+    def test_register_tags_from_manifest__modules_are_not_loaded(self):
+        registry = TagRegistry()
+
+        registry.register_tags_from_manifest(self.test_manifest)
+
+        for category_name in registry.categories:
+            category = registry.find_category(category_name)
+            assert isinstance(category, LazyTagCategory)
+            assert not category.loaded
+
+    def test_register_tags_from_manifest__module_is_loaded_on_lookup(self):
+        registry = TagRegistry()
+        registry.register_tags_from_manifest(self.test_manifest)
+
+        second_level_tag_factory = registry.get_tag_factory(TagName("SecondLevel"))
+
+        assert second_level_tag_factory.tag_name == "SecondLevel"
+        second_level_category = registry.find_category("second_level")
+        assert isinstance(second_level_category, LazyTagCategory)
+        assert second_level_category.loaded
+        first_level_category = registry.find_category("first_level")
+        assert isinstance(first_level_category, LazyTagCategory)
+        assert not first_level_category.loaded
+
+    def test_register_tags_from_manifest__skips_unsupported_modules(self):
+        registry = TagRegistry()
+        registry.register_tags_from_manifest(self.test_manifest)
+
+        with pytest.raises(UnknownTagError):
+            registry.get_tag_factory(TagName("Unsupported"))
+
+    def test_register_tags_from_manifest__logs_module_loading_errors(self, caplog):
+        category = LazyTagCategory("broken", "tests.nonexistent_tag_module", ["Tag"])
+
+        category.load()
+
+        assert category.loaded
+        assert (
+            "Could not load module tests.nonexistent_tag_module: No module named"
+            in caplog.text
+        )
+
+    def test_register_tags_from_manifest__existing_category__raises(self):
+        registry = TagRegistry()
+        registry.register_category("first_level")
+
+        with pytest.raises(ValueError):
+            registry.register_tags_from_manifest(self.test_manifest)
+
     def test_register_already_existing_category__raises(self):
         registry = TagRegistry()
         registry.register_category("Existing")
@@ -1,16 +1,25 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
 from pytest import raises
 
 from tempren.path_generator import File
 from tempren.template.tree_elements import (
+    ConstantTagValue,
+    GeneratedDocstring,
     MissingMetadataError,
     Pattern,
     RawText,
+    SharedTagInstance,
     TagInstance,
     TagName,
     TagPlaceholder,
+    find_shared_instances,
+    reads_file_contents,
 )
 
-from .mocks import GeneratorTag, MockTag
+from .mocks import BatchGeneratorTag, GeneratorTag, MockTag
 
 
 class TestRawText:
@@ -64,6 +73,32 @@ class TestPattern:
 
         assert element.process(nonexistent_file) == "foobar"
 
+    def test_batch_processing(self, nonexistent_absolute_path: Path):
+        files = [
+            File(nonexistent_absolute_path, Path("first.file")),
+            File(nonexistent_absolute_path, Path("second.file")),
+        ]
+        path_tag = GeneratorTag(lambda file, context: f"{context}:{file.relative_path}")
+        batch_tag = BatchGeneratorTag(lambda file, context: file.relative_path.stem)
+        pattern = Pattern(
+            [
+                RawText("["),
+                TagInstance(
+                    tag=path_tag, context=Pattern([TagInstance(tag=batch_tag)])
+                ),
+                RawText("]"),
+            ]
+        )
+
+        assert pattern.process_batch(files) == list(map(pattern.process, files))
+        assert pattern.process_batch([]) == []
+        assert batch_tag.batches[0] == files
+
+    def test_empty_pattern_batch_processing(self, nonexistent_file: File):
+        pattern = Pattern([])
+
+        assert pattern.process_batch([nonexistent_file]) == [""]
+
 
 class TestTagName:
     def test_invalid_tag_name(self):
@@ -114,3 +149,220 @@ class TestTagInstance:
         element = TagInstance(tag=throwing_tag)
 
         assert element.process(nonexistent_file) == ""
+
+    def test_context_value_is_stringified_by_default(self, nonexistent_file: File):
+        outer_tag = MockTag()
+        context_pattern = Pattern([TagInstance(tag=MockTag(process_output=123))])
+        element = TagInstance(tag=outer_tag, context=context_pattern)
+
+        element.process(nonexistent_file)
+
+        assert outer_tag.context == "123"
+
+    def test_accepted_context_value_is_passed_as_is(self, nonexistent_file: File):
+        outer_tag = MockTag(context_types=(int, float))
+        context_pattern = Pattern([TagInstance(tag=MockTag(process_output=123))])
+        element = TagInstance(tag=outer_tag, context=context_pattern)
+
+        element.process(nonexistent_file)
+
+        assert outer_tag.context == 123
+
+    def test_folded_context_value_is_passed_as_is(self, nonexistent_file: File):
+        outer_tag = MockTag(context_types=(int, float))
+        context_pattern = Pattern([ConstantTagValue(text="1.5", value=1.5)])
+        element = TagInstance(tag=outer_tag, context=context_pattern)
+
+        element.process(nonexistent_file)
+
+        assert outer_tag.context == 1.5
+
+    @pytest.mark.parametrize("context_value", [True, "123", Path("123")])
+    def test_not_accepted_context_value_is_stringified(
+        self, nonexistent_file: File, context_value: Any
+    ):
+        outer_tag = MockTag(context_types=(int, float))
+        context_pattern = Pattern(
+            [TagInstance(tag=MockTag(process_output=context_value))]
+        )
+        element = TagInstance(tag=outer_tag, context=context_pattern)
+
+        element.process(nonexistent_file)
+
+        assert outer_tag.context == str(context_value)
+
+    def test_compound_context_is_stringified(self, nonexistent_file: File):
+        outer_tag = MockTag(context_types=(int, float))
+        context_pattern = Pattern(
+            [RawText("1"), TagInstance(tag=MockTag(process_output=23))]
+        )
+        element = TagInstance(tag=outer_tag, context=context_pattern)
+
+        element.process(nonexistent_file)
+
+        assert outer_tag.context == "123"
+
+    def test_typed_contexts_are_passed_to_batch(self, nonexistent_file: File):
+        outer_tag = BatchGeneratorTag(lambda file, context: context)
+        outer_tag.context_types = (int,)
+        context_pattern = Pattern([TagInstance(tag=MockTag(process_output=123))])
+        element = TagInstance(tag=outer_tag, context=context_pattern)
+
+        assert element.process_batch([nonexistent_file]) == [123]
+
+    def test_missing_metadata_error_in_batch_is_handled(
+        self, nonexistent_file: File, nonexistent_absolute_path: Path
+    ):
+        other_file = File(nonexistent_absolute_path, Path("other.file"))
+
+        def _tag_implementation(file, context):
+            if file == nonexistent_file:
+                raise MissingMetadataError()
+            return "value"
+
+        element = TagInstance(tag=BatchGeneratorTag(_tag_implementation))
+
+        assert element.process_batch([nonexistent_file, other_file]) == ["", "value"]
+
+
+class TestSharedTagInstance:
+    def test_single_occurrence_is_not_cached(self, nonexistent_file: File):
+        invocations = 0
+
+        def _tag_implementation(file, context):
+            nonlocal invocations
+            invocations += 1
+            return invocations
+
+        element = SharedTagInstance(tag=GeneratorTag(_tag_implementation))
+
+        assert element.process(nonexistent_file) == 1
+        assert element.process(nonexistent_file) == 2
+
+    def test_value_is_calculated_once_per_file(
+        self, nonexistent_file: File, nonexistent_absolute_path: Path
+    ):
+        other_file = File(nonexistent_absolute_path, Path("other.file"))
+        invoked_for = []
+
+        def _tag_implementation(file, context):
+            invoked_for.append(file)
+            return str(file.relative_path)
+
+        element = SharedTagInstance(tag=GeneratorTag(_tag_implementation))
+        element.occurrences = 2
+
+        assert element.process(nonexistent_file) == "some.file"
+        assert element.process(other_file) == "other.file"
+        assert element.process(nonexistent_file) == "some.file"
+        assert invoked_for == [nonexistent_file, other_file]
+
+    def test_batch_values_are_cached(
+        self, nonexistent_file: File, nonexistent_absolute_path: Path
+    ):
+        other_file = File(nonexistent_absolute_path, Path("other.file"))
+        tag = BatchGeneratorTag(lambda file, context: str(file.relative_path))
+        element = SharedTagInstance(tag=tag)
+        element.occurrences = 2
+
+        assert element.process(nonexistent_file) == "some.file"
+        assert element.process_batch([nonexistent_file, other_file]) == [
+            "some.file",
+            "other.file",
+        ]
+        assert element.process_batch([other_file]) == ["other.file"]
+        assert tag.batches == [[other_file]]
+
+    def test_forgotten_values_are_calculated_again(
+        self, nonexistent_file: File, nonexistent_absolute_path: Path
+    ):
+        other_file = File(nonexistent_absolute_path, Path("other.file"))
+        invoked_for = []
+
+        def _tag_implementation(file, context):
+            invoked_for.append(file)
+            return str(file.relative_path)
+
+        element = SharedTagInstance(tag=GeneratorTag(_tag_implementation))
+        element.occurrences = 2
+        element.process(nonexistent_file)
+        element.process(other_file)
+
+        element.forget([nonexistent_file])
+        element.process(nonexistent_file)
+        element.process(other_file)
+        element.clear()
+        element.process(other_file)
+
+        assert invoked_for == [
+            nonexistent_file,
+            other_file,
+            nonexistent_file,
+            other_file,
+        ]
+
+
+class TestFindSharedInstances:
+    def test_instances_caching_values(self):
+        cached_instance = SharedTagInstance(tag=MockTag(), occurrences=2)
+        context_instance = SharedTagInstance(tag=MockTag(), occurrences=2)
+        single_instance = SharedTagInstance(tag=MockTag())
+        element = Pattern(
+            [
+                cached_instance,
+                single_instance,
+                TagInstance(tag=MockTag(), context=Pattern([context_instance])),
+                cached_instance,
+            ]
+        )
+
+        shared_instances = find_shared_instances(element)
+
+        assert len(shared_instances) == 2
+        assert shared_instances[0] is cached_instance
+        assert shared_instances[1] is context_instance
+
+
+class TestReadsFileContents:
+    @staticmethod
+    def _contents_tag() -> MockTag:
+        tag = MockTag()
+        tag.cost = 1000
+        return tag
+
+    def test_path_tags(self):
+        element = Pattern([RawText("text"), TagInstance(tag=MockTag())])
+
+        assert not reads_file_contents(element)
+
+    def test_contents_tag(self):
+        element = Pattern([RawText("text"), TagInstance(tag=self._contents_tag())])
+
+        assert reads_file_contents(element)
+
+    def test_contents_tag_in_context(self):
+        context = Pattern([TagInstance(tag=self._contents_tag())])
+        element = Pattern([TagInstance(tag=MockTag(), context=context)])
+
+        assert reads_file_contents(element)
+
+
+class TestGeneratedDocstring:
+    def test_details_are_generated_on_first_access(self):
+        generated_details = []
+
+        def _generate_details():
+            generated_details.append("Details")
+            return ["Details:", "  line"]
+
+        class DocumentedTag(MockTag):
+            """Summary"""
+
+        DocumentedTag.__doc__ = GeneratedDocstring(  # type: ignore
+            DocumentedTag.__doc__, _generate_details
+        )
+
+        assert not generated_details
+        assert DocumentedTag.__doc__ == "Summary\nDetails:\n  line"
+        assert DocumentedTag().__doc__ == "Summary\nDetails:\n  line"
+        assert len(generated_details) == 1
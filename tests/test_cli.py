@@ -1,15 +1,17 @@
 import io
+import json
 import os
 import re
 import subprocess
 import sys
 from contextlib import redirect_stderr, redirect_stdout
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Set, Tuple
 
 import pytest
 
 import tempren.cli
+import tempren.filesystem
 from tempren.cli import ErrorCode
 
 project_root_path = os.getcwd()
@@ -86,6 +88,16 @@ class TestVariousFlags:
         assert "HELLO.TXT" in stdout
         assert "MARKDOWN.MD" in stdout
 
+    def test_dry_run_detects_conflicts(self, text_data_dir: Path):
+        stdout, stderr, error_code = run_tempren(
+            "--dry-run", "--sort", "%Name()", "StaticFilename", text_data_dir
+        )
+
+        assert error_code == ErrorCode.INVALID_DESTINATION_ERROR
+        assert "StaticFilename" in stderr
+        assert (text_data_dir / "hello.txt").exists()
+        assert not (text_data_dir / "StaticFilename").exists()
+
     @pytest.mark.parametrize("flag", ["-h", "--help"])
     def test_help(self, flag: str):
         stdout, stderr, error_code = run_tempren(flag)
@@ -212,6 +224,55 @@ class TestVariousFlags:
         assert (hidden_data_dir / ".hidden" / "NESTED_VISIBLE.TXT").exists()
         assert (hidden_data_dir / ".hidden" / ".NESTED_HIDDEN.TXT").exists()
 
+    def test_concurrent_rendering(self, text_data_dir: Path):
+        stdout, stderr, error_code = run_tempren(
+            "--concurrency",
+            "2",
+            "--sort",
+            "%Size()",
+            "%Count()-%Upper(){%Name()}",
+            text_data_dir,
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert (text_data_dir / "0-HELLO.TXT").exists()
+        assert (text_data_dir / "1-MARKDOWN.MD").exists()
+
+    @pytest.mark.parametrize("flag", ["-j", "--jobs"])
+    def test_parallel_rendering(self, tmp_path: Path, flag: str):
+        for index in range(100):
+            (tmp_path / f"file-{index:03}.txt").touch()
+
+        stdout, stderr, error_code = run_tempren(
+            flag,
+            "3",
+            "--sort",
+            "%Name()",
+            "%Count(width=3)-%Upper(){%Name()}",
+            tmp_path,
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        for index in range(100):
+            assert (tmp_path / f"{index:03}-FILE-{index:03}.TXT").exists()
+
+    def test_concurrency_cannot_be_used_with_jobs(self, text_data_dir: Path):
+        stdout, stderr, error_code = run_tempren(
+            "--concurrency", "2", "--jobs", "2", "%Name()", text_data_dir
+        )
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "--concurrency cannot be used with --jobs" in stderr
+
+    @pytest.mark.parametrize("concurrency", ["0", "-1", "many"])
+    def test_invalid_concurrency(self, text_data_dir: Path, concurrency: str):
+        stdout, stderr, error_code = run_tempren(
+            "--concurrency", concurrency, "%Name()", text_data_dir
+        )
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert (text_data_dir / "hello.txt").exists()
+
 
 @pytest.mark.parametrize("invert_flag", ["-fi", "--filter-invert", None])
 class TestNameFilterFlags:
@@ -527,6 +588,522 @@ class TestPathMode:
         assert "Path generated for" in stderr
         assert "is not relative to the input directory" in stderr
 
+    def test_generated_path_through_symlink_outside_input_directory_error(
+        self, text_data_dir: Path, path_mode_flag: str, tmp_path: Path
+    ):
+        (tmp_path / "outside").mkdir()
+        (text_data_dir / "link").symlink_to(tmp_path / "outside")
+
+        stdout, stderr, error_code = run_tempren(
+            path_mode_flag, "link/%Name()", text_data_dir
+        )
+
+        assert error_code == ErrorCode.INVALID_DESTINATION_ERROR
+        assert "is not relative to the input directory" in stderr
+        assert list((tmp_path / "outside").iterdir()) == []
+
+    def test_generated_path_through_parent_of_symlink_error(
+        self, text_data_dir: Path, path_mode_flag: str, tmp_path: Path
+    ):
+        (tmp_path / "outside" / "sub").mkdir(parents=True)
+        (text_data_dir / "link").symlink_to(tmp_path / "outside" / "sub")
+
+        stdout, stderr, error_code = run_tempren(
+            path_mode_flag, "link/../%Name()", text_data_dir
+        )
+
+        assert error_code == ErrorCode.INVALID_DESTINATION_ERROR
+        assert "is not relative to the input directory" in stderr
+        assert (text_data_dir / "hello.txt").exists()
+        assert list((tmp_path / "outside").iterdir()) == [tmp_path / "outside" / "sub"]
+
+    def test_generated_path_is_normalized(
+        self, text_data_dir: Path, path_mode_flag: str
+    ):
+        stdout, stderr, error_code = run_tempren(
+            path_mode_flag, "dir/../%Upper(){%Name()}", text_data_dir
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert (text_data_dir / "HELLO.TXT").exists()
+        assert "dir/../" not in stdout
+        assert not (text_data_dir / "dir").exists()
+
+
+class TestOutputModes:
+    @pytest.mark.parametrize("output_mode", ["copy", "hardlink", "symlink"])
+    def test_sources_are_preserved(self, text_data_dir: Path, output_mode: str):
+        stdout, stderr, error_code = run_tempren(
+            "--output-mode", output_mode, "%Upper(){%Name()}", text_data_dir
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert (text_data_dir / "hello.txt").read_text() == "Hello\n"
+        assert (text_data_dir / "HELLO.TXT").read_text() == "Hello\n"
+        assert (text_data_dir / "markdown.md").exists()
+        assert (text_data_dir / "MARKDOWN.MD").exists()
+
+    def test_symlinks_point_to_sources(self, text_data_dir: Path):
+        stdout, stderr, error_code = run_tempren(
+            "-om", "symlink", "%Upper(){%Name()}", text_data_dir
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert (text_data_dir / "HELLO.TXT").is_symlink()
+        assert (text_data_dir / "HELLO.TXT").resolve() == (
+            text_data_dir / "hello.txt"
+        ).resolve()
+
+    @pytest.mark.parametrize("output_mode", ["move", "copy", "hardlink", "symlink"])
+    def test_output_directory(
+        self, text_data_dir: Path, tmp_path: Path, output_mode: str
+    ):
+        output_directory = tmp_path / "output"
+
+        stdout, stderr, error_code = run_tempren(
+            "--output-mode",
+            output_mode,
+            "--output-directory",
+            output_directory,
+            "--path",
+            "%Trim(-1,left){%Ext()}/%Name()",
+            text_data_dir,
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert (output_directory / "txt" / "hello.txt").read_text() == "Hello\n"
+        assert (output_directory / "md" / "markdown.md").exists()
+        assert (text_data_dir / "hello.txt").exists() == (output_mode != "move")
+
+    def test_unchanged_names_are_copied_to_output_directory(
+        self, text_data_dir: Path, tmp_path: Path
+    ):
+        stdout, stderr, error_code = run_tempren(
+            "-om", "copy", "-od", tmp_path / "output", "%Name()", text_data_dir
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert (tmp_path / "output" / "hello.txt").exists()
+        assert (text_data_dir / "hello.txt").exists()
+
+    def test_copy_doesnt_override_source(self, text_data_dir: Path):
+        (text_data_dir / "HELLO.TXT").write_text("existing")
+
+        stdout, stderr, error_code = run_tempren(
+            "-om", "copy", "--sort", "%Name()", "%Upper(){%Name()}", text_data_dir
+        )
+
+        assert error_code == ErrorCode.INVALID_DESTINATION_ERROR
+        assert (text_data_dir / "HELLO.TXT").read_text() == "existing"
+        assert (text_data_dir / "hello.txt").exists()
+
+    def test_generated_path_outside_output_directory_error(
+        self, text_data_dir: Path, tmp_path: Path
+    ):
+        stdout, stderr, error_code = run_tempren(
+            "-om", "copy", "-od", tmp_path / "output", "-p", "../%Name()", text_data_dir
+        )
+
+        assert error_code == ErrorCode.INVALID_DESTINATION_ERROR
+        assert "is not relative to the output directory" in stderr
+
+    @pytest.mark.parametrize("template", ["%Name()", "%Sha256()%Ext()"])
+    def test_verified_copies(self, text_data_dir: Path, tmp_path: Path, template: str):
+        stdout, stderr, error_code = run_tempren(
+            "-om",
+            "copy",
+            "--verify-copies",
+            "-od",
+            tmp_path / "output",
+            template,
+            text_data_dir,
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert len(list((tmp_path / "output").iterdir())) == 2
+        assert (text_data_dir / "hello.txt").exists()
+
+    def test_invalid_output_mode(self, text_data_dir: Path):
+        stdout, stderr, error_code = run_tempren(
+            "--output-mode", "teleport", "%Name()", text_data_dir
+        )
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "invalid choice" in stderr
+
+
+class TestJournal:
+    def test_renames_are_undone(self, text_data_dir: Path, tmp_path: Path):
+        journal_path = tmp_path / "journal.jsonl"
+        run_tempren("--journal", journal_path, "%Upper(){%Name()}", text_data_dir)
+        assert (text_data_dir / "HELLO.TXT").exists()
+
+        stdout, stderr, error_code = run_tempren("--undo", journal_path)
+
+        assert error_code == ErrorCode.SUCCESS
+        assert "Reverted 2 renames" in stdout
+        assert sorted(path.name for path in text_data_dir.iterdir()) == [
+            "hello.txt",
+            "markdown.md",
+        ]
+
+    def test_copies_are_undone(self, text_data_dir: Path, tmp_path: Path):
+        journal_path = tmp_path / "journal.jsonl"
+        run_tempren(
+            "--journal", journal_path, "-om", "copy", "%Upper(){%Name()}", text_data_dir
+        )
+
+        stdout, stderr, error_code = run_tempren("--undo", journal_path)
+
+        assert error_code == ErrorCode.SUCCESS
+        assert sorted(path.name for path in text_data_dir.iterdir()) == [
+            "hello.txt",
+            "markdown.md",
+        ]
+
+    def test_interrupted_renames_are_undone(
+        self, text_data_dir: Path, tmp_path: Path, monkeypatch
+    ):
+        journal_path = tmp_path / "journal.jsonl"
+        rename = tempren.filesystem.rename_noreplace
+        renames = []
+
+        def _failing_rename(*args):
+            if renames:
+                raise OSError("Device disconnected")
+            renames.append(args)
+            rename(*args)
+
+        monkeypatch.setattr(tempren.filesystem, "rename_noreplace", _failing_rename)
+        stdout, stderr, error_code = run_tempren(
+            "--journal", journal_path, "%Upper(){%Name()}", text_data_dir
+        )
+        assert error_code == ErrorCode.UNKNOWN_ERROR
+        monkeypatch.undo()
+
+        stdout, stderr, error_code = run_tempren("--undo", journal_path)
+
+        assert error_code == ErrorCode.SUCCESS
+        assert "Reverted 1 renames" in stdout
+        assert sorted(path.name for path in text_data_dir.iterdir()) == [
+            "hello.txt",
+            "markdown.md",
+        ]
+
+    def test_dry_run_is_not_journaled(self, text_data_dir: Path, tmp_path: Path):
+        journal_path = tmp_path / "journal.jsonl"
+
+        stdout, stderr, error_code = run_tempren(
+            "--dry-run", "--journal", journal_path, "%Upper(){%Name()}", text_data_dir
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert not journal_path.exists()
+
+    def test_existing_journal(self, text_data_dir: Path, tmp_path: Path):
+        journal_path = tmp_path / "journal.jsonl"
+        journal_path.write_text("contents")
+
+        stdout, stderr, error_code = run_tempren(
+            "--journal", journal_path, "%Upper(){%Name()}", text_data_dir
+        )
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "already exists" in stderr
+        assert (text_data_dir / "hello.txt").exists()
+
+    def test_nonexistent_journal_undo(self, nonexistent_path: Path):
+        stdout, stderr, error_code = run_tempren("--undo", nonexistent_path)
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "doesn't exists" in stderr
+
+    def test_undo_is_not_executed_with_invalid_arguments(
+        self, text_data_dir: Path, tmp_path: Path
+    ):
+        journal_path = tmp_path / "journal.jsonl"
+        run_tempren("--journal", journal_path, "%Upper(){%Name()}", text_data_dir)
+
+        stdout, stderr, error_code = run_tempren(
+            "--undo", journal_path, "--concurrency", "0"
+        )
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert (text_data_dir / "HELLO.TXT").exists()
+
+    def test_undo_cannot_be_used_with_template(
+        self, text_data_dir: Path, tmp_path: Path
+    ):
+        journal_path = tmp_path / "journal.jsonl"
+        run_tempren("--journal", journal_path, "%Upper(){%Name()}", text_data_dir)
+
+        stdout, stderr, error_code = run_tempren(
+            "--undo", journal_path, "%Name()", text_data_dir
+        )
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "--undo cannot be used with template" in stderr
+        assert (text_data_dir / "HELLO.TXT").exists()
+
+    def test_undo_cannot_be_used_with_dry_run(
+        self, text_data_dir: Path, tmp_path: Path
+    ):
+        journal_path = tmp_path / "journal.jsonl"
+        run_tempren("--journal", journal_path, "%Upper(){%Name()}", text_data_dir)
+
+        stdout, stderr, error_code = run_tempren("--dry-run", "--undo", journal_path)
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "--undo cannot be used with --dry-run" in stderr
+        assert sorted(path.name for path in text_data_dir.iterdir()) == [
+            "HELLO.TXT",
+            "MARKDOWN.MD",
+        ]
+
+    def test_invalid_journal_undo(self, tmp_path: Path):
+        (tmp_path / "journal.jsonl").write_text("{}\n")
+
+        stdout, stderr, error_code = run_tempren("--undo", tmp_path / "journal.jsonl")
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "is not a rename journal" in stderr
+
+
+class TestRenamePlan:
+    def test_plan_is_exported_without_renaming(
+        self, text_data_dir: Path, tmp_path: Path
+    ):
+        plan_path = tmp_path / "plan.jsonl"
+
+        stdout, stderr, error_code = run_tempren(
+            "--plan-out", plan_path, "%Upper(){%Name()}", text_data_dir
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert "Plan of 2 renames written" in stdout
+        assert len(plan_path.read_text().splitlines()) == 3
+        assert sorted(path.name for path in text_data_dir.iterdir()) == [
+            "hello.txt",
+            "markdown.md",
+        ]
+
+    def test_plan_is_applied(self, text_data_dir: Path, tmp_path: Path):
+        plan_path = tmp_path / "plan.jsonl"
+        run_tempren("--plan-out", plan_path, "%Upper(){%Name()}", text_data_dir)
+
+        stdout, stderr, error_code = run_tempren("--apply-plan", plan_path)
+
+        assert error_code == ErrorCode.SUCCESS
+        assert sorted(path.name for path in text_data_dir.iterdir()) == [
+            "HELLO.TXT",
+            "MARKDOWN.MD",
+        ]
+
+    def test_plan_is_applied_with_its_modes(self, text_data_dir: Path, tmp_path: Path):
+        plan_path = tmp_path / "plan.jsonl"
+        output_directory = tmp_path / "output"
+        run_tempren(
+            "--plan-out",
+            plan_path,
+            "-om",
+            "copy",
+            "-od",
+            output_directory,
+            "-p",
+            "%Trim(-1,left){%Ext()}/%Name()",
+            text_data_dir,
+        )
+
+        stdout, stderr, error_code = run_tempren("--apply-plan", plan_path)
+
+        assert error_code == ErrorCode.SUCCESS
+        assert (output_directory / "txt" / "hello.txt").exists()
+        assert (text_data_dir / "hello.txt").exists()
+
+    def test_changed_files_are_not_renamed(self, text_data_dir: Path, tmp_path: Path):
+        plan_path = tmp_path / "plan.jsonl"
+        run_tempren("--plan-out", plan_path, "%Upper(){%Name()}", text_data_dir)
+        (text_data_dir / "hello.txt").write_text("Goodbye")
+
+        stdout, stderr, error_code = run_tempren("--apply-plan", plan_path)
+
+        assert error_code == ErrorCode.SUCCESS
+        assert "Skipping 'hello.txt'" in stderr
+        assert sorted(path.name for path in text_data_dir.iterdir()) == [
+            "MARKDOWN.MD",
+            "hello.txt",
+        ]
+
+    def test_edited_destination_outside_input_directory(
+        self, text_data_dir: Path, tmp_path: Path
+    ):
+        plan_path = tmp_path / "plan.jsonl"
+        run_tempren("--plan-out", plan_path, "%Upper(){%Name()}", text_data_dir)
+        plan_path.write_text(plan_path.read_text().replace("HELLO.TXT", "../HELLO.TXT"))
+
+        stdout, stderr, error_code = run_tempren("--apply-plan", plan_path)
+
+        assert error_code == ErrorCode.INVALID_DESTINATION_ERROR
+        assert "is not relative to the input directory" in stderr
+        assert (text_data_dir / "hello.txt").exists()
+
+    def test_plan_cannot_be_applied_with_template(
+        self, text_data_dir: Path, tmp_path: Path
+    ):
+        plan_path = tmp_path / "plan.jsonl"
+        run_tempren("--plan-out", plan_path, "%Upper(){%Name()}", text_data_dir)
+
+        stdout, stderr, error_code = run_tempren(
+            "--apply-plan", plan_path, "%Name()", text_data_dir
+        )
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "template cannot be used with --apply-plan" in stderr
+
+    @pytest.mark.parametrize(
+        "option,option_arguments",
+        [
+            ("--filter-glob", ["*.txt"]),
+            ("--filter-template", ["%Size() > 0"]),
+            ("--sort", ["%Size()"]),
+            ("--recursive", []),
+            ("--jobs", ["2"]),
+            ("--concurrency", ["2"]),
+        ],
+    )
+    def test_plan_cannot_be_applied_with_rendering_options(
+        self,
+        text_data_dir: Path,
+        tmp_path: Path,
+        option: str,
+        option_arguments: List[str],
+    ):
+        plan_path = tmp_path / "plan.jsonl"
+        run_tempren("--plan-out", plan_path, "%Upper(){%Name()}", text_data_dir)
+
+        stdout, stderr, error_code = run_tempren(
+            "--apply-plan", plan_path, option, *option_arguments
+        )
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert f"{option} cannot be used with --apply-plan" in stderr
+        assert (text_data_dir / "hello.txt").exists()
+
+    def test_template_is_required(self):
+        stdout, stderr, error_code = run_tempren("--dry-run")
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "the following arguments are required" in stderr
+
+    def test_invalid_plan(self, tmp_path: Path):
+        (tmp_path / "plan.jsonl").write_text("{}\n")
+
+        stdout, stderr, error_code = run_tempren(
+            "--apply-plan", tmp_path / "plan.jsonl"
+        )
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "is not a rename plan" in stderr
+
+    @pytest.mark.parametrize("field", ["mode", "output_mode"])
+    def test_invalid_plan_mode(self, text_data_dir: Path, tmp_path: Path, field: str):
+        plan_path = tmp_path / "plan.jsonl"
+        run_tempren("--plan-out", plan_path, "%Upper(){%Name()}", text_data_dir)
+        header, *renames = plan_path.read_text().splitlines()
+        plan_path.write_text(
+            "\n".join([json.dumps({**json.loads(header), field: "unknown"}), *renames])
+        )
+
+        stdout, stderr, error_code = run_tempren("--apply-plan", plan_path)
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "Invalid header of the rename plan" in stderr
+        assert (text_data_dir / "hello.txt").exists()
+
+    def test_plan_record_without_identity(self, text_data_dir: Path, tmp_path: Path):
+        plan_path = tmp_path / "plan.jsonl"
+        run_tempren("--plan-out", plan_path, "%Upper(){%Name()}", text_data_dir)
+        header, rename, *renames = plan_path.read_text().splitlines()
+        record = json.loads(rename)
+        del record["inode"]
+        plan_path.write_text("\n".join([header, json.dumps(record), *renames]))
+
+        stdout, stderr, error_code = run_tempren("--apply-plan", plan_path)
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "'inode' field is missing" in stderr
+        assert (text_data_dir / "hello.txt").exists()
+
+
+class TestReport:
+    def test_json_lines_report(self, text_data_dir: Path):
+        stdout, stderr, error_code = run_tempren(
+            "--report-format", "json", "%Upper(){%Name()}", text_data_dir
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        records = [json.loads(line) for line in stdout.splitlines()]
+        assert sorted(records, key=lambda record: record["source"]) == [
+            {"source": "hello.txt", "destination": "HELLO.TXT", "override": False},
+            {"source": "markdown.md", "destination": "MARKDOWN.MD", "override": False},
+        ]
+        # Logs are moved out of the way
+        assert "Done" in stderr
+
+    def test_nul_separated_report(self, text_data_dir: Path):
+        stdout, stderr, error_code = run_tempren(
+            "-rf", "nul", "%Upper(){%Name()}", text_data_dir
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        paths = stdout.split("\0")
+        assert paths[-1] == ""
+        assert sorted(zip(paths[:-1:2], paths[1::2])) == [
+            ("hello.txt", "HELLO.TXT"),
+            ("markdown.md", "MARKDOWN.MD"),
+        ]
+
+    def test_quiet_summary(self, text_data_dir: Path):
+        (text_data_dir / "StaticFilename").write_text("existing")
+
+        stdout, stderr, error_code = run_tempren(
+            "--quiet-summary", "-ci", "StaticFilename", text_data_dir
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert "Renamed: " not in stdout
+        assert "Renamed 0 files (0 overridden, 2 skipped)" in stdout
+
+    def test_report_is_written_when_rename_fails(self, text_data_dir: Path):
+        stdout, stderr, error_code = run_tempren(
+            "-rf", "json", "--sort", "%Name()", "StaticFilename", text_data_dir
+        )
+
+        assert error_code == ErrorCode.INVALID_DESTINATION_ERROR
+        assert json.loads(stdout) == {
+            "source": "hello.txt",
+            "destination": "StaticFilename",
+            "override": False,
+        }
+
+    def test_progress(self, text_data_dir: Path):
+        stdout, stderr, error_code = run_tempren(
+            "--progress", "%Upper(){%Name()}", text_data_dir
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert "gather: 2 files" in stderr
+        assert "rename: 2/2 files (100%)" in stderr
+        assert "rename:" not in stdout
+
+    def test_summary_cannot_be_formatted(self, text_data_dir: Path):
+        stdout, stderr, error_code = run_tempren(
+            "-rf", "json", "--quiet-summary", "%Name()", text_data_dir
+        )
+
+        assert error_code == ErrorCode.USAGE_ERROR
+        assert "not allowed with argument" in stderr
+
 
 class TestConflictResolution:
     def test_transient_conflict_resolution(self, text_data_dir: Path):
@@ -542,6 +1119,20 @@ class TestConflictResolution:
         assert (text_data_dir / "1").exists()
         assert (text_data_dir / "2").exists()
 
+    def test_cyclic_renames(self, text_data_dir: Path):
+        run_tempren("--sort", "%Name()", "%Count(start=0)", text_data_dir)
+        (text_data_dir / "0").write_text("first")
+        (text_data_dir / "1").write_text("second")
+
+        stdout, stderr, error_code = run_tempren(
+            "--sort", "%Name()", "--sort-invert", "%Count(start=0)", text_data_dir
+        )
+
+        assert error_code == ErrorCode.SUCCESS
+        assert (text_data_dir / "0").read_text() == "second"
+        assert (text_data_dir / "1").read_text() == "first"
+        assert sorted(path.name for path in text_data_dir.iterdir()) == ["0", "1"]
+
     @pytest.mark.parametrize("flag", ["-cs", "--conflict-stop", None])
     def test_stop_conflict_resolution(self, text_data_dir: Path, flag: Optional[str]):
         stdout, stderr, error_code = run_tempren(
@@ -712,3 +1303,57 @@ class TestConflictResolution:
         assert "foobar" in stderr
 
         tempren_process.wait()
+
+
+class TestStartupTime:
+    # Modules which are expensive to import and not needed by simple templates
+    heavy_modules = (
+        "antlr4",
+        "docstring_parser",
+        "PIL",
+        "piexif",
+        "mutagen",
+        "pymediainfo",
+        "magic",
+    )
+
+    @staticmethod
+    def imported_modules(*args) -> Set[str]:
+        """Run tempren process and collect names of all imported modules"""
+        completed_process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "tempren.cli"]
+            + list(map(str, args)),
+            capture_output=True,
+            cwd=project_root_path,
+        )
+        assert completed_process.returncode == ErrorCode.SUCCESS
+        modules = set()
+        for line in completed_process.stderr.decode("utf-8").splitlines():
+            if line.startswith("import time:"):
+                modules.add(line.rsplit("|", 1)[-1].strip())
+        return modules
+
+    def test_plan_is_applied_without_tag_modules(
+        self, text_data_dir: Path, tmp_path: Path
+    ):
+        plan_path = tmp_path / "plan.jsonl"
+        run_tempren("--plan-out", plan_path, "%Upper(){%Sha1()}", text_data_dir)
+
+        modules = self.imported_modules("--apply-plan", plan_path)
+
+        assert "tempren.plan_file" in modules
+        tag_modules = {
+            module_name
+            for module_name in modules
+            if module_name.startswith("tempren.tags.")
+        }
+        assert tag_modules <= {"tempren.tags._manifest"}
+        for module_name in self.heavy_modules:
+            assert module_name not in modules
+
+    def test_simple_template_doesnt_import_heavy_modules(self, text_data_dir: Path):
+        modules = self.imported_modules("--dry-run", "%Upper(){%Name()}", text_data_dir)
+
+        assert "unidecode" in modules  # Required by the Upper tag
+        for module_name in self.heavy_modules:
+            assert module_name not in modules
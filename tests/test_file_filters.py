@@ -1,3 +1,4 @@
+import datetime
 from pathlib import Path
 
 import pytest
@@ -228,3 +229,30 @@ class TestTemplateFileFilter:
         file_filter = TemplateFileFilter(pattern)
 
         assert not file_filter(nonexistent_file)
+
+    def test_value_without_evaluable_representation(self, nonexistent_file: File):
+        mock_tag = MockTag()
+        mock_tag.process_output = datetime.datetime(2022, 1, 2)
+        pattern = Pattern([TagInstance(tag=mock_tag), RawText(".month == 1")])
+        file_filter = TemplateFileFilter(pattern)
+
+        assert file_filter(nonexistent_file)
+
+    def test_expensive_tags_are_evaluated_last(self, nonexistent_file: File):
+        expensive_tag = MockTag()
+        expensive_tag.cost = 1000
+        cheap_tag = MockTag()
+        cheap_tag.process_output = "foo"
+        pattern = Pattern(
+            [
+                TagInstance(tag=expensive_tag),
+                RawText(" and "),
+                TagInstance(tag=cheap_tag),
+                RawText(" == 'bar'"),
+            ]
+        )
+        file_filter = TemplateFileFilter(pattern)
+
+        assert not file_filter(nonexistent_file)
+        assert cheap_tag.process_invoked
+        assert not expensive_tag.process_invoked
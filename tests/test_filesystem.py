@@ -1,18 +1,61 @@
+import errno
+import hashlib
+import os
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import Iterator, Optional
 
 import pytest
 
+import tempren.filesystem
 from tempren.filesystem import (
+    DUPLICATE_TEMPORARY_PREFIX,
+    CloningNotSupportedError,
+    ContainmentChecker,
+    CopyVerificationError,
+    DestinationAlreadyExistsError,
+    DirectoryDescriptorCache,
     DryRunRenamer,
+    FileCopier,
+    FileDigestCache,
+    FileDuplicator,
     FileGatherer,
+    FileHardLinker,
     FileMover,
     FileRenamer,
+    FileSymlinker,
+    FilesystemSnapshot,
     FlatFileGatherer,
     InvalidDestinationError,
     RecursiveFileGatherer,
+    _load_renameat2,
+    copy_file_contents,
+    copy_file_contents_with_digest,
+    rename_noreplace,
 )
 from tempren.path_generator import File
+from tempren.rename_planner import TEMPORARY_NAME_PREFIX
+
+requires_renameat2 = pytest.mark.skipif(
+    _load_renameat2() is None, reason="renameat2 not available"
+)
+
+
+@pytest.fixture
+def without_renameat2(monkeypatch):
+    monkeypatch.setattr(tempren.filesystem, "_load_renameat2", lambda: None)
+
+
+@pytest.fixture
+def forbidden_exists_check(monkeypatch):
+    def _exists(path):
+        raise AssertionError(f"Unexpected existence check of {path}")
+
+    monkeypatch.setattr(Path, "exists", _exists)
+
+
+def forbidden_listing(path: str):
+    raise AssertionError(f"Unexpected listing of {path}")
 
 
 def file_to_absolute_path(file: File) -> Path:
@@ -61,6 +104,21 @@ class FilesystemFileGathererTests(ABC):
         }
         assert files == test_files
 
+    def test_listing_is_recorded_in_snapshot(self, hidden_data_dir: Path):
+        gatherer = self.create_gatherer()
+        gatherer.snapshot = FilesystemSnapshot(
+            list_directory_contents=forbidden_listing
+        )
+
+        list(gatherer.gather_in(hidden_data_dir))
+
+        # Hidden entries are recorded too, as they may conflict with renamed files
+        assert gatherer.snapshot.list_directory(hidden_data_dir) == {
+            ".hidden",
+            ".hidden.txt",
+            "visible.txt",
+        }
+
 
 class TestFlatFileGatherer(FilesystemFileGathererTests):
     def create_gatherer(self) -> FileGatherer:
@@ -121,6 +179,139 @@ class TestRecursiveFileGatherer(FilesystemFileGathererTests):
         assert files == test_files
 
 
+class TestContainmentChecker:
+    @pytest.mark.parametrize(
+        "path", ["file", "dir/file", "dir/../file", "./dir/./file", "missing/dir/file"]
+    )
+    def test_contained_paths(self, tmp_path: Path, path: str):
+        checker = ContainmentChecker(tmp_path)
+
+        assert checker.contains(path)
+        assert checker.contains(tmp_path / path)
+
+    @pytest.mark.parametrize("path", ["..", "../file", "dir/../../file", ".", "/file"])
+    def test_paths_outside_root(self, tmp_path: Path, path: str):
+        checker = ContainmentChecker(tmp_path)
+
+        assert not checker.contains(path)
+
+    def test_directory_sharing_name_prefix(self, tmp_path: Path):
+        checker = ContainmentChecker(tmp_path / "root")
+
+        assert not checker.contains(tmp_path / "root-sibling" / "file")
+
+    def test_symlinked_directory_inside_root(self, tmp_path: Path):
+        (tmp_path / "target").mkdir()
+        (tmp_path / "link").symlink_to(tmp_path / "target")
+        checker = ContainmentChecker(tmp_path)
+
+        assert checker.contains("link/file")
+        assert checker.contains("link/nested/file")
+
+    def test_symlinked_directory_outside_root(self, tmp_path: Path):
+        (tmp_path / "root" / "dir").mkdir(parents=True)
+        (tmp_path / "outside").mkdir()
+        (tmp_path / "root" / "dir" / "link").symlink_to(tmp_path / "outside")
+        checker = ContainmentChecker(tmp_path / "root")
+
+        assert not checker.contains("dir/link/file")
+        assert not checker.contains("dir/link/nested/file")
+        assert checker.contains("dir/file")
+
+    def test_parent_of_symlinked_directory_outside_root(self, tmp_path: Path):
+        (tmp_path / "root").mkdir()
+        (tmp_path / "outside" / "sub").mkdir(parents=True)
+        (tmp_path / "root" / "link").symlink_to(tmp_path / "outside" / "sub")
+        checker = ContainmentChecker(tmp_path / "root")
+
+        # 'link/..' is 'outside', not the root directory
+        assert not checker.contains("link/../file")
+        assert checker.normalize("link/../file") is None
+
+    def test_parent_of_symlinked_directory_inside_root(self, tmp_path: Path):
+        (tmp_path / "root" / "dir" / "nested").mkdir(parents=True)
+        (tmp_path / "root" / "link").symlink_to(tmp_path / "root" / "dir" / "nested")
+        checker = ContainmentChecker(tmp_path / "root")
+
+        assert checker.normalize("link/../file") == Path("dir/file")
+
+    def test_path_is_normalized(self, tmp_path: Path):
+        checker = ContainmentChecker(tmp_path)
+
+        assert checker.normalize("./dir/../file") == Path("file")
+        assert checker.normalize(tmp_path / "dir" / "file") == Path("dir/file")
+
+    def test_symlinked_root_directory(self, tmp_path: Path):
+        (tmp_path / "root" / "dir").mkdir(parents=True)
+        (tmp_path / "root-link").symlink_to(tmp_path / "root")
+        (tmp_path / "root" / "dir-link").symlink_to(tmp_path / "root" / "dir")
+        checker = ContainmentChecker(tmp_path / "root-link")
+
+        assert checker.contains("dir/file")
+        assert checker.contains("dir-link/file")
+
+    def test_directories_are_checked_once(self, tmp_path: Path, monkeypatch):
+        checked_directories = []
+        islink = os.path.islink
+
+        def _islink(path):
+            checked_directories.append(path)
+            return islink(path)
+
+        checker = ContainmentChecker(tmp_path)
+        monkeypatch.setattr(tempren.filesystem.os.path, "islink", _islink)
+        for name in ("a", "b", "c"):
+            checker.contains(f"dir/{name}")
+        monkeypatch.undo()
+
+        assert checked_directories == [str(tmp_path / "dir")]
+
+
+class TestFilesystemSnapshot:
+    def test_directory_is_listed_once(self, text_data_dir: Path):
+        listings = []
+
+        def _listdir(path: str):
+            listings.append(path)
+            return os.listdir(path)
+
+        snapshot = FilesystemSnapshot(list_directory_contents=_listdir)
+
+        assert snapshot.exists(text_data_dir / "hello.txt")
+        assert not snapshot.exists(text_data_dir / "goodbye.txt")
+        assert listings == [str(text_data_dir)]
+
+    def test_relative_paths(self, text_data_dir: Path):
+        snapshot = FilesystemSnapshot(text_data_dir)
+
+        assert snapshot.exists("hello.txt")
+        assert snapshot.exists(Path("subdirectory/../markdown.md"))
+
+    def test_missing_directory_is_empty(self, tmp_path: Path):
+        snapshot = FilesystemSnapshot()
+
+        assert snapshot.list_directory(tmp_path / "missing") == set()
+        assert not snapshot.exists(tmp_path / "missing" / "file")
+
+    def test_rename_creates_parent_directories(self, text_data_dir: Path):
+        snapshot = FilesystemSnapshot(text_data_dir)
+
+        snapshot.rename("hello.txt", "new/nested/hi.txt")
+
+        assert not snapshot.exists("hello.txt")
+        assert snapshot.exists("new")
+        assert snapshot.exists("new/nested/hi.txt")
+        assert not (text_data_dir / "new").exists()
+
+    def test_rename_with_preserved_source(self, text_data_dir: Path):
+        snapshot = FilesystemSnapshot(text_data_dir)
+
+        snapshot.rename("hello.txt", "hi.txt", preserve_source=True)
+
+        assert snapshot.exists("hello.txt")
+        assert snapshot.exists("hi.txt")
+
+
 class TestFileRenamer:
     def test_simple_file(self, text_data_dir: Path):
         src = text_data_dir / "hello.txt"
@@ -298,6 +489,618 @@ class TestFileMover:
         assert not src.exists()
         assert dst.exists()
 
+    def test_destination_directories_are_created_once(
+        self, nested_data_dir: Path, monkeypatch
+    ):
+        created_directories = []
+        makedirs = os.makedirs
+
+        def _makedirs(name, *args, **kwargs):
+            created_directories.append(name)
+            makedirs(name, *args, **kwargs)
+
+        monkeypatch.setattr(os, "makedirs", _makedirs)
+        mover = FileMover()
+        destination_dir = nested_data_dir / "fourth" / "fifth"
+
+        mover(nested_data_dir / "level-1.file", destination_dir / "level-1.file")
+        mover(
+            nested_data_dir / "first" / "level-2.file", destination_dir / "first.file"
+        )
+        mover(
+            nested_data_dir / "second" / "level-2.file", destination_dir / "second.file"
+        )
+
+        assert created_directories.count(str(destination_dir)) == 1
+        assert sorted(path.name for path in destination_dir.iterdir()) == [
+            "first.file",
+            "level-1.file",
+            "second.file",
+        ]
+
+    def test_override_file_from_other_device(self, text_data_dir: Path, monkeypatch):
+        def _cross_device_rename(source_path: Path, destination_path: Path, *args):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr(
+            tempren.filesystem, "rename_replacing", _cross_device_rename
+        )
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "markdown.md"
+        mover = FileMover()
+
+        mover(src, dst, True)
+
+        assert not src.exists()
+        assert dst.read_text().startswith("Hello")
+
+    def test_file_from_other_device(self, text_data_dir: Path, monkeypatch):
+        def _cross_device_rename(source_path: Path, destination_path: Path, *args):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr(
+            tempren.filesystem, "rename_noreplace", _cross_device_rename
+        )
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "subdirectory" / "hello.txt"
+        mover = FileMover()
+
+        mover(src, dst)
+
+        assert not src.exists()
+        assert dst.exists()
+
+    def test_file_from_other_device_destination_exists(
+        self, text_data_dir: Path, monkeypatch
+    ):
+        def _cross_device_rename(source_path: Path, destination_path: Path, *args):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr(
+            tempren.filesystem, "rename_noreplace", _cross_device_rename
+        )
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "markdown.md"
+        mover = FileMover()
+
+        with pytest.raises(DestinationAlreadyExistsError):
+            mover(src, dst)
+        assert src.exists()
+
+    def test_verified_file_from_other_device(self, text_data_dir: Path, monkeypatch):
+        monkeypatch.setattr(
+            tempren.filesystem, "rename_noreplace", _cross_device_rename
+        )
+        src = text_data_dir / "hello.txt"
+        src_stat = src.stat()
+        dst = text_data_dir / "subdirectory" / "hello.txt"
+        mover = FileMover(verify_copies=True)
+
+        mover(src, dst)
+
+        assert not src.exists()
+        assert dst.read_text() == "Hello\n"
+        assert dst.stat().st_mtime_ns == src_stat.st_mtime_ns
+
+    def test_source_is_kept_if_verification_fails(
+        self, text_data_dir: Path, monkeypatch
+    ):
+        monkeypatch.setattr(
+            tempren.filesystem, "rename_noreplace", _cross_device_rename
+        )
+        monkeypatch.setattr(
+            tempren.filesystem, "_read_back_digest", lambda *args: "corrupted"
+        )
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "subdirectory" / "hello.txt"
+        mover = FileMover(verify_copies=True)
+
+        with pytest.raises(CopyVerificationError) as exc:
+            mover(src, dst)
+        assert exc.match(str(src))
+        assert src.read_text() == "Hello\n"
+        assert not dst.exists()
+
+
+class TestRenameNoreplace:
+    @pytest.fixture(params=["renameat2", "fallback"])
+    def implementation(self, request):
+        if request.param == "renameat2":
+            if _load_renameat2() is None:
+                pytest.skip("renameat2 not available")
+        else:
+            request.getfixturevalue("without_renameat2")
+        return request.param
+
+    @pytest.fixture(params=[False, True], ids=["paths", "directory descriptors"])
+    def directories(self, request) -> Iterator[Optional[DirectoryDescriptorCache]]:
+        if not request.param:
+            yield None
+            return
+        if not DirectoryDescriptorCache.is_supported():
+            pytest.skip("directory descriptors not supported")
+        cache = DirectoryDescriptorCache()
+        yield cache
+        cache.close()
+
+    def test_simple_file(self, text_data_dir: Path, implementation: str, directories):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "hi.txt"
+
+        rename_noreplace(src, dst, directories)
+
+        assert not src.exists()
+        assert dst.read_text().startswith("Hello")
+
+    def test_destination_file_exists(
+        self, text_data_dir: Path, implementation: str, directories
+    ):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "markdown.md"
+        contents = dst.read_text()
+
+        with pytest.raises(DestinationAlreadyExistsError) as exc:
+            rename_noreplace(src, dst, directories)
+        assert exc.match(str(dst))
+        assert src.exists()
+        assert dst.read_text() == contents
+
+    def test_source_doesnt_exists(
+        self, text_data_dir: Path, implementation: str, directories
+    ):
+        src = text_data_dir / "goodbye.txt"
+        dst = text_data_dir / "bye.md"
+
+        with pytest.raises(FileNotFoundError) as exc:
+            rename_noreplace(src, dst, directories)
+        assert exc.match(str(src))
+
+    def test_nested_directories(
+        self, nested_data_dir: Path, implementation: str, directories
+    ):
+        src = nested_data_dir / "first" / "level-2.file"
+        dst = nested_data_dir / "second" / "moved.file"
+
+        rename_noreplace(src, dst, directories)
+
+        assert not src.exists()
+        assert dst.exists()
+
+    def test_destination_directory_doesnt_exists(
+        self, text_data_dir: Path, implementation: str, directories
+    ):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "nonexistent" / "hello.txt"
+
+        with pytest.raises(FileNotFoundError) as exc:
+            rename_noreplace(src, dst, directories)
+        assert exc.match(str(dst))
+
+    def test_relative_paths(
+        self, nested_data_dir: Path, implementation: str, directories
+    ):
+        os.chdir(nested_data_dir / "first")
+        rename_noreplace(Path("level-2.file"), Path("moved.file"), directories)
+        os.chdir(nested_data_dir / "second")
+
+        # Same relative directory refers to the new working directory
+        rename_noreplace(Path("level-2.file"), Path("moved.file"), directories)
+
+        assert (nested_data_dir / "first" / "moved.file").exists()
+        assert (nested_data_dir / "second" / "moved.file").exists()
+
+    @requires_renameat2
+    def test_destination_isnt_checked_separately(
+        self, text_data_dir: Path, directories, forbidden_exists_check
+    ):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "markdown.md"
+
+        with pytest.raises(DestinationAlreadyExistsError):
+            rename_noreplace(src, dst, directories)
+        rename_noreplace(src, text_data_dir / "hi.txt", directories)
+
+
+@pytest.mark.skipif(
+    not DirectoryDescriptorCache.is_supported(),
+    reason="directory descriptors not supported",
+)
+class TestDirectoryDescriptorCache:
+    def test_descriptors_are_reused(self, nested_data_dir: Path):
+        cache = DirectoryDescriptorCache()
+        first_file = nested_data_dir / "first" / "level-2.file"
+
+        with cache.locate(first_file) as locations:
+            ((descriptor, name),) = locations
+        with cache.locate(first_file, nested_data_dir / "second" / "x") as locations:
+            (first_location, second_location) = locations
+
+        assert name == "level-2.file"
+        assert first_location == (descriptor, "level-2.file")
+        assert second_location[0] != descriptor
+        cache.close()
+
+    def test_least_recently_used_descriptor_is_closed(self, nested_data_dir: Path):
+        cache = DirectoryDescriptorCache(capacity=2)
+        with cache.locate(nested_data_dir / "first" / "a") as locations:
+            ((first_descriptor, _),) = locations
+        with cache.locate(nested_data_dir / "second" / "a") as locations:
+            ((second_descriptor, _),) = locations
+        with cache.locate(nested_data_dir / "first" / "a"):
+            pass
+
+        with cache.locate(nested_data_dir / "a"):
+            pass
+
+        os.fstat(first_descriptor)
+        with pytest.raises(OSError):
+            os.fstat(second_descriptor)
+        cache.close()
+
+    def test_used_descriptors_are_not_closed(self, nested_data_dir: Path):
+        cache = DirectoryDescriptorCache(capacity=1)
+
+        with cache.locate(
+            nested_data_dir / "first" / "a", nested_data_dir / "second" / "a"
+        ) as locations:
+            # Both descriptors stay open even though the capacity is exceeded
+            for descriptor, _ in locations:
+                os.fstat(descriptor)
+
+        assert len(cache._descriptors) == 1
+        cache.close()
+
+    def test_close(self, nested_data_dir: Path):
+        cache = DirectoryDescriptorCache()
+        with cache.locate(nested_data_dir / "a") as locations:
+            ((descriptor, _),) = locations
+
+        cache.close()
+
+        with pytest.raises(OSError):
+            os.fstat(descriptor)
+
+    def test_nonexistent_directory_is_not_located(self, text_data_dir: Path):
+        cache = DirectoryDescriptorCache()
+        path = text_data_dir / "nonexistent" / "file"
+
+        with cache.locate(path) as locations:
+            assert locations == [(None, str(path))]
+        cache.close()
+
+
+def _cross_device_rename(source_path: Path, destination_path: Path, *args):
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+
+@pytest.fixture
+def without_cloning(monkeypatch):
+    monkeypatch.setattr(tempren.filesystem, "clone_file_contents", lambda *args: False)
+
+
+def _unsupported_transfer(*args):
+    raise OSError(errno.ENOSYS, os.strerror(errno.ENOSYS))
+
+
+class TestCopyFileContents:
+    def _copy(self, source: Path, destination: Path):
+        with open(source, "rb") as source_file, open(
+            destination, "wb"
+        ) as destination_file:
+            copy_file_contents(source_file.fileno(), destination_file.fileno())
+
+    def test_contents_are_copied(self, tmp_path: Path):
+        source = tmp_path / "source"
+        source.write_bytes(os.urandom(300_000))
+
+        self._copy(source, tmp_path / "destination")
+
+        assert (tmp_path / "destination").read_bytes() == source.read_bytes()
+
+    def test_empty_file(self, tmp_path: Path):
+        (tmp_path / "source").touch()
+
+        self._copy(tmp_path / "source", tmp_path / "destination")
+
+        assert (tmp_path / "destination").read_bytes() == b""
+
+    @pytest.mark.parametrize(
+        "unsupported", [["copy_file_range"], ["copy_file_range", "sendfile"]]
+    )
+    def test_fallback(self, tmp_path: Path, monkeypatch, without_cloning, unsupported):
+        for function in unsupported:
+            monkeypatch.setattr(os, function, _unsupported_transfer, raising=False)
+        source = tmp_path / "source"
+        source.write_bytes(os.urandom(10_000))
+
+        self._copy(source, tmp_path / "destination")
+
+        assert (tmp_path / "destination").read_bytes() == source.read_bytes()
+
+    def test_error_after_partial_transfer_is_reported(
+        self, tmp_path: Path, monkeypatch, without_cloning
+    ):
+        transfers = []
+
+        def _copy_file_range(source, destination, count):
+            if transfers:
+                raise OSError(errno.EINVAL, os.strerror(errno.EINVAL))
+            transfers.append(count)
+            return os.write(destination, os.read(source, 1))
+
+        monkeypatch.setattr(os, "copy_file_range", _copy_file_range, raising=False)
+        (tmp_path / "source").write_bytes(b"data")
+
+        with pytest.raises(OSError):
+            self._copy(tmp_path / "source", tmp_path / "destination")
+
+
+class TestFileDigestCache:
+    def test_digest_is_found_after_rename(self, tmp_path: Path):
+        cache = FileDigestCache()
+        (tmp_path / "file").write_text("contents")
+
+        cache.record(tmp_path / "file", "sha256", "digest")
+        (tmp_path / "file").rename(tmp_path / "renamed")
+
+        assert cache.find((tmp_path / "renamed").stat()) == ("sha256", "digest")
+
+    def test_modified_file_digest_is_not_found(self, tmp_path: Path):
+        cache = FileDigestCache()
+        (tmp_path / "file").write_text("contents")
+
+        cache.record(tmp_path / "file", "sha256", "digest")
+        (tmp_path / "file").write_text("modified contents")
+
+        assert cache.find((tmp_path / "file").stat()) is None
+
+    def test_nonexistent_file_is_ignored(self, nonexistent_absolute_path: Path):
+        cache = FileDigestCache()
+
+        cache.record(nonexistent_absolute_path, "sha256", "digest")
+
+
+class TestCopyFileContentsWithDigest:
+    def test_digest_of_copied_contents(self, tmp_path: Path):
+        contents = os.urandom(3 * 1024 * 1024 + 7)
+        (tmp_path / "source").write_bytes(contents)
+        digest = hashlib.sha256()
+
+        with open(tmp_path / "source", "rb") as source_file, open(
+            tmp_path / "destination", "wb"
+        ) as destination_file:
+            copy_file_contents_with_digest(
+                source_file.fileno(), destination_file.fileno(), digest
+            )
+
+        assert (tmp_path / "destination").read_bytes() == contents
+        assert digest.hexdigest() == hashlib.sha256(contents).hexdigest()
+
+
+class FileDuplicatorTests(ABC):
+    @abstractmethod
+    def create_duplicator(self) -> FileDuplicator:
+        raise NotImplementedError()
+
+    def test_simple_file(self, text_data_dir: Path):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "hi.txt"
+        duplicator = self.create_duplicator()
+
+        duplicator(src, dst)
+
+        assert src.read_text() == "Hello\n"
+        assert dst.read_text() == "Hello\n"
+
+    def test_destination_directory_is_created(self, text_data_dir: Path):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "new" / "directory" / "hi.txt"
+        duplicator = self.create_duplicator()
+
+        duplicator(src, dst)
+
+        assert dst.read_text() == "Hello\n"
+
+    def test_destination_file_exists(self, text_data_dir: Path):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "markdown.md"
+        contents = dst.read_text()
+        duplicator = self.create_duplicator()
+
+        with pytest.raises(DestinationAlreadyExistsError) as exc:
+            duplicator(src, dst)
+        assert exc.match(str(dst))
+        assert dst.read_text() == contents
+
+    def test_override_destination_file(self, text_data_dir: Path):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "markdown.md"
+        duplicator = self.create_duplicator()
+
+        duplicator(src, dst, True)
+
+        assert dst.read_text() == "Hello\n"
+        assert sorted(path.name for path in text_data_dir.iterdir()) == [
+            "hello.txt",
+            "markdown.md",
+        ]
+
+    def test_temporary_is_distinguishable_from_planned_one(self, text_data_dir: Path):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "markdown.md"
+
+        temporary_path = self.create_duplicator()._create_temporary(src, dst)
+
+        assert temporary_path.name.startswith(DUPLICATE_TEMPORARY_PREFIX)
+        assert not temporary_path.name.startswith(TEMPORARY_NAME_PREFIX)
+
+    def test_source_doesnt_exists(self, text_data_dir: Path):
+        src = text_data_dir / "goodbye.txt"
+        dst = text_data_dir / "bye.txt"
+        duplicator = self.create_duplicator()
+
+        with pytest.raises(FileNotFoundError):
+            duplicator(src, dst)
+        assert not dst.exists() and not dst.is_symlink()
+
+
+class TestFileCopier(FileDuplicatorTests):
+    def create_duplicator(self) -> FileDuplicator:
+        return FileCopier()
+
+    def test_copy_is_independent(self, text_data_dir: Path):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "hi.txt"
+
+        FileCopier()(src, dst)
+        dst.write_text("Bye\n")
+
+        assert src.read_text() == "Hello\n"
+
+    def test_file_mode_is_copied(self, text_data_dir: Path):
+        src = text_data_dir / "hello.txt"
+        src.chmod(0o751)
+        dst = text_data_dir / "hi.txt"
+
+        FileCopier()(src, dst)
+
+        assert dst.stat().st_mode & 0o777 == 0o751
+
+    def test_file_times_are_copied(self, text_data_dir: Path):
+        src = text_data_dir / "hello.txt"
+        os.utime(src, ns=(1_000_000_000, 2_000_000_000))
+        dst = text_data_dir / "hi.txt"
+
+        FileCopier()(src, dst)
+
+        assert dst.stat().st_mtime_ns == 2_000_000_000
+
+    def test_partial_copy_is_removed(self, text_data_dir: Path, monkeypatch):
+        def _copy_file_contents(*args):
+            raise OSError(errno.EIO, os.strerror(errno.EIO))
+
+        monkeypatch.setattr(
+            tempren.filesystem, "copy_file_contents", _copy_file_contents
+        )
+        dst = text_data_dir / "hi.txt"
+
+        with pytest.raises(OSError):
+            FileCopier()(text_data_dir / "hello.txt", dst)
+        assert not dst.exists()
+
+    def test_unsupported_cloning(self, text_data_dir: Path, without_cloning):
+        dst = text_data_dir / "hi.txt"
+
+        with pytest.raises(CloningNotSupportedError):
+            FileCopier(clone_only=True)(text_data_dir / "hello.txt", dst)
+        assert not dst.exists()
+
+
+class TestVerifyingFileCopier(FileDuplicatorTests):
+    def create_duplicator(self) -> FileDuplicator:
+        return FileCopier(verify=True)
+
+    def test_digest_is_calculated_while_copying(self, text_data_dir: Path, monkeypatch):
+        read_back_digests = []
+        read_back_digest = tempren.filesystem._read_back_digest
+
+        def _read_back_digest(*args):
+            read_back_digests.append(read_back_digest(*args))
+            return read_back_digests[-1]
+
+        monkeypatch.setattr(tempren.filesystem, "_read_back_digest", _read_back_digest)
+
+        FileCopier(verify=True)(text_data_dir / "hello.txt", text_data_dir / "hi.txt")
+
+        assert read_back_digests == [
+            hashlib.sha256((text_data_dir / "hello.txt").read_bytes()).hexdigest()
+        ]
+
+    def test_recorded_digest_is_reused(
+        self, text_data_dir: Path, monkeypatch, recorded_digests: FileDigestCache
+    ):
+        def _copy_file_contents_with_digest(*args):
+            raise AssertionError("Source file was hashed again")
+
+        monkeypatch.setattr(
+            tempren.filesystem,
+            "copy_file_contents_with_digest",
+            _copy_file_contents_with_digest,
+        )
+        src = text_data_dir / "hello.txt"
+        recorded_digests.record(src, "md5", hashlib.md5(src.read_bytes()).hexdigest())
+
+        FileCopier(verify=True, file_digests=recorded_digests)(
+            src, text_data_dir / "hi.txt"
+        )
+
+        assert (text_data_dir / "hi.txt").read_text() == "Hello\n"
+
+    def test_mismatching_copy_is_removed(
+        self, text_data_dir: Path, recorded_digests: FileDigestCache
+    ):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "hi.txt"
+        # Digest recorded for different contents
+        recorded_digests.record(src, "md5", hashlib.md5(b"Bye\n").hexdigest())
+
+        with pytest.raises(CopyVerificationError):
+            FileCopier(verify=True, file_digests=recorded_digests)(src, dst)
+        assert not dst.exists()
+        assert src.exists()
+
+    def test_mismatching_copy_doesnt_override_destination(
+        self, text_data_dir: Path, monkeypatch
+    ):
+        monkeypatch.setattr(
+            tempren.filesystem, "_read_back_digest", lambda *args: "corrupted"
+        )
+        dst = text_data_dir / "markdown.md"
+        contents = dst.read_text()
+
+        with pytest.raises(CopyVerificationError):
+            FileCopier(verify=True)(text_data_dir / "hello.txt", dst, True)
+        assert dst.read_text() == contents
+        assert sorted(path.name for path in text_data_dir.iterdir()) == [
+            "hello.txt",
+            "markdown.md",
+        ]
+
+
+class TestFileHardLinker(FileDuplicatorTests):
+    def create_duplicator(self) -> FileDuplicator:
+        return FileHardLinker()
+
+    def test_link_shares_inode(self, text_data_dir: Path):
+        src = text_data_dir / "hello.txt"
+        dst = text_data_dir / "hi.txt"
+
+        FileHardLinker()(src, dst)
+
+        assert os.path.samefile(src, dst)
+
+
+class TestFileSymlinker(FileDuplicatorTests):
+    def create_duplicator(self) -> FileDuplicator:
+        return FileSymlinker()
+
+    def test_source_doesnt_exists(self, text_data_dir: Path):
+        # Dangling links are allowed
+        src = text_data_dir / "goodbye.txt"
+        dst = text_data_dir / "bye.txt"
+
+        FileSymlinker()(src, dst)
+
+        assert dst.is_symlink()
+
+    def test_link_is_absolute(self, text_data_dir: Path):
+        os.chdir(text_data_dir)
+
+        FileSymlinker()(Path("hello.txt"), Path("dir") / "hi.txt")
+
+        link_target = Path(os.readlink(text_data_dir / "dir" / "hi.txt"))
+        assert link_target == text_data_dir / "hello.txt"
+
 
 class TestDryRunRenamer:
     def test_simple_file(self, text_data_dir: Path):
@@ -401,3 +1204,26 @@ class TestDryRunRenamer:
 
         assert src.exists()
         assert dst.exists()
+
+    def test_renames_are_simulated_in_memory(
+        self, text_data_dir: Path, forbidden_exists_check
+    ):
+        snapshot = FilesystemSnapshot(text_data_dir, forbidden_listing)
+        snapshot.record_listing(text_data_dir, ["hello.txt", "markdown.md"])
+        renamer = DryRunRenamer(snapshot)
+
+        renamer(Path("hello.txt"), Path("hi.txt"))
+
+        with pytest.raises(FileExistsError):
+            renamer(Path("markdown.md"), Path("hi.txt"))
+        with pytest.raises(FileNotFoundError):
+            renamer(Path("hello.txt"), Path("bye.txt"))
+
+    def test_preserved_sources(self, text_data_dir: Path):
+        renamer = DryRunRenamer(preserve_sources=True)
+
+        renamer(text_data_dir / "hello.txt", text_data_dir / "hi.txt")
+
+        with pytest.raises(FileExistsError):
+            renamer(text_data_dir / "hello.txt", text_data_dir / "hi.txt")
+        renamer(text_data_dir / "hello.txt", text_data_dir / "hello-copy.txt")
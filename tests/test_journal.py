@@ -0,0 +1,408 @@
+import json
+import os
+from pathlib import Path
+from typing import List, Set
+
+import pytest
+
+import tempren.journal
+from tempren.filesystem import FileMover
+from tempren.journal import (
+    JournalContents,
+    JournaledRename,
+    JournalError,
+    JournalingRenamerWrapper,
+    JournalWriter,
+    RenameJournal,
+    find_executed_renames,
+    read_journal,
+    undo_renames,
+)
+
+
+@pytest.fixture
+def journal_path(tmp_path: Path) -> Path:
+    return tmp_path / "journal.jsonl"
+
+
+@pytest.fixture
+def input_directory(tmp_path: Path) -> Path:
+    directory = tmp_path / "input"
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def fsync_calls(monkeypatch) -> List[int]:
+    calls = []
+    fsync = os.fsync
+
+    def _fsync(descriptor: int):
+        calls.append(descriptor)
+        fsync(descriptor)
+
+    monkeypatch.setattr(tempren.journal.os, "fsync", _fsync)
+    return calls
+
+
+def _create_files(directory: Path, *names: str):
+    for name in names:
+        (directory / name).write_text(name)
+
+
+def _contents(directory: Path) -> Set[str]:
+    return {
+        f"{path.name}:{path.read_text()}"
+        for path in directory.iterdir()
+        if path.is_file()
+    }
+
+
+def _journal(input_directory: Path, *renames: JournaledRename) -> JournalContents:
+    return JournalContents(input_directory, False, list(renames))
+
+
+class TestJournalWriter:
+    def test_records_are_committed_in_groups(
+        self, journal_path: Path, fsync_calls: List[int]
+    ):
+        writer = JournalWriter(journal_path, commit_interval=10, commit_delay=60)
+
+        for index in range(25):
+            writer.write({"index": index})
+        assert len(fsync_calls) == 2
+        writer.close()
+
+        assert len(fsync_calls) == 3
+        assert len(journal_path.read_text().splitlines()) == 25
+
+    def test_records_are_committed_after_delay(
+        self, journal_path: Path, fsync_calls: List[int]
+    ):
+        writer = JournalWriter(journal_path, commit_interval=1000, commit_delay=0)
+
+        writer.write({"index": 0})
+        writer.write({"index": 1})
+
+        assert len(fsync_calls) == 2
+        writer.close()
+
+    def test_existing_journal_is_not_overridden(self, journal_path: Path):
+        journal_path.write_text("contents")
+
+        with pytest.raises(FileExistsError):
+            JournalWriter(journal_path)
+        assert journal_path.read_text() == "contents"
+
+    def test_records_are_appended(self, journal_path: Path):
+        with JournalWriter(journal_path) as writer:
+            writer.write({"index": 0})
+
+        with JournalWriter(journal_path, append=True) as writer:
+            writer.write({"index": 1})
+
+        assert journal_path.read_text().splitlines() == ['{"index": 0}', '{"index": 1}']
+
+    def test_incomplete_record_is_removed_before_appending(self, journal_path: Path):
+        journal_path.write_text('{"index": 0}\n{"ind')
+
+        with JournalWriter(journal_path, append=True) as writer:
+            writer.write({"index": 1})
+
+        assert journal_path.read_text().splitlines() == ['{"index": 0}', '{"index": 1}']
+
+
+class TestRenameJournal:
+    def test_planned_renames_are_committed_at_once(
+        self, journal_path: Path, input_directory: Path, fsync_calls: List[int]
+    ):
+        journal = RenameJournal(journal_path, input_directory)
+
+        journal.plan((Path(str(index)), Path(f"{index}.new")) for index in range(1000))
+
+        assert len(fsync_calls) == 1
+        assert len(journal_path.read_text().splitlines()) == 1001
+
+    def test_journal_is_created_when_renames_are_planned(
+        self, journal_path: Path, input_directory: Path
+    ):
+        journal = RenameJournal(journal_path, input_directory)
+        assert not journal_path.exists()
+
+        journal.plan([])
+        journal.close()
+
+        contents = read_journal(journal_path)
+        assert contents.input_directory == input_directory
+        assert contents.renames == []
+
+    def test_completed_renames(self, journal_path: Path, input_directory: Path):
+        journal = RenameJournal(journal_path, input_directory)
+        journal.plan([(Path("a"), Path("b")), (Path("c"), Path("d"))])
+
+        journal.complete(journal.planned_id(Path("c"), Path("d")))
+        journal.complete(journal.planned_id(Path("a"), Path("b")), override=True)
+        journal.close()
+
+        assert read_journal(journal_path).renames == [
+            JournaledRename(1, Path("c"), Path("d"), completed=True),
+            JournaledRename(0, Path("a"), Path("b"), completed=True, override=True),
+        ]
+
+    def test_unplanned_rename_is_recorded(
+        self, journal_path: Path, input_directory: Path
+    ):
+        journal = RenameJournal(journal_path, input_directory)
+        journal.plan([(Path("a"), Path("b"))])
+
+        rename_id = journal.planned_id(Path("a"), Path("manual"))
+        journal.close()
+
+        assert rename_id == 1
+        assert read_journal(journal_path).renames[1] == JournaledRename(
+            1, Path("a"), Path("manual")
+        )
+
+
+class TestJournalingRenamerWrapper:
+    def test_failed_rename_is_not_completed(
+        self, journal_path: Path, input_directory: Path
+    ):
+        _create_files(input_directory, "a", "b")
+        journal = RenameJournal(journal_path, input_directory)
+        journal.plan([(input_directory / "a", input_directory / "b")])
+        renamer = JournalingRenamerWrapper(FileMover(), journal)
+
+        with pytest.raises(FileExistsError):
+            renamer(input_directory / "a", input_directory / "b")
+        journal.close()
+
+        assert not read_journal(journal_path).renames[0].completed
+
+
+class TestReadJournal:
+    def test_incomplete_last_record_is_skipped(
+        self, journal_path: Path, input_directory: Path
+    ):
+        journal = RenameJournal(journal_path, input_directory)
+        journal.plan([(Path("a"), Path("b"))])
+        journal.close()
+        with open(journal_path, "a") as journal_file:
+            journal_file.write('{"type": "compl')
+
+        assert read_journal(journal_path).renames == [
+            JournaledRename(0, Path("a"), Path("b"))
+        ]
+
+    def test_invalid_record(self, journal_path: Path, input_directory: Path):
+        journal = RenameJournal(journal_path, input_directory)
+        journal.plan([])
+        journal.close()
+        with open(journal_path, "a") as journal_file:
+            journal_file.write("invalid\n")
+            journal_file.write(json.dumps({"type": "completed", "id": 0}) + "\n")
+
+        with pytest.raises(JournalError) as exc:
+            read_journal(journal_path)
+        assert exc.match("line 2")
+
+    @pytest.mark.parametrize("field", ["input_directory", "sources_preserved"])
+    def test_header_without_field(
+        self, journal_path: Path, input_directory: Path, field: str
+    ):
+        journal = RenameJournal(journal_path, input_directory)
+        journal.plan([(Path("a"), Path("b"))])
+        journal.close()
+        header, *records = journal_path.read_text().splitlines()
+        header_record = json.loads(header)
+        del header_record[field]
+        journal_path.write_text("\n".join([json.dumps(header_record), *records]))
+
+        with pytest.raises(JournalError) as exc:
+            read_journal(journal_path)
+        assert exc.match(f"'{field}' field is missing")
+
+    def test_record_without_type(self, journal_path: Path, input_directory: Path):
+        journal = RenameJournal(journal_path, input_directory)
+        journal.plan([])
+        journal.close()
+        with open(journal_path, "a") as journal_file:
+            journal_file.write(json.dumps({"id": 0}) + "\n")
+
+        with pytest.raises(JournalError) as exc:
+            read_journal(journal_path)
+        assert exc.match("line 2.*'type' field is missing")
+
+    def test_unknown_rename_id(self, journal_path: Path, input_directory: Path):
+        journal = RenameJournal(journal_path, input_directory)
+        journal.plan([(Path("a"), Path("b"))])
+        journal.close()
+        with open(journal_path, "a") as journal_file:
+            journal_file.write(json.dumps({"type": "completed", "id": 7}) + "\n")
+
+        with pytest.raises(JournalError) as exc:
+            read_journal(journal_path)
+        assert exc.match("rename 7 was not planned")
+
+    def test_not_a_journal(self, journal_path: Path):
+        journal_path.write_text('{"some": "json"}\n')
+
+        with pytest.raises(JournalError) as exc:
+            read_journal(journal_path)
+        assert exc.match("is not a rename journal")
+
+
+class TestFindExecutedRenames:
+    def test_recorded_renames(self, input_directory: Path):
+        _create_files(input_directory, "b")
+        journal = _journal(
+            input_directory, JournaledRename(0, Path("a"), Path("b"), completed=True)
+        )
+
+        assert find_executed_renames(journal) == journal.renames
+
+    def test_unrecorded_rename(self, input_directory: Path):
+        _create_files(input_directory, "b", "c")
+        journal = _journal(
+            input_directory,
+            JournaledRename(0, Path("a"), Path("b")),
+            JournaledRename(1, Path("c"), Path("d")),
+        )
+
+        assert find_executed_renames(journal) == [journal.renames[0]]
+
+    def test_reused_paths(self, input_directory: Path):
+        # x -> y and then z -> x were executed, but not recorded
+        _create_files(input_directory, "x", "y")
+        journal = _journal(
+            input_directory,
+            JournaledRename(0, Path("x"), Path("y")),
+            JournaledRename(1, Path("z"), Path("x")),
+        )
+
+        assert find_executed_renames(journal) == journal.renames
+
+    def test_undone_renames_are_skipped(self, input_directory: Path):
+        _create_files(input_directory, "b")
+        journal = _journal(
+            input_directory,
+            JournaledRename(0, Path("a"), Path("b"), completed=True, undone=True),
+        )
+
+        assert find_executed_renames(journal) == []
+
+    def test_preserved_sources_require_completion(self, input_directory: Path):
+        _create_files(input_directory, "a", "b", "c", "d")
+        journal = JournalContents(
+            input_directory,
+            True,
+            [
+                JournaledRename(0, Path("a"), Path("b"), completed=True),
+                JournaledRename(1, Path("c"), Path("d")),
+            ],
+        )
+
+        assert find_executed_renames(journal) == [journal.renames[0]]
+
+
+class TestUndoRenames:
+    def _record(
+        self,
+        journal_path: Path,
+        input_directory: Path,
+        *renames: str,
+        sources_preserved: bool = False,
+    ) -> RenameJournal:
+        """Records and executes renames (in 'source->destination' format)"""
+        journal = RenameJournal(journal_path, input_directory, sources_preserved)
+        pairs = [tuple(map(Path, rename.split("->"))) for rename in renames]
+        journal.plan(pairs)
+        for source, destination in pairs:
+            (input_directory / destination).parent.mkdir(exist_ok=True)
+            (input_directory / source).rename(input_directory / destination)
+            journal.complete(journal.planned_id(source, destination))
+        return journal
+
+    def test_renames_are_reverted(self, journal_path: Path, input_directory: Path):
+        _create_files(input_directory, "a", "b")
+        self._record(journal_path, input_directory, "a->c", "b->d/e").close()
+
+        reverted = undo_renames(journal_path)
+
+        assert reverted == 2
+        assert _contents(input_directory) == {"a:a", "b:b"}
+
+    def test_cycle_is_reverted(self, journal_path: Path, input_directory: Path):
+        _create_files(input_directory, "a", "b")
+        self._record(
+            journal_path, input_directory, "a->.tmp", "b->a", ".tmp->b"
+        ).close()
+
+        undo_renames(journal_path)
+
+        assert _contents(input_directory) == {"a:a", "b:b"}
+
+    def test_interrupted_run(self, journal_path: Path, input_directory: Path):
+        _create_files(input_directory, "a", "b")
+        journal = self._record(journal_path, input_directory, "a->c")
+        # Rename executed, but its completion was not committed before the crash
+        journal.plan([(Path("b"), Path("d"))])
+        (input_directory / "b").rename(input_directory / "d")
+        journal.close()
+
+        reverted = undo_renames(journal_path)
+
+        assert reverted == 2
+        assert _contents(input_directory) == {"a:a", "b:b"}
+
+    def test_undo_can_be_continued(
+        self, journal_path: Path, input_directory: Path, monkeypatch
+    ):
+        _create_files(input_directory, "a", "b")
+        self._record(journal_path, input_directory, "a->c", "b->d").close()
+        # Interrupt undo after the first file
+        mover_call = FileMover.__call__
+        calls = []
+
+        def _interrupted_mover(self, *args):
+            if calls:
+                raise KeyboardInterrupt()
+            calls.append(args)
+            mover_call(self, *args)
+
+        monkeypatch.setattr(FileMover, "__call__", _interrupted_mover)
+        with pytest.raises(KeyboardInterrupt):
+            undo_renames(journal_path)
+        monkeypatch.undo()
+
+        reverted = undo_renames(journal_path)
+
+        assert reverted == 1
+        assert _contents(input_directory) == {"a:a", "b:b"}
+        assert undo_renames(journal_path) == 0
+
+    def test_copies_are_removed(self, journal_path: Path, input_directory: Path):
+        _create_files(input_directory, "a", "b")
+        journal = RenameJournal(journal_path, input_directory, sources_preserved=True)
+        journal.plan([(Path("a"), Path("c"))])
+        (input_directory / "c").write_text("a")
+        journal.complete(journal.planned_id(Path("a"), Path("c")))
+        journal.close()
+
+        undo_renames(journal_path)
+
+        assert _contents(input_directory) == {"a:a", "b:b"}
+
+    def test_copy_of_removed_source_is_kept(
+        self, journal_path: Path, input_directory: Path
+    ):
+        _create_files(input_directory, "a")
+        journal = RenameJournal(journal_path, input_directory, sources_preserved=True)
+        journal.plan([(Path("a"), Path("c"))])
+        (input_directory / "c").write_text("a")
+        journal.complete(journal.planned_id(Path("a"), Path("c")))
+        journal.close()
+        (input_directory / "a").unlink()
+
+        assert undo_renames(journal_path) == 0
+        assert _contents(input_directory) == {"c:a"}
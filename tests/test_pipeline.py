@@ -0,0 +1,152 @@
+import os
+from pathlib import Path
+from typing import Iterable, List
+
+import pytest
+
+import tempren.filesystem
+from tempren.filesystem import FileRenamer
+from tempren.path_generator import File
+from tempren.pipeline import (
+    FilterType,
+    OutputMode,
+    RuntimeConfiguration,
+    build_pipeline,
+    build_tag_registry,
+)
+from tempren.progress import Phase
+from tempren.rename_planner import RenamePlanner
+from tempren.template.tree_elements import SharedTagInstance
+
+
+class _RecordingSharedTagInstance:
+    """Records files forgotten by the wrapped shared instance"""
+
+    def __init__(self, shared_instance: SharedTagInstance):
+        self.shared_instance = shared_instance
+        self.forgotten: List[Path] = []
+        self.cleared = False
+
+    def forget(self, files: Iterable[File]):
+        files = list(files)
+        self.forgotten.extend(file.relative_path for file in files)
+        self.shared_instance.forget(files)
+
+    def clear(self):
+        self.cleared = True
+        self.shared_instance.clear()
+
+
+class TestSharedTagValues:
+    def _build(self, **configuration):
+        return build_pipeline(
+            RuntimeConfiguration(dry_run=True, **configuration),
+            build_tag_registry(),
+            manual_conflict_resolver=lambda *args: NotImplemented,
+        )
+
+    def test_instances_are_grouped_by_last_phase(self, text_data_dir: Path):
+        pipeline = self._build(
+            template="%Name()_%Size()",
+            input_directory=text_data_dir,
+            filter_type=FilterType.template,
+            filter="%Size() > 0 and %Ext() != ''",
+            sort="%Ext() + %Name()",
+        )
+
+        assert {
+            phase: [instance.tag.__class__.__name__ for instance in instances]
+            for phase, instances in pipeline.shared_tag_instances.items()
+        } == {Phase.sort: ["ExtTag"], Phase.render: ["SizeTag", "NameTag"]}
+
+    def test_values_are_dropped_after_last_phase(self, text_data_dir: Path):
+        pipeline = self._build(
+            template="%Name()_%Size()",
+            input_directory=text_data_dir,
+            filter_type=FilterType.template,
+            filter="%Size() > 0 and %Ext() == '.txt'",
+            sort="%Ext()",
+        )
+        recorders = {
+            phase: [_RecordingSharedTagInstance(instance) for instance in instances]
+            for phase, instances in pipeline.shared_tag_instances.items()
+        }
+        pipeline.shared_tag_instances = recorders  # type: ignore
+
+        pipeline.execute()
+
+        (size_recorder,) = recorders[Phase.render]
+        (extension_recorder,) = recorders[Phase.sort]
+        # Values of the rejected file are dropped right after it was filtered out
+        assert Path("markdown.md") in size_recorder.forgotten
+        assert Path("hello.txt") in size_recorder.forgotten
+        assert size_recorder.cleared and extension_recorder.cleared
+        assert not size_recorder.shared_instance._values
+        assert not extension_recorder.shared_instance._values
+
+
+class TestFileDigests:
+    def test_digests_of_hash_tags_are_reused_and_dropped(
+        self, text_data_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        def _copy_file_contents_with_digest(*args):
+            raise AssertionError("Source file was hashed again")
+
+        monkeypatch.setattr(
+            tempren.filesystem,
+            "copy_file_contents_with_digest",
+            _copy_file_contents_with_digest,
+        )
+        pipeline = build_pipeline(
+            RuntimeConfiguration(
+                template="%Md5()",
+                input_directory=text_data_dir,
+                output_mode=OutputMode.copy,
+                output_directory=tmp_path,
+                verify_copies=True,
+            ),
+            build_tag_registry(),
+            manual_conflict_resolver=lambda *args: NotImplemented,
+        )
+        file_digests = pipeline.file_digests
+        assert file_digests is not None
+
+        pipeline.execute()
+
+        assert len(list(tmp_path.iterdir())) == len(list(text_data_dir.iterdir()))
+        assert not file_digests._digests
+
+
+class TestRenameCycles:
+    def test_leftover_temporary_is_reported(
+        self, text_data_dir: Path, caplog: pytest.LogCaptureFixture
+    ):
+        # Planned paths are relative to the input directory (as in `execute`)
+        os.chdir(text_data_dir)
+        pipeline = build_pipeline(
+            RuntimeConfiguration(template="%Name()", input_directory=text_data_dir),
+            build_tag_registry(),
+            manual_conflict_resolver=lambda *args: NotImplemented,
+        )
+        renamer = FileRenamer()
+
+        def _failing_renamer(source_path: Path, destination_path: Path, override):
+            if source_path == Path("markdown.md"):
+                raise PermissionError(source_path)
+            renamer(source_path, destination_path, override)
+
+        pipeline.renamer = _failing_renamer
+        plan = RenamePlanner(text_data_dir).plan(
+            [
+                (Path("hello.txt"), Path("markdown.md")),
+                (Path("markdown.md"), Path("hello.txt")),
+            ]
+        )
+        (temporary_path,) = plan.temporaries
+
+        with pytest.raises(PermissionError):
+            pipeline._execute_plan(plan)
+
+        assert (text_data_dir / temporary_path).exists()
+        assert "1 files were left under temporary names" in caplog.text
+        assert f"'{temporary_path}' should be renamed to 'markdown.md'" in caplog.text
@@ -0,0 +1,203 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from tempren.plan_file import (
+    PlanFileError,
+    PlanFileHeader,
+    PlanWriter,
+    read_plan_header,
+    read_plan_renames,
+)
+
+
+@pytest.fixture
+def plan_path(tmp_path: Path) -> Path:
+    return tmp_path / "plan.jsonl"
+
+
+def _write_plan(plan_path: Path, input_directory: Path, *renames: str) -> int:
+    """Writes plan of renames (in 'source->destination' format)"""
+    writer = PlanWriter(plan_path, PlanFileHeader(input_directory, "name", "move"))
+    return writer.write(tuple(map(Path, rename.split("->"))) for rename in renames)
+
+
+class TestPlanWriter:
+    def test_header_is_written(self, plan_path: Path, text_data_dir: Path):
+        writer = PlanWriter(
+            plan_path,
+            PlanFileHeader(text_data_dir, "path", "copy", Path("/output")),
+        )
+
+        writer.write([])
+
+        assert read_plan_header(plan_path) == PlanFileHeader(
+            text_data_dir, "path", "copy", Path("/output")
+        )
+
+    def test_source_identity_is_written(self, plan_path: Path, text_data_dir: Path):
+        count = _write_plan(plan_path, text_data_dir, "hello.txt->hi.txt")
+
+        assert count == 1
+        record = json.loads(plan_path.read_text().splitlines()[1])
+        stat_result = (text_data_dir / "hello.txt").stat()
+        assert record == {
+            "type": "rename",
+            "source": "hello.txt",
+            "destination": "hi.txt",
+            "device": stat_result.st_dev,
+            "inode": stat_result.st_ino,
+            "size": stat_result.st_size,
+            "mtime_ns": stat_result.st_mtime_ns,
+        }
+
+    def test_existing_plan_is_not_overridden(
+        self, plan_path: Path, text_data_dir: Path
+    ):
+        plan_path.write_text("contents")
+
+        with pytest.raises(FileExistsError):
+            _write_plan(plan_path, text_data_dir, "hello.txt->hi.txt")
+        assert plan_path.read_text() == "contents"
+
+    def test_incomplete_plan_is_removed(self, plan_path: Path, text_data_dir: Path):
+        with pytest.raises(FileNotFoundError):
+            _write_plan(
+                plan_path, text_data_dir, "hello.txt->hi.txt", "missing.txt->new.txt"
+            )
+        assert not plan_path.exists()
+
+
+class TestReadPlanRenames:
+    def test_renames_are_loaded(self, plan_path: Path, text_data_dir: Path):
+        _write_plan(
+            plan_path, text_data_dir, "hello.txt->hi.txt", "markdown.md->doc/md.md"
+        )
+
+        assert read_plan_renames(plan_path) == [
+            (Path("hello.txt"), Path("hi.txt")),
+            (Path("markdown.md"), Path("doc/md.md")),
+        ]
+
+    def test_modified_source_is_skipped(self, plan_path: Path, text_data_dir: Path):
+        _write_plan(plan_path, text_data_dir, "hello.txt->hi.txt", "markdown.md->md.md")
+        with open(text_data_dir / "hello.txt", "a") as hello_file:
+            hello_file.write("modified")
+
+        assert read_plan_renames(plan_path) == [(Path("markdown.md"), Path("md.md"))]
+
+    def test_replaced_source_is_skipped(self, plan_path: Path, text_data_dir: Path):
+        _write_plan(plan_path, text_data_dir, "hello.txt->hi.txt")
+        hello_stat = (text_data_dir / "hello.txt").stat()
+        # Same contents and modification time, but different inode
+        (text_data_dir / "replacement.txt").write_text("Hello\n")
+        os.utime(
+            text_data_dir / "replacement.txt",
+            ns=(hello_stat.st_atime_ns, hello_stat.st_mtime_ns),
+        )
+        (text_data_dir / "replacement.txt").replace(text_data_dir / "hello.txt")
+
+        assert read_plan_renames(plan_path) == []
+
+    def test_missing_source_is_skipped(self, plan_path: Path, text_data_dir: Path):
+        _write_plan(plan_path, text_data_dir, "hello.txt->hi.txt")
+        (text_data_dir / "hello.txt").unlink()
+
+        assert read_plan_renames(plan_path) == []
+
+    def test_removed_records_are_not_renamed(
+        self, plan_path: Path, text_data_dir: Path
+    ):
+        _write_plan(plan_path, text_data_dir, "hello.txt->hi.txt", "markdown.md->md.md")
+        # Plan is reviewed and the first rename removed
+        lines = plan_path.read_text().splitlines()
+        plan_path.write_text("\n".join([lines[0], lines[2]]) + "\n")
+
+        assert read_plan_renames(plan_path) == [(Path("markdown.md"), Path("md.md"))]
+
+    def test_invalid_record(self, plan_path: Path, text_data_dir: Path):
+        _write_plan(plan_path, text_data_dir, "hello.txt->hi.txt")
+        with open(plan_path, "a") as plan_file:
+            plan_file.write('{"type": "ren')
+
+        with pytest.raises(PlanFileError) as exc:
+            read_plan_renames(plan_path)
+        assert exc.match("line 3")
+
+    @pytest.mark.parametrize("contents", ["", '{"type": "rename"}\n'])
+    def test_not_a_plan(self, plan_path: Path, contents: str):
+        plan_path.write_text(contents)
+
+        with pytest.raises(PlanFileError) as exc:
+            read_plan_renames(plan_path)
+        assert exc.match("is not a rename plan")
+
+    @pytest.mark.parametrize(
+        "record",
+        [
+            {"type": "header", "version": 1, "mode": "name", "output_mode": "move"},
+            {
+                "type": "header",
+                "version": 1,
+                "input_directory": "/input",
+                "mode": None,
+                "output_mode": "move",
+            },
+            {
+                "type": "header",
+                "version": 1,
+                "input_directory": "/input",
+                "mode": "name",
+                "output_mode": "move",
+                "output_directory": 1,
+            },
+        ],
+    )
+    def test_invalid_header(self, plan_path: Path, record: dict):
+        plan_path.write_text(json.dumps(record) + "\n")
+
+        with pytest.raises(PlanFileError) as exc:
+            read_plan_header(plan_path)
+        assert exc.match("line 1")
+
+    @pytest.mark.parametrize(
+        "field,value",
+        [
+            ("source", None),
+            ("destination", ["hi.txt"]),
+            ("device", "1"),
+            ("inode", None),
+            ("size", True),
+            ("mtime_ns", 1.5),
+        ],
+    )
+    def test_invalid_rename_field(
+        self, plan_path: Path, text_data_dir: Path, field: str, value
+    ):
+        _write_plan(plan_path, text_data_dir, "hello.txt->hi.txt")
+        header, rename = plan_path.read_text().splitlines()
+        record = json.loads(rename)
+        record[field] = value
+        plan_path.write_text(f"{header}\n{json.dumps(record)}\n")
+
+        with pytest.raises(PlanFileError) as exc:
+            read_plan_renames(plan_path)
+        assert exc.match(f"line 2 .*'{field}' field")
+
+    def test_record_is_not_an_object(self, plan_path: Path, text_data_dir: Path):
+        _write_plan(plan_path, text_data_dir)
+        with open(plan_path, "a") as plan_file:
+            plan_file.write("[]\n")
+
+        with pytest.raises(PlanFileError) as exc:
+            read_plan_renames(plan_path)
+        assert exc.match("not an object")
+
+    def test_unsupported_version(self, plan_path: Path):
+        plan_path.write_text('{"type": "header", "version": 1000}\n')
+
+        with pytest.raises(PlanFileError) as exc:
+            read_plan_header(plan_path)
+        assert exc.match("Unsupported version")
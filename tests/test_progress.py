@@ -0,0 +1,186 @@
+import io
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from tempren.pipeline import RuntimeConfiguration, build_pipeline, build_tag_registry
+from tempren.progress import (
+    Phase,
+    Progress,
+    ProgressPrinter,
+    ProgressTracker,
+    format_progress,
+)
+
+
+class _TerminalStream(io.StringIO):
+    def isatty(self) -> bool:
+        return True
+
+
+@pytest.fixture
+def updates() -> List[Progress]:
+    return []
+
+
+class TestProgress:
+    def test_rates(self):
+        progress = Progress(Phase.render, 50, 200, 10.0, bytes_read=1000)
+
+        assert progress.files_per_second == 5.0
+        assert progress.bytes_per_second == 100.0
+        assert progress.eta == 30.0
+
+    def test_unknown_total(self):
+        progress = Progress(Phase.gather, 50, None, 10.0)
+
+        assert progress.eta is None
+
+    def test_nothing_completed(self):
+        progress = Progress(Phase.render, 0, 200, 0.0)
+
+        assert progress.files_per_second == 0.0
+        assert progress.eta is None
+
+
+class TestProgressTracker:
+    def test_updates_are_rate_limited(self, updates: List[Progress]):
+        tracker = ProgressTracker(updates.append, interval=60)
+
+        tracker.start_phase(Phase.render, 1000)
+        for _ in range(1000):
+            tracker.advance()
+        tracker.finish_phase()
+
+        assert [(update.completed, update.finished) for update in updates] == [
+            (0, False),
+            (1000, True),
+        ]
+
+    def test_updates_without_limit(self, updates: List[Progress]):
+        tracker = ProgressTracker(updates.append, interval=0)
+
+        tracker.start_phase(Phase.rename, 2)
+        tracker.advance()
+        tracker.advance(1, bytes_read=10)
+
+        assert [update.completed for update in updates] == [0, 1, 2]
+        assert updates[-1].bytes_read == 10
+
+    def test_counters_are_reset_by_phase(self, updates: List[Progress]):
+        tracker = ProgressTracker(updates.append, interval=0)
+        tracker.start_phase(Phase.gather)
+        tracker.advance(5, bytes_read=10)
+
+        tracker.start_phase(Phase.render, 5)
+
+        assert updates[-1] == Progress(
+            Phase.render, 0, 5, updates[-1].elapsed, bytes_read=0
+        )
+
+
+class TestFormatProgress:
+    def test_unknown_total(self):
+        line = format_progress(Progress(Phase.gather, 20, None, 2.0))
+
+        assert line == "gather: 20 files, 10 files/s"
+
+    def test_eta(self):
+        line = format_progress(Progress(Phase.render, 25, 100, 30.0))
+
+        assert line == "render: 25/100 files (25%), 1 files/s, ETA 0:01:30"
+
+    def test_bytes_read(self):
+        line = format_progress(
+            Progress(Phase.render, 100, 100, 2.0, bytes_read=3 * 1024 * 1024)
+        )
+
+        assert "1.5 MiB/s" in line
+
+    def test_finished_phase(self):
+        line = format_progress(Progress(Phase.rename, 10, 10, 5.0, finished=True))
+
+        assert line == "rename: 10/10 files (100%), 2 files/s, took 0:00:05"
+
+
+class TestProgressPrinter:
+    def test_terminal_line_is_updated(self):
+        stream = _TerminalStream()
+        printer = ProgressPrinter(stream)
+
+        printer(Progress(Phase.rename, 0, 10, 0.0))
+        printer(Progress(Phase.rename, 10, 10, 1.0, finished=True))
+
+        assert stream.getvalue() == (
+            "\rrename: 0/10 files (0%), 0 files/s\x1b[K"
+            "\rrename: 10/10 files (100%), 10 files/s, took 0:00:01\x1b[K\n"
+        )
+
+    def test_plain_lines(self):
+        stream = io.StringIO()
+        printer = ProgressPrinter(stream)
+
+        printer(Progress(Phase.rename, 0, 10, 0.0))
+        printer(Progress(Phase.rename, 5, 10, 1.0))
+        printer(Progress(Phase.rename, 10, 10, 2.0, finished=True))
+
+        assert stream.getvalue().splitlines() == [
+            "rename: 5/10 files (50%), 5 files/s, ETA 0:00:01",
+            "rename: 10/10 files (100%), 5 files/s, took 0:00:02",
+        ]
+        assert printer.interval > ProgressPrinter(_TerminalStream()).interval
+
+
+class TestPipelineProgress:
+    def _execute(self, updates: List[Progress], **configuration) -> List[Progress]:
+        pipeline = build_pipeline(
+            RuntimeConfiguration(**configuration),
+            build_tag_registry(),
+            manual_conflict_resolver=lambda *args: NotImplemented,
+        )
+        pipeline.progress = ProgressTracker(updates.append, interval=0)
+        pipeline.execute()
+        return [update for update in updates if update.finished]
+
+    def test_phases(self, text_data_dir: Path, updates: List[Progress]):
+        finished = self._execute(
+            updates,
+            template="%Upper(){%Name()}",
+            input_directory=text_data_dir,
+            sort="%Name()",
+        )
+
+        assert [(update.phase, update.completed) for update in finished] == [
+            (Phase.gather, 2),
+            (Phase.sort, 2),
+            (Phase.render, 2),
+            (Phase.rename, 2),
+        ]
+        assert all(update.bytes_read == 0 for update in finished)
+
+    def test_filter_phase(self, text_data_dir: Path, updates: List[Progress]):
+        finished = self._execute(
+            updates,
+            template="%Upper(){%Name()}",
+            input_directory=text_data_dir,
+            filter="*.txt",
+        )
+
+        assert [(update.phase, update.completed) for update in finished] == [
+            (Phase.filter, 2),
+            (Phase.render, 1),
+            (Phase.rename, 1),
+        ]
+
+    def test_bytes_read_by_contents_tags(
+        self, text_data_dir: Path, updates: List[Progress]
+    ):
+        finished = self._execute(
+            updates, template="%Sha1()%Ext()", input_directory=text_data_dir
+        )
+
+        render = next(update for update in finished if update.phase == Phase.render)
+        assert render.bytes_read == sum(
+            path.stat().st_size for path in text_data_dir.iterdir()
+        )
@@ -0,0 +1,182 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+import pytest
+
+from tempren.rename_planner import Rename, RenamePlanner
+
+
+def _planner(*existing_paths: str, preserve_sources: bool = False) -> RenamePlanner:
+    directories: Dict[Path, List[str]] = {}
+    for existing_path in existing_paths:
+        path = Path("/input", existing_path)
+        directories.setdefault(path.parent, []).append(path.name)
+
+    def _list_directory(directory: Path) -> Iterable[str]:
+        if directory not in directories:
+            raise FileNotFoundError(directory)
+        return directories[directory]
+
+    return RenamePlanner(Path("/input"), _list_directory, preserve_sources)
+
+
+def _renames(*renames: Tuple[str, str]) -> List[Tuple[Path, Path]]:
+    return [(Path(source), Path(destination)) for source, destination in renames]
+
+
+def _simulate(existing_paths: Set[str], renames: List[Rename]) -> Set[str]:
+    """Executes renames checking if none of them overrides a file"""
+    paths = set(existing_paths)
+    for rename in renames:
+        assert str(rename.source) in paths
+        assert str(rename.destination) not in paths
+        paths.remove(str(rename.source))
+        paths.add(str(rename.destination))
+    return paths
+
+
+class TestRenamePlanner:
+    def test_independent_renames(self):
+        planner = _planner("a", "b")
+
+        plan = planner.plan(_renames(("a", "c"), ("b", "d")))
+
+        assert plan.renames == [
+            Rename(Path("a"), Path("c")),
+            Rename(Path("b"), Path("d")),
+        ]
+        assert plan.conflicts == []
+
+    def test_identical_paths_are_skipped(self):
+        planner = _planner("a")
+
+        plan = planner.plan(_renames(("a", "a")))
+
+        assert plan.renames == []
+        assert plan.conflicts == []
+
+    @pytest.mark.parametrize("reverse", [False, True])
+    def test_chain_is_ordered(self, reverse: bool):
+        existing_paths = {"0", "1", "2"}
+        renames = _renames(("0", "1"), ("1", "2"), ("2", "3"))
+        if reverse:
+            renames.reverse()
+        planner = _planner(*existing_paths)
+
+        plan = planner.plan(renames)
+
+        assert plan.conflicts == []
+        assert _simulate(existing_paths, plan.renames) == {"1", "2", "3"}
+
+    def test_long_chain(self):
+        existing_paths = {str(index) for index in range(5000)}
+        renames = _renames(*((str(index), str(index + 1)) for index in range(5000)))
+        planner = _planner(*existing_paths)
+
+        plan = planner.plan(renames)
+
+        assert len(plan.renames) == 5000
+        assert _simulate(existing_paths, plan.renames) == {
+            str(index + 1) for index in range(5000)
+        }
+
+    def test_cycle_is_broken_with_temporary_name(self):
+        existing_paths = {"a", "b", "c"}
+        planner = _planner(*existing_paths)
+
+        plan = planner.plan(_renames(("a", "b"), ("b", "c"), ("c", "a")))
+
+        assert plan.conflicts == []
+        assert len(plan.renames) == 4
+        temporary_path = plan.renames[0].destination
+        assert temporary_path.name.startswith(".tempren-")
+        assert plan.renames[-1].source == temporary_path
+        assert plan.temporaries == {temporary_path: Path("b")}
+        assert _simulate(existing_paths, plan.renames) == existing_paths
+
+    def test_chains_and_cycles(self):
+        existing_paths = {"a", "b", "x", "y"}
+        planner = _planner(*existing_paths)
+
+        plan = planner.plan(_renames(("x", "y"), ("a", "b"), ("y", "z"), ("b", "a")))
+
+        assert plan.conflicts == []
+        assert _simulate(existing_paths, plan.renames) == {"a", "b", "y", "z"}
+
+    def test_temporary_name_doesnt_override_existing_file(self):
+        existing_paths = {"a", "b", ".tempren-0-a"}
+        planner = _planner(*existing_paths)
+
+        plan = planner.plan(_renames(("a", "b"), ("b", "a")))
+
+        assert plan.renames[0].destination == Path(".tempren-1-a")
+        assert _simulate(existing_paths, plan.renames) == existing_paths
+
+    def test_existing_destination_conflict(self):
+        planner = _planner("a", "b")
+
+        plan = planner.plan(_renames(("a", "b")))
+
+        assert plan.renames == []
+        assert plan.conflicts == [Rename(Path("a"), Path("b"))]
+
+    def test_first_claimant_wins(self):
+        planner = _planner("a", "b")
+
+        plan = planner.plan(_renames(("a", "c"), ("b", "c")))
+
+        assert plan.renames == [Rename(Path("a"), Path("c"))]
+        assert plan.conflicts == [Rename(Path("b"), Path("c"))]
+
+    def test_renames_blocked_by_conflicts(self):
+        planner = _planner("a", "b", "c", "d")
+
+        plan = planner.plan(_renames(("a", "b"), ("b", "c"), ("d", "e")))
+
+        assert plan.renames == [Rename(Path("d"), Path("e"))]
+        # Conflict which could free the destination is resolved first
+        assert plan.conflicts == [
+            Rename(Path("b"), Path("c")),
+            Rename(Path("a"), Path("b")),
+        ]
+
+    def test_nested_destinations(self):
+        existing_paths = {"a", "dir/b"}
+        planner = _planner(*existing_paths)
+
+        plan = planner.plan(_renames(("a", "dir/b"), ("dir/b", "new/a")))
+
+        assert plan.conflicts == []
+        assert _simulate(existing_paths, plan.renames) == {"dir/b", "new/a"}
+
+    def test_destination_directories_are_listed_once(self):
+        listed_directories = []
+
+        def _list_directory(directory: Path) -> Iterable[str]:
+            listed_directories.append(directory)
+            return ["a", "b", "c"]
+
+        planner = RenamePlanner(Path("/input"), _list_directory)
+
+        planner.plan(_renames(("a", "d"), ("b", "e"), ("c", "./f")))
+
+        assert listed_directories == [Path("/input")]
+
+    def test_preserved_sources_are_not_freed(self):
+        planner = _planner("a", "b", preserve_sources=True)
+
+        plan = planner.plan(_renames(("a", "b"), ("b", "c")))
+
+        assert plan.renames == [Rename(Path("b"), Path("c"))]
+        assert plan.conflicts == [Rename(Path("a"), Path("b"))]
+
+    def test_preserved_sources_in_output_directory(self):
+        planner = _planner("a", "b", preserve_sources=True)
+
+        plan = planner.plan(_renames(("a", "/output/a"), ("b", "/output/b")))
+
+        assert plan.renames == [
+            Rename(Path("a"), Path("/output/a")),
+            Rename(Path("b"), Path("/output/b")),
+        ]
+        assert plan.conflicts == []
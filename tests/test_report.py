@@ -0,0 +1,119 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from tempren.report import (
+    HumanRenameReporter,
+    JsonLinesRenameReporter,
+    NulSeparatedRenameReporter,
+    ReportingRenamerWrapper,
+    SummaryRenameReporter,
+)
+
+
+class _CountingStream(io.StringIO):
+    writes: int = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return super().write(text)
+
+
+@pytest.fixture
+def stream() -> _CountingStream:
+    return _CountingStream()
+
+
+class TestRenameReporter:
+    def test_records_are_written_in_batches(self, stream: _CountingStream):
+        reporter = JsonLinesRenameReporter(stream, flush_interval=10, flush_delay=60)
+
+        for index in range(25):
+            reporter.report_rename(Path(str(index)), Path(f"{index}.new"), False)
+        assert stream.writes == 2
+        reporter.close()
+
+        assert stream.writes == 3
+        assert len(stream.getvalue().splitlines()) == 25
+
+    def test_records_are_written_after_delay(self, stream: _CountingStream):
+        reporter = JsonLinesRenameReporter(stream, flush_interval=1000, flush_delay=0)
+
+        reporter.report_rename(Path("a"), Path("b"), False)
+
+        assert stream.getvalue() != ""
+
+    def test_renames_are_counted(self, stream: _CountingStream):
+        reporter = JsonLinesRenameReporter(stream)
+
+        reporter.report_rename(Path("a"), Path("b"), False)
+        reporter.report_rename(Path("c"), Path("d"), True)
+        reporter.report_skip(Path("e"), Path("f"))
+
+        assert (reporter.renamed, reporter.overridden, reporter.skipped) == (2, 1, 1)
+
+
+class TestReportFormats:
+    def test_human(self, stream: _CountingStream):
+        reporter = HumanRenameReporter(stream)
+
+        reporter.report_rename(Path("a"), Path("b"), False)
+        reporter.report_rename(Path("c"), Path("d"), True)
+        reporter.close()
+
+        assert stream.getvalue().splitlines() == [
+            "Renamed: a",
+            "     to: b",
+            "Renamed: c",
+            "         to: d (override)",
+        ]
+
+    def test_json_lines(self, stream: _CountingStream):
+        reporter = JsonLinesRenameReporter(stream)
+
+        reporter.report_rename(Path("dir/a b"), Path('"quoted"'), True)
+        reporter.close()
+
+        assert json.loads(stream.getvalue()) == {
+            "source": "dir/a b",
+            "destination": '"quoted"',
+            "override": True,
+        }
+
+    def test_nul_separated(self, stream: _CountingStream):
+        reporter = NulSeparatedRenameReporter(stream)
+
+        reporter.report_rename(Path("new\nline"), Path("b"), False)
+        reporter.report_rename(Path("c"), Path("d"), False)
+        reporter.close()
+
+        assert stream.getvalue() == "new\nline\0b\0c\0d\0"
+
+    def test_summary(self, stream: _CountingStream):
+        reporter = SummaryRenameReporter(stream)
+
+        reporter.report_rename(Path("a"), Path("b"), False)
+        reporter.report_rename(Path("c"), Path("d"), True)
+        reporter.report_skip(Path("e"), Path("f"))
+        assert stream.getvalue() == ""
+        reporter.close()
+
+        assert stream.getvalue() == "Renamed 2 files (1 overridden, 1 skipped)\n"
+
+
+class TestReportingRenamerWrapper:
+    def test_failed_rename_is_not_reported(self, stream: _CountingStream):
+        def _failing_renamer(source_path: Path, destination_path: Path, override: bool):
+            raise FileExistsError()
+
+        reporter = JsonLinesRenameReporter(stream)
+        renamer = ReportingRenamerWrapper(_failing_renamer, reporter)
+
+        with pytest.raises(FileExistsError):
+            renamer(Path("a"), Path("b"))
+        reporter.close()
+
+        assert reporter.renamed == 0
+        assert stream.getvalue() == ""